@@ -3,9 +3,17 @@
 from typing import Dict, Any, List, Tuple
 import math
 import json
+import os
 import time
+import threading
 from typing import Dict, Any, List, Optional, Tuple
 
+import numpy as np
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # 未安装 scipy 时退回贪心匹配
+    linear_sum_assignment = None
+
 from ..state import ChemistryExtractionState
 from . import BaseAgent
 from ..config import Config
@@ -101,75 +109,260 @@ def calculate_score(
     return total_score
 
 
-def match_compound_name(
+# 几何匹配参数：距离上限与方向阈值按 scale 归一化
+#   normalize="median_box"：scale 为化合物框边长（max(w, h)）的中位数
+#   normalize="diagonal"：scale 为图像对角线长度（需要 image_resolution，缺失时退回 median_box）
+#   normalize="pixel"：scale = 1，即旧的固定像素参数（max_dist=300, threshold=50）
+# 默认保持旧的像素参数；归一化方案需由 calibration/compound_match.py 校准后写入参数文件再启用
+DEFAULT_MATCH_PARAMS: Dict[str, Any] = {
+    "normalize": "pixel",
+    "dist_weight": 0.6,
+    "below_weight": 0.4,
+    "max_dist_ratio": 300,
+    "threshold_ratio": 50,
+    "min_confidence": 0.0,
+}
+
+_params_cache: Dict[str, Any] = {"key": None, "data": {}}
+_params_lock = threading.Lock()
+
+
+def _read_params_file(path: str) -> Dict[str, Dict[str, Any]]:
+    """读取按来源类型保存的校准参数（按 mtime 缓存）"""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    with _params_lock:
+        if _params_cache["key"] != (path, mtime):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Failed to load match params from {path}: {e}")
+                data = {}
+            _params_cache["key"] = (path, mtime)
+            _params_cache["data"] = data if isinstance(data, dict) else {}
+        return _params_cache["data"]
+
+
+def load_match_params(source_type: Optional[str] = None) -> Dict[str, Any]:
+    """获取某来源类型的匹配参数：默认值 < 文件中的 default < 文件中的 source_type"""
+    source_type = source_type or Config.COMPOUND_MATCH_SOURCE_TYPE
+    stored = _read_params_file(Config.COMPOUND_MATCH_PARAMS_PATH)
+    params = dict(DEFAULT_MATCH_PARAMS)
+    for key in ("default", source_type):
+        params.update({k: v for k, v in stored.get(key, {}).items() if k in DEFAULT_MATCH_PARAMS})
+    return params
+
+
+def save_match_params(source_type: str, params: Dict[str, Any], extra: Optional[Dict[str, Any]] = None) -> str:
+    """保存某来源类型的最佳参数（与已有来源类型合并，原子写入），返回文件路径"""
+    path = Config.COMPOUND_MATCH_PARAMS_PATH
+    stored = dict(_read_params_file(path))
+    stored[source_type] = {**{k: params[k] for k in DEFAULT_MATCH_PARAMS if k in params}, **(extra or {})}
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(stored, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def match_scale(
     compound_detections: List[Dict],
-    name_detections: List[Dict],
+    image_resolution: Optional[Tuple[int, int]] = None,
+    normalize: str = "median_box"
+) -> float:
+    """距离归一化尺度（像素）"""
+    if normalize == "pixel":
+        return 1.0
+    if normalize == "diagonal" and image_resolution:
+        return float(math.hypot(*image_resolution[:2]))
+    sides = [max(d["bbox"][2] - d["bbox"][0], d["bbox"][3] - d["bbox"][1]) for d in compound_detections if _valid_bbox(d)]
+    return float(np.median(sides)) if sides else 1.0
+
+
+def _resolve_params(compounds: List[Dict], image_resolution, params: Optional[Dict[str, Any]], **overrides) -> Dict[str, Any]:
+    resolved = {**DEFAULT_MATCH_PARAMS, **(params or {})}
+    resolved.update({k: v for k, v in overrides.items() if v is not None})
+    scale = match_scale(compounds, image_resolution, resolved["normalize"])
+    resolved["max_dist"] = resolved["max_dist_ratio"] * scale
+    resolved["threshold"] = resolved["threshold_ratio"] * scale
+    return resolved
+
+
+def _valid_bbox(det: Dict) -> bool:
+    return isinstance(det.get("bbox"), (list, tuple)) and len(det["bbox"]) == 4
+
+
+def _centers(detections: List[Dict]) -> np.ndarray:
+    """检测框中心点矩阵 (n, 2)"""
+    if not detections:
+        return np.zeros((0, 2), dtype=float)
+    boxes = np.asarray([det["bbox"] for det in detections], dtype=float)
+    return np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2], axis=1)
+
+
+def score_matrix(
+    compound_centers: np.ndarray,
+    name_centers: np.ndarray,
     dist_weight: float = 0.6,
     below_weight: float = 0.4,
-    min_confidence: float = 0.3
+    max_dist: float = 300,
+    threshold: float = 50
+) -> np.ndarray:
+    """
+    一次性计算所有 (化合物, 名称) 对的匹配得分，逐元素与 calculate_score 一致
+    :return: 形状 (n_compounds, n_names) 的得分矩阵
+    """
+    dx = name_centers[None, :, 0] - compound_centers[:, None, 0]
+    dy = name_centers[None, :, 1] - compound_centers[:, None, 1]
+
+    # 1. 距离项
+    dist = np.sqrt(dx ** 2 + dy ** 2)
+    distance_score = np.maximum(0, 1 - np.minimum(dist / max_dist, 1))
+
+    # 2. 方向项（优先级：下方 > 上方 > 右侧 > 左侧）
+    abs_dx, abs_dy = np.abs(dx), np.abs(dy)
+    side = threshold * 0.7
+    below = (dy > 0) & (dy < threshold) & (abs_dx < side)
+    above = (dy < 0) & (abs_dy < threshold) & (abs_dx < side)
+    right = (dx > 0) & (dx < threshold) & (abs_dy < side)
+    left = (dx < 0) & (abs_dx < threshold) & (abs_dy < side)
+    direction_score = np.select(
+        [below, above, right, left],
+        [below_weight, below_weight * 0.3, below_weight * 0.2, below_weight * 0.1],
+        default=0.0
+    )
+    return dist_weight * distance_score + direction_score
+
+
+def match_compound_name(
+    compound_detections: List[Dict],
+    name_detections: List[Dict],
+    dist_weight: Optional[float] = None,
+    below_weight: Optional[float] = None,
+    min_confidence: Optional[float] = None,
+    method: Optional[str] = None,
+    image_resolution: Optional[Tuple[int, int]] = None,
+    params: Optional[Dict[str, Any]] = None
 ) -> List[Dict[str, Any]]:
     """
-    使用全局最优策略匹配化合物与其名称：
-    1. 计算所有 (compound, name) 对的匹配分数
-    2. 按分数从高到低排序
-    3. 依次配对，跳过已匹配的 compound 或 name
+    匹配化合物与其名称：
+    0. 参数取自 params（默认 DEFAULT_MATCH_PARAMS），显式传入的 dist_weight / below_weight / min_confidence 优先；
+       距离上限与方向阈值按 match_scale 归一化
+    1. 用 NumPy 一次性计算所有 (compound, name) 对的匹配分数矩阵
+    2. method="hungarian"：最大化总分的一对一最优分配（scipy.optimize.linear_sum_assignment）
+       method="greedy"：按分数从高到低依次配对，跳过已匹配的 compound 或 name
+    低于 min_confidence 的配对不会被接受；结果按分数降序排列
     """
-    logger.info(f"Starting global optimal matching: {len(compound_detections)} compounds, {len(name_detections)} names")
+    method = method or Config.COMPOUND_MATCH_METHOD
+    if method == "hungarian" and linear_sum_assignment is None:
+        logger.warning("scipy is not installed, falling back to greedy matching")
+        method = "greedy"
+    logger.info(f"Starting {method} matching: {len(compound_detections)} compounds, {len(name_detections)} names")
 
-    # Step 1: 构建所有有效匹配对及其分数
-    all_pairs = []
+    compounds = []
     for comp in compound_detections:
-        if not isinstance(comp.get("bbox"), (list, tuple)) or len(comp["bbox"]) != 4:
+        if not _valid_bbox(comp):
             logger.warning(f"Invalid compound bbox: {comp}")
             continue
-        compound_id = comp["bbox_id"]
-        compound_center = get_bbox_center(comp["bbox"])
-        
-        for name_det in name_detections:
-            if not isinstance(name_det.get("bbox"), (list, tuple)) or len(name_det["bbox"]) != 4:
+        compounds.append(comp)
+    names = [name_det for name_det in name_detections if _valid_bbox(name_det)]
+    if not compounds or not names:
+        logger.info("Matching complete. Found 0 matches.")
+        return []
+
+    p = _resolve_params(compounds, image_resolution, params,
+                        dist_weight=dist_weight, below_weight=below_weight, min_confidence=min_confidence)
+    scores = score_matrix(_centers(compounds), _centers(names), p["dist_weight"], p["below_weight"],
+                          p["max_dist"], p["threshold"])
+    valid = scores >= p["min_confidence"]
+
+    if method == "hungarian":
+        # 无效配对得分记为 0，分配后剔除
+        rows, cols = linear_sum_assignment(np.where(valid, scores, 0.0), maximize=True)
+        pairs = [(r, c) for r, c in zip(rows, cols) if valid[r, c]]
+        pairs.sort(key=lambda rc: scores[rc], reverse=True)
+    else:
+        # 稳定排序，同分时保持 compound-major 顺序（与逐对循环实现一致）
+        order = np.argsort(-scores, axis=None, kind="stable")
+        pairs = []
+        used_compounds, used_names = set(), set()
+        limit = min(len(compounds), len(names))
+        for flat in order:
+            r, c = divmod(int(flat), len(names))
+            if not valid[r, c]:
+                break
+            if r in used_compounds or c in used_names:
                 continue
-            name_id = name_det["bbox_id"]
-            name_center = get_bbox_center(name_det["bbox"])
-            score = calculate_score(compound_center, name_center, dist_weight, below_weight)
-            
-            if score >= min_confidence:
-                name_text = name_det.get("text") or name_det.get("name", "")
-                all_pairs.append({
-                    "compound_id": compound_id,
-                    "name_id": name_id,
-                    "name": name_text,
-                    "confidence": round(score, 3),
-                    "score": score  # 用于排序
-                })
-
-    # Step 2: 按分数降序排序
-    all_pairs.sort(key=lambda x: x["score"], reverse=True)
-
-    # Step 3: 贪心选择（但基于全局排序）
+            pairs.append((r, c))
+            used_compounds.add(r)
+            used_names.add(c)
+            if len(pairs) == limit:
+                break
+
     matches = []
-    used_compound_ids = set()
-    used_name_ids = set()
-
-    for pair in all_pairs:
-        cid = pair["compound_id"]
-        nid = pair["name_id"]
-        if cid in used_compound_ids or nid in used_name_ids:
-            continue  # 跳过已匹配的
-        # 接受该匹配
+    for r, c in pairs:
+        score = float(scores[r, c])
+        name_det = names[c]
         matches.append({
-            "compound_id": cid,
-            "name_id": nid,
-            "name": pair["name"],
-            "confidence": pair["confidence"]
+            "compound_id": compounds[r]["bbox_id"],
+            "name_id": name_det["bbox_id"],
+            "name": name_det.get("text") or name_det.get("name", ""),
+            "confidence": round(score, 3)
         })
-        used_compound_ids.add(cid)
-        used_name_ids.add(nid)
-        logger.debug(f"Global match: Compound {cid} ↔ Name {nid} ('{pair['name']}') score={pair['score']:.3f}")
+        logger.debug(f"Match: Compound {compounds[r]['bbox_id']} ↔ Name {name_det['bbox_id']} score={score:.3f}")
 
-    logger.info(f"Global matching complete. Found {len(matches)} matches.")
+    logger.info(f"Matching complete. Found {len(matches)} matches.")
     return matches
 
 
+def compute_match_margins(
+    compound_detections: List[Dict],
+    name_detections: List[Dict],
+    matches: List[Dict[str, Any]],
+    image_resolution: Optional[Tuple[int, int]] = None,
+    params: Optional[Dict[str, Any]] = None
+) -> Dict[Any, Dict[str, Any]]:
+    """
+    计算每个化合物几何匹配的置信边际：
+    - best: 该化合物与所有名称的最高分
+    - margin: min(最高分 - 次高分, 所配名称的得分 - 该名称与其他化合物的最高分)
+    - matched: 是否在 matches 中被分配了名称
+    无法计算（bbox 非法）的化合物 best / margin 为 None；参数与 match_compound_name 一致
+    """
+    compounds = [c for c in compound_detections if _valid_bbox(c)]
+    names = [n for n in name_detections if _valid_bbox(n)]
+    p = _resolve_params(compounds, image_resolution, params)
+    scores = score_matrix(_centers(compounds), _centers(names), p["dist_weight"], p["below_weight"],
+                          p["max_dist"], p["threshold"])
+    row_of = {c["bbox_id"]: i for i, c in enumerate(compounds)}
+    col_of = {n["bbox_id"]: j for j, n in enumerate(names)}
+
+    assigned = {m["compound_id"]: m["name_id"] for m in matches}
+    margins = {}
+    for comp in compound_detections:
+        cid = comp["bbox_id"]
+        nid = assigned.get(cid)
+        r = row_of.get(cid) if _valid_bbox(comp) else None
+        if r is None:
+            margins[cid] = {"best": None, "margin": None, "matched": nid is not None}
+            continue
+        row = scores[r]
+        ranked = np.sort(row)[::-1]
+        best = float(ranked[0]) if len(ranked) else 0.0
+        margin = best - float(ranked[1]) if len(ranked) > 1 else best
+        if nid is not None and nid in col_of and len(compounds) > 1:
+            column = np.delete(scores[:, col_of[nid]], r)
+            margin = min(margin, float(row[col_of[nid]] - column.max()))
+        margins[cid] = {"best": round(best, 3), "margin": round(margin, 3), "matched": nid is not None}
+    return margins
+
+
 class CompoundNameAgent(BaseAgent):
     
     def __init__(self, config: Optional[Dict[str, Any]] = None):
@@ -197,7 +390,8 @@ class CompoundNameAgent(BaseAgent):
                     self.logger.warning(f"No detection data found in section {i+1}, skipping.")
                     continue
                 section_str = json.dumps(input_data, ensure_ascii=False)
-                llm_result = self._extract_from_section(section_str)
+                image_resolution = section["detect"][0].get("image_resolution")
+                llm_result = self._extract_from_section(section_str, image_resolution, section.get("source_type"))
                 if llm_result is None or not isinstance(llm_result, list):
                     self.logger.warning(f"LLM extraction returned invalid result for section {i+1}: {llm_result}")
                     self.logger.warning(f"LLM extraction failed for section {i+1}, skipping.")
@@ -223,7 +417,8 @@ class CompoundNameAgent(BaseAgent):
             traceback.print_exc()
             return self.handle_error(state, e, "text_extraction_process")
     
-    def _extract_from_section(self, section: str):
+    def _extract_from_section(self, section: str, image_resolution: Optional[Tuple[int, int]] = None,
+                              source_type: Optional[str] = None):
         try:
             # 将输入数据解析为字典列表
             input_data = json.loads(section)
@@ -236,13 +431,12 @@ class CompoundNameAgent(BaseAgent):
                 self.logger.warning(f"No valid detections found in section.")
                 return []
 
-            # 执行匹配（可调节权重）
+            # 执行匹配（权重与阈值取该来源类型的校准参数，距离按分辨率归一化）
             matches = match_compound_name(
                 compound_detections=compound_detections,
                 name_detections=name_detections,
-                dist_weight=0.6,      # 距离占 60%
-                below_weight=0.4,     # 下方占 40%
-                min_confidence=0.0    # 最低置信度
+                image_resolution=image_resolution,
+                params=load_match_params(source_type)
             )
 
             # 打印匹配结果
@@ -1,5 +1,4 @@
 
-import base64
 import json
 import os
 import time
@@ -9,6 +8,7 @@ from PIL import Image
 from ..state import ChemistryExtractionState
 from . import BaseAgent
 from ..utils.llm_utils import call_llm, clean_json_response
+from ..utils.image_payload import encode_image_data_url
 from ..config import Config
 import copy
 
@@ -135,22 +135,9 @@ class CompoundNameAgent(BaseAgent):
     
     def _extract_from_section(self, section: Dict[str, str], image_path: str):
         try:
-            # 编码图像为base64
+            # 编码图像为base64（进程级缓存）
             self.logger.info(f"Analyzing image: {image_path}")
-            with open(image_path, "rb") as img_file:
-                base64_str = base64.b64encode(img_file.read()).decode('utf-8')
-            
-            # 确定MIME类型
-            ext = os.path.splitext(image_path)[1].lower()
-            mime_type = {
-                '.png': 'image/png',
-                '.jpg': 'image/jpeg',
-                '.jpeg': 'image/jpeg',
-                '.bmp': 'image/bmp',
-                '.gif': 'image/gif'
-            }.get(ext, 'image/png')
-            
-            image_url = f"data:{mime_type};base64,{base64_str}"
+            image_url = encode_image_data_url(image_path)
 
             # 构建消息
             messages = [
@@ -179,18 +166,20 @@ class CompoundNameAgent(BaseAgent):
             self.logger.error(f"Failed to analyze image {image_path}: {str(e)}")
             return None
 
-chemistry_extraction/agents/cyclic_reflective_compound_name_agent.py
+# chemistry_extraction/agents/cyclic_reflective_compound_name_agent.py
 
-import base64
 import json
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import Dict, Any, List, Tuple
 
 from ..state import ChemistryExtractionState
 from . import BaseAgent
 from ..utils.llm_utils import call_llm, clean_json_response
+from ..utils.image_payload import encode_image_data_url
 from ..config import Config
+from .compound_agent import match_compound_name, compute_match_margins, load_match_params
 import copy
 
 BBox = Tuple[int, int, int, int]  # x1, y1, x2, y2
@@ -367,50 +356,43 @@ class CompoundNameAgent(BaseAgent):
         self.max_rounds = Config.get("MAX_REFLECTION_ROUNDS", 2)
         self.convergence_tol = Config.get("REFLECTION_CONVERGENCE_TOLERANCE", 0.95)
         self.debug_trace = Config.get("DEBUG_REFLECTION_TRACE", False)
+        self.role_timeout = Config.get("REFLECTION_ROLE_TIMEOUT", 60)
+        self.max_workers = Config.get("COMPOUND_VLM_MAX_WORKERS", 4)
+        # 几何优先：几何匹配无歧义的化合物不再调用 VLM
+        self.hybrid = Config.get("COMPOUND_MATCH_HYBRID", True)
+        self.min_match_score = Config.get("COMPOUND_MATCH_MIN_SCORE", 0.35)
+        self.min_match_margin = Config.get("COMPOUND_MATCH_MIN_MARGIN", 0.15)
 
     def process(self, state: ChemistryExtractionState):
         try:
             metadata = {
                 "agent_start": time.time(),
                 "rounds_per_section": [],
-                "total_sections": 0
+                "total_sections": 0,
+                "geometric_sections": 0,
+                "escalated_sections": 0,
+                "ambiguous_compounds": 0,
+                "vlm_calls_avoided": 0
             }
             current_stage = ["cyclic_reflective_name_matching"]
 
             sections = state.get("yolo_detections", [])
-            results = []
-
-            for idx, section in enumerate(sections):
-                img_path = section["detect"][0]["visualized_image"] if section["detect"] else None
-                if not img_path or not os.path.exists(img_path):
-                    self.logger.warning(f"Image not found for section {idx + 1}, skipping.")
-                    continue
-
-                # 构建输入数据
-                input_data = self._build_detection_input(section["detect"])
-                input_json = json.dumps(input_data, ensure_ascii=False, indent=2)
-
-                # 阶段1：初始匹配
-                initial = self._initial_match(img_path, input_json)
-                if not isinstance(initial, list):
-                    initial = []
 
-                # 阶段2：循环反思
-                final, trace_log = self._cyclic_reflection_loop(img_path, input_data, initial)
+            # 各图像段落相互独立，并发处理；map 保证结果按输入顺序返回
+            max_workers = max(1, min(self.max_workers, len(sections) or 1))
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="compound-vlm") as executor:
+                outputs = list(executor.map(self._process_section, range(len(sections)), sections))
 
-                # 记录轮数
-                num_rounds = len(trace_log) if trace_log else 1
+            results = []
+            for output in outputs:
+                if output is None:
+                    continue
+                updated_section, num_rounds, hybrid_stats = output
                 metadata["rounds_per_section"].append(num_rounds)
-
-                # 更新 detect 并保存
-                updated_section = copy.deepcopy(section)
-                self._apply_matches_to_detection(updated_section["detect"], final)
-
+                for key, value in hybrid_stats.items():
+                    metadata[key] += value
                 results.append(updated_section)
 
-                if self.debug_trace:
-                    updated_section["_reflection_trace"] = trace_log
-
             # 完成
             metadata["total_sections"] = len(results)
             metadata["agent_end"] = time.time()
@@ -424,6 +406,91 @@ class CompoundNameAgent(BaseAgent):
         except Exception as e:
             return self.handle_error(state, e, "cyclic_reflective_compound_name_agent")
 
+    def _process_section(self, idx: int, section: Dict[str, Any]):
+        """单个图像段落：（几何预匹配 +）初始匹配 + 循环反思
+
+        返回 (更新后的段落, 轮数, 几何优先统计)，无图像时返回 None
+        """
+        img_path = section["detect"][0]["visualized_image"] if section["detect"] else None
+        if not img_path or not os.path.exists(img_path):
+            self.logger.warning(f"Image not found for section {idx + 1}, skipping.")
+            return None
+
+        # 构建输入数据
+        input_data = self._build_detection_input(section["detect"])
+        input_json = json.dumps(input_data, ensure_ascii=False, indent=2)
+        hybrid_stats = {"geometric_sections": 0, "escalated_sections": 0, "ambiguous_compounds": 0, "vlm_calls_avoided": 0}
+
+        confident, ambiguous = [], None
+        if self.hybrid:
+            confident, ambiguous, initial = self._geometric_match(
+                input_data, section["detect"][0].get("image_resolution"), section.get("source_type"))
+            if not ambiguous:
+                # 几何匹配无歧义：跳过初始匹配与至少一轮反思（1 + 4 次 VLM 调用）
+                self.logger.info(f"Section {idx + 1} resolved geometrically, skipping VLM")
+                hybrid_stats["geometric_sections"] = 1
+                hybrid_stats["vlm_calls_avoided"] = 5
+                updated_section = copy.deepcopy(section)
+                self._apply_matches_to_detection(updated_section["detect"], confident)
+                return updated_section, 0, hybrid_stats
+            # 仅歧义化合物需要 VLM；以几何结果作为初始匹配，省去一次初始 VLM 调用
+            hybrid_stats["escalated_sections"] = 1
+            hybrid_stats["ambiguous_compounds"] = len(ambiguous)
+            hybrid_stats["vlm_calls_avoided"] = 1
+        else:
+            # 阶段1：初始匹配
+            initial = self._initial_match(img_path, input_json)
+            if not isinstance(initial, list):
+                initial = []
+
+        # 阶段2：循环反思
+        final, trace_log = self._cyclic_reflection_loop(img_path, input_data, initial)
+        if ambiguous is not None:
+            final = self._merge_escalated(confident, final, ambiguous)
+
+        # 记录轮数
+        num_rounds = len(trace_log) if trace_log else 1
+
+        # 更新 detect 并保存
+        updated_section = copy.deepcopy(section)
+        self._apply_matches_to_detection(updated_section["detect"], final)
+
+        if self.debug_trace:
+            updated_section["_reflection_trace"] = trace_log
+
+        return updated_section, num_rounds, hybrid_stats
+
+    def _geometric_match(self, detection_data: List[Dict], image_resolution=None,
+                         source_type: str = None) -> Tuple[List[Dict], set, List[Dict]]:
+        """几何匹配并按边际划分：返回 (无歧义匹配, 歧义化合物 id 集合, 全部几何匹配)"""
+        compounds = [d for d in detection_data if d["class_id"] == 0]
+        names = [d for d in detection_data if d["class_id"] == 5]
+        if not compounds or not names:
+            return [], set(), []
+
+        params = load_match_params(source_type)
+        matches = match_compound_name(compounds, names, image_resolution=image_resolution, params=params)
+        margins = compute_match_margins(compounds, names, matches, image_resolution=image_resolution, params=params)
+        ambiguous = {
+            cid for cid, m in margins.items()
+            if not m["matched"] or m["best"] is None
+            or m["best"] < self.min_match_score or m["margin"] < self.min_match_margin
+        }
+        confident = [
+            {**m, "matched_by": "geometric"}
+            for m in matches if m["compound_id"] not in ambiguous
+        ]
+        return confident, ambiguous, matches
+
+    def _merge_escalated(self, confident: List[Dict], vlm_matches: List[Dict], ambiguous: set) -> List[Dict]:
+        """无歧义化合物保留几何结果，歧义化合物采用 VLM 结果（不得占用已被几何结果使用的名称）"""
+        used_names = {m["name_id"] for m in confident}
+        merged = list(confident)
+        for m in vlm_matches:
+            if m.get("compound_id") in ambiguous and m.get("name_id", -1) not in used_names:
+                merged.append(m)
+        return merged
+
     def _build_detection_input(self, detects: List[Dict]) -> List[Dict]:
         """标准化检测输入"""
         return [
@@ -467,11 +534,16 @@ class CompoundNameAgent(BaseAgent):
         for r in range(1, self.max_rounds + 1):
             self.logger.info(f"[Reflection Round {r}] Starting...")
 
-            # Step 1: 多角色并行反思（逻辑上串行模拟）
-            feedback = []
-            feedback.append(self._reflect_with_prompt(CHEMIST_PROMPT, image_path, current))
-            feedback.append(self._reflect_with_prompt(LAYOUT_ANALYST_PROMPT, image_path, current, detection_data=detection_data))
-            feedback.append(self._reflect_with_prompt(NAMER_RULES_PROMPT, image_path, current, text_names=text_names))
+            # Step 1: 多角色并行反思（每个角色受本轮截止时间约束，超时角色被丢弃）
+            roles = [
+                ("chemist", CHEMIST_PROMPT, {}),
+                ("layout_analyst", LAYOUT_ANALYST_PROMPT, {"detection_data": detection_data}),
+                ("namer", NAMER_RULES_PROMPT, {"text_names": text_names}),
+            ]
+            feedback, dropped = self._run_reflection_roles(roles, image_path, current)
+            if not feedback:
+                self.logger.warning(f"All reflection roles timed out in round {r}")
+                break
 
             # Step 2: 元协调器决策
             try:
@@ -502,6 +574,7 @@ class CompoundNameAgent(BaseAgent):
                     "round": r,
                     "matches": new_matches,
                     "feedback": feedback,
+                    "dropped_roles": dropped,
                     "summary": result_obj.get("summary", ""),
                     "converged": converged
                 })
@@ -520,8 +593,31 @@ class CompoundNameAgent(BaseAgent):
         self.logger.info("🔚 Max rounds reached or error occurred.")
         return current, trace_log
 
+    def _run_reflection_roles(self, roles: List[Tuple[str, str, Dict[str, Any]]], image_path: str,
+                              matches: List[Dict]) -> Tuple[List[Dict], List[str]]:
+        """并发调用各反思角色，返回 (按角色顺序的反馈, 超时被丢弃的角色名)"""
+        executor = ThreadPoolExecutor(max_workers=len(roles), thread_name_prefix="reflection-role")
+        try:
+            futures = [
+                executor.submit(self._reflect_with_prompt, prompt, image_path, matches,
+                                timeout=self.role_timeout, **kwargs)
+                for _, prompt, kwargs in roles
+            ]
+            wait(futures, timeout=self.role_timeout)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        feedback, dropped = [], []
+        for (name, _, _), future in zip(roles, futures):
+            if future.done() and not future.cancelled():
+                feedback.append(future.result())
+            else:
+                self.logger.warning(f"Reflection role '{name}' exceeded {self.role_timeout}s, dropped")
+                dropped.append(name)
+        return feedback, dropped
+
     def _reflect_with_prompt(self, prompt_template: str, image_path: str, matches: List[Dict],
-                            **kwargs) -> Dict:
+                            timeout: float = None, **kwargs) -> Dict:
         """调用单一角色反思"""
         try:
             prompt = prompt_template \
@@ -537,7 +633,8 @@ class CompoundNameAgent(BaseAgent):
                 model=self.reflection_model,
                 messages=[{"role": "user", "content": msg}],
                 max_tokens=1024,
-                temperature=0.1
+                temperature=0.1,
+                timeout=timeout
             )
             return json.loads(clean_json_response(resp))
         except Exception as e:
@@ -551,7 +648,7 @@ class CompoundNameAgent(BaseAgent):
                 if det["bbox_id"] == m["compound_id"] and det["class_id"] == 0:
                     det["name"] = m.get("name", "")
                     det["match_confidence"] = m.get("confidence", 0.8)
-                    det["matched_by"] = "cyclic_reflective_vlm"
+                    det["matched_by"] = m.get("matched_by", "cyclic_reflective_vlm")
                 if det["bbox_id"] == m.get("name_id",-1) and det["class_id"] == 5:
                     matched_name_ids.add(det["bbox_id"])
 
@@ -588,9 +685,5 @@ class CompoundNameAgent(BaseAgent):
         return clean_json_response(text)
 
     def _encode_image(self, image_path: str) -> str:
-        """编码图像为 base64 URL"""
-        ext = os.path.splitext(image_path)[1].lower()
-        mime = {'png': 'image/png', 'jpg': 'image/jpeg', 'jpeg': 'image/jpeg'}.get(ext[1:], 'image/png')
-        with open(image_path, "rb") as f:
-            b64 = base64.b64encode(f.read()).decode('utf-8')
-        return f"data:{mime};base64,{b64}"
+        """编码图像为 base64 URL（进程级缓存，各轮反思共用同一份编码）"""
+        return encode_image_data_url(image_path)
@@ -5,7 +5,9 @@ import time
 from typing import Dict, Any, List, Optional
 from ..state import ChemistryExtractionState
 from ..agents import BaseAgent
-from ..utils.llm_utils import call_llm, clean_json_response, robust_json_parse
+from ..utils.llm_utils import call_llm, call_llm_batch, clean_json_response, robust_json_parse, estimate_text_tokens
+from ..utils.local_fusion import LocalFusion
+from ..utils.chem_utils import canonical_smiles
 from ..config import Config
 FUSION_PROMPT = """
 你是化学反应融合引擎，严格以图像解析结果为主干，文本仅用于补充字段。
@@ -73,6 +75,91 @@ FUSION_PROMPT = """
 
 
 
+# 多图合并调用时追加的输出约定
+GROUP_FUSION_SUFFIX = """
+# 多图输入
+【图像解析】为数组，每项含 image_id 与 ocr_result；请对每个 image_id 分别按上述规则独立融合，不得跨图合并反应。
+输出格式改为：
+{"results": [{"image_id": int, "reactions": [...], "fusion_notes": string}]}
+""".strip()
+
+# 建索引时参与匹配的字段（SMILES / 名称 / 标签）
+_INDEX_KEYS = {"smiles", "name", "label", "aliases", "reactants", "products", "reagents", "substrate_label", "reaction_smiles"}
+_SMILES_KEYS = {"smiles", "reaction_smiles", "rxn_smiles"}
+# 自由文本中的化合物标签，如 "compound 3a"、"4a (85%)"、"S1"、"cmpd-12"
+_LABEL_PATTERN = re.compile(r"\b(?:[a-z]+-)?([a-z]?\d{1,3}[a-z]?)\b")
+
+
+def _normalize_token(value: str) -> str:
+    return re.sub(r"\s+", "", value).lower()
+
+
+def _string_tokens(value: str, smiles_field: bool) -> set:
+    """单个字符串的索引词：整串、规范 SMILES，以及（非 SMILES 时）其中出现的化合物标签"""
+    tokens = set()
+    parts = re.split(r">>|>|\.", value) if ">" in value else [value]
+    for part in parts:
+        token = _normalize_token(part)
+        if not token:
+            continue
+        tokens.add(token)
+        smiles = canonical_smiles(part) if smiles_field or " " not in part.strip() else None
+        if smiles:
+            tokens.add(smiles)
+        elif not smiles_field:
+            for match in _LABEL_PATTERN.finditer(part.lower()):
+                tokens.update((match.group(0), match.group(1)))
+    return tokens
+
+
+def _collect_tokens(value: Any, tokens: set, field: Optional[str] = None) -> None:
+    """递归收集索引字段下字符串的索引词（反应 SMILES 拆分为各组分）"""
+    if isinstance(value, dict):
+        for key, sub in value.items():
+            _collect_tokens(sub, tokens, field or (key if key in _INDEX_KEYS else None))
+    elif isinstance(value, list):
+        for sub in value:
+            _collect_tokens(sub, tokens, field)
+    elif field and isinstance(value, str) and value.strip():
+        tokens.update(_string_tokens(value, field in _SMILES_KEYS))
+
+
+class TextExtractionIndex:
+    """按 SMILES / 名称 / 标签为文本抽取结果建立倒排索引，为每张图像挑出相关的文本条目"""
+
+    def __init__(self, text_extractions: Any):
+        self.entries: List[Dict[str, Any]] = []  # {"key": 所属列表字段, "item": 条目}
+        self.extras: Dict[str, Any] = {}  # 非列表字段原样保留
+        self._postings: Dict[str, set] = {}
+        if isinstance(text_extractions, dict):
+            for key, value in text_extractions.items():
+                if isinstance(value, list):
+                    self.entries.extend({"key": key, "item": item} for item in value)
+                else:
+                    self.extras[key] = value
+        elif isinstance(text_extractions, list):
+            self.entries.extend({"key": "items", "item": item} for item in text_extractions)
+        for i, entry in enumerate(self.entries):
+            tokens = set()
+            _collect_tokens(entry["item"], tokens)
+            for token in tokens:
+                self._postings.setdefault(token, set()).add(i)
+
+    def lookup(self, tokens: set) -> set:
+        hits = set()
+        for token in tokens:
+            hits |= self._postings.get(token, set())
+        return hits
+
+    def subset(self, entry_ids: set) -> Dict[str, Any]:
+        """按原字段结构重建只含指定条目的文本抽取结果"""
+        result: Dict[str, Any] = dict(self.extras)
+        for i in sorted(entry_ids):
+            entry = self.entries[i]
+            result.setdefault(entry["key"], []).append(entry["item"])
+        return result
+
+
 class FusionAgent(BaseAgent):
     """融合文本和图像提取结果的智能体"""
     
@@ -89,26 +176,79 @@ class FusionAgent(BaseAgent):
             metadata['fusion_agent_start'] = time.time()
             current_stage = ["fusion"]
             
-            text_data = json.dumps(state["text_extractions"], ensure_ascii=False)
+            image_extractions = state["image_extractions"]
+            index = TextExtractionIndex(state.get("text_extractions") or {})
 
-            # 构建完整的prompt
-            fusion_results = []
-            for item in state["image_extractions"]:
+            # 先做本地确定性融合（RDKit 规范化 + Tanimoto 匹配），只有无法本地处理的图像才调用 LLM
+            results: Dict[int, Dict[str, Any]] = {}
+            if LocalFusion.available():
+                local_fusion = LocalFusion(state.get("text_extractions") or {})
+                for i, item in enumerate(image_extractions):
+                    fusion_result = local_fusion.fuse(item["ocr_result"], item.get("page_idx"), item.get("bbox"))
+                    if fusion_result is not None:
+                        fusion_result["fusion_method"] = "local"
+                        results[i] = fusion_result
+            residual = [i for i in range(len(image_extractions)) if i not in results]
+
+            # 为每张图像挑选相关文本条目，并按 token 预算把小图合并为一次调用
+            items = []
+            for item in image_extractions:
+                tokens = set()
+                _collect_tokens({"ocr_result": item["ocr_result"], "detect": item.get("detect", [])}, tokens)
+                # 没有任何命中时退回完整文本抽取结果（与逐图全文融合的行为一致）
+                entry_ids = index.lookup(tokens) or set(range(len(index.entries)))
                 image_data = json.dumps(item["ocr_result"], ensure_ascii=False)
-                full_prompt = FUSION_PROMPT
-                full_prompt = full_prompt.replace("@text_analysis@", text_data)
-                full_prompt = full_prompt.replace("@image_analysis@", image_data)
+                items.append({
+                    "image_data": image_data,
+                    "entry_ids": entry_ids,
+                    "tokens": estimate_text_tokens(image_data) + estimate_text_tokens(
+                        json.dumps(index.subset(entry_ids), ensure_ascii=False)),
+                })
+            groups = self._group_items(items, residual)
 
-            # 尝试获取有效JSON响应
-                fusion_result = self._get_valid_fusion_result(full_prompt)
-            
-                if fusion_result is None:
-                    self.logger.error("Failed to get valid fusion result after multiple attempts")
-                    return self._create_empty_fusion(state)
+            requests = [self._build_request(group, items, index) for group in groups]
+            responses = call_llm_batch(requests) if requests else []
+
+            # 合并调用解析失败或缺少某些 image_id 时，对缺失的图像逐张重试
+            llm_results: Dict[int, Dict[str, Any]] = {}
+            retry = []
+            for group, response in zip(groups, responses):
+                parsed = self._parse_group_response(group, response)
+                llm_results.update(parsed)
+                retry.extend(i for i in group if i not in parsed)
+            if retry:
+                self.logger.warning(f"Retrying {len(retry)} images individually")
+                retry_responses = call_llm_batch([self._build_request([i], items, index) for i in retry])
+                for i, response in zip(retry, retry_responses):
+                    llm_results.update(self._parse_group_response([i], response))
+            for fusion_result in llm_results.values():
+                fusion_result["fusion_method"] = "llm"
+            results.update(llm_results)
 
+            fusion_results = []
+            failed = []
+            for i, item in enumerate(image_extractions):
+                fusion_result = results.get(i)
+                if fusion_result is None:
+                    failed.append(i)
+                    continue
                 fusion_result['bbox'] = item['bbox']
                 fusion_result['page_idx'] = item['page_idx']
                 fusion_results.append(fusion_result)
+
+            if image_extractions and not fusion_results:
+                self.logger.error("Failed to get valid fusion result after multiple attempts")
+                return self._create_empty_fusion(state)
+
+            full_text_tokens = estimate_text_tokens(json.dumps(state.get("text_extractions") or {}, ensure_ascii=False))
+            metadata['fusion_local_images'] = len(image_extractions) - len(residual)
+            metadata['fusion_llm_images'] = len(residual)
+            metadata['fusion_calls'] = len(groups) + len(retry)
+            metadata['fusion_failed_images'] = failed
+            metadata['fusion_prompt_tokens'] = sum(estimate_text_tokens(r["messages"][0]["content"]) for r in requests)
+            metadata['fusion_prompt_tokens_baseline'] = sum(
+                estimate_text_tokens(FUSION_PROMPT) + full_text_tokens + estimate_text_tokens(it["image_data"]) for it in items
+            )
             current_stage.append('completed')
             metadata['fusion_agent_end'] = time.time()
             metadata['fusion_success'] = True
@@ -128,30 +268,63 @@ class FusionAgent(BaseAgent):
             traceback.print_exc()
             return self.handle_error(state, e, "fusion_process")
     
-    def _get_valid_fusion_result(self, full_prompt: str) -> Optional[Dict[str, Any]]:
-        """尝试获取有效的融合结果，支持重试机制"""
-        try:
-            self.logger.info(f"Calling LLM for data fusion ....")
-            response = call_llm(
-                model=self.model,
-                messages=[{"role": "user", "content": full_prompt}],
-                max_tokens=8192,
-                temperature=0.3,
-                response_format={"type": "json_object"}
-            )
-            
-            # 清理并验证JSON
-            paresed_response = robust_json_parse(response)
+    def _group_items(self, items: List[Dict[str, Any]], indices: List[int]) -> List[List[int]]:
+        """按顺序将相邻的小图打包，每组估算 token 不超过 FUSION_GROUP_TOKEN_BUDGET"""
+        budget = Config.FUSION_GROUP_TOKEN_BUDGET
+        max_size = max(1, Config.FUSION_MAX_GROUP_SIZE)
+        groups, current, current_tokens = [], [], 0
+        for i in indices:
+            item = items[i]
+            if current and (len(current) >= max_size or current_tokens + item["tokens"] > budget):
+                groups.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += item["tokens"]
+        if current:
+            groups.append(current)
+        return groups
 
-            return paresed_response
+    def _build_request(self, group: List[int], items: List[Dict[str, Any]], index: TextExtractionIndex) -> Dict[str, Any]:
+        entry_ids = set().union(*(items[i]["entry_ids"] for i in group))
+        text_data = json.dumps(index.subset(entry_ids), ensure_ascii=False)
+        if len(group) == 1:
+            image_data = items[group[0]]["image_data"]
+            full_prompt = FUSION_PROMPT
+        else:
+            image_data = "[" + ", ".join(
+                f'{{"image_id": {i}, "ocr_result": {items[i]["image_data"]}}}' for i in group
+            ) + "]"
+            full_prompt = FUSION_PROMPT + "\n\n" + GROUP_FUSION_SUFFIX
+        full_prompt = full_prompt.replace("@text_analysis@", text_data)
+        full_prompt = full_prompt.replace("@image_analysis@", image_data)
+        return {
+            "model": self.model,
+            "messages": [{"role": "user", "content": full_prompt}],
+            "max_tokens": 8192,
+            "temperature": 0.3,
+            "response_format": {"type": "json_object"},
+        }
 
-        except json.JSONDecodeError as je:
-            self.logger.warning(f"JSON decode error on attempt : {str(je)}")
+    def _parse_group_response(self, group: List[int], response: Any) -> Dict[int, Dict[str, Any]]:
+        """解析（合并）调用的响应，返回 {图像下标: 融合结果}"""
+        if isinstance(response, Exception):
+            self.logger.warning(f"Fusion call failed for images {group}: {str(response)}")
+            return {}
+        try:
+            parsed = robust_json_parse(response)
         except Exception as e:
-            self.logger.warning(f"Error on attempt : {str(e)}")
-        
-        return None
-    
+            self.logger.warning(f"Error parsing fusion result for images {group}: {str(e)}")
+            return {}
+        if not isinstance(parsed, dict):
+            return {}
+        if len(group) == 1:
+            return {group[0]: parsed}
+        results = {}
+        for entry in parsed.get("results", []):
+            if isinstance(entry, dict) and entry.get("image_id") in group:
+                image_id = entry.pop("image_id")
+                results[image_id] = entry
+        return results
 
     def _create_empty_fusion(self, state: ChemistryExtractionState):
         """创建空融合结果"""
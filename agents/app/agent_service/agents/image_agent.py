@@ -1,12 +1,14 @@
 # chemistry_extraction/agents/image_agent.py
-import base64
 import json
 import os
+import math
 import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import Dict, Any, List, Optional
 from ..state import ChemistryExtractionState
 from ..agents import BaseAgent
 from ..utils.llm_utils import call_llm, clean_json_response
+from ..utils.image_payload import encode_image_data_url
 from ..config import Config
 import copy
 
@@ -101,8 +103,8 @@ class ImageAnalysisAgent(BaseAgent):
             metadata = {}
             metadata['image_agent_start'] = time.time()
             current_stage = ["image_processing"]
-            image_extractions = []
 
+            tasks = []
             for i, section in enumerate(state["yolo_detections"]):
                 detections = section["detect"]
                 if not detections:
@@ -120,18 +122,31 @@ class ImageAnalysisAgent(BaseAgent):
                     for det in detections
                 ]
                 input_data_str = json.dumps(input_data, ensure_ascii=False, indent=2)
-
-                # 阶段1：初始分析
-                raw_result = self._analyze_single_image(image_path, input_data_str)
-
-                if not raw_result:
+                tasks.append((section, image_path, input_data_str))
+
+            # 各图像并发分析，每张图完成阶段1后立即进入反思；超时的图像被取消并跳过
+            max_workers = max(1, min(Config.IMAGE_ANALYSIS_MAX_WORKERS, len(tasks) or 1))
+            timeout = Config.IMAGE_ANALYSIS_TIMEOUT
+            executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-agent")
+            try:
+                futures = [executor.submit(self._process_image, image_path, input_data_str, timeout)
+                           for _, image_path, input_data_str in tasks]
+                overall_timeout = timeout * math.ceil(len(tasks) / max_workers) + 1 if tasks else None
+                wait(futures, timeout=overall_timeout)
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+            # 按输入顺序收集结果
+            image_extractions = []
+            timed_out = []
+            for (section, image_path, _), future in zip(tasks, futures):
+                if not future.done() or future.cancelled():
+                    self.logger.warning(f"Image analysis timed out, skipping: {image_path}")
+                    timed_out.append(os.path.basename(image_path))
+                    continue
+                final_result = future.result()
+                if not final_result:
                     continue
-
-                # 阶段2：反思修正（可选）
-                if self.enable_reflection:
-                    final_result = self._reflect_on_result(image_path, raw_result)
-                else:
-                    final_result = raw_result
 
                 # 添加来源
                 final_result["source_image"] = os.path.basename(image_path)
@@ -143,6 +158,8 @@ class ImageAnalysisAgent(BaseAgent):
 
             # 更新状态
             metadata['image_extractions_count'] = len(image_extractions)
+            metadata['image_analysis_max_workers'] = max_workers
+            metadata['image_analysis_timeouts'] = timed_out
             metadata['image_agent_end'] = time.time()
 
             self.logger.info(f"Image-agent: Processed {len(image_extractions)} images with reflection={self.enable_reflection}")
@@ -155,7 +172,22 @@ class ImageAnalysisAgent(BaseAgent):
         except Exception as e:
             return self.handle_error(state, e, "reflective_image_analysis")
 
-    def _analyze_single_image(self, image_path: str, input_data: str) -> Dict:
+    def _process_image(self, image_path: str, input_data: str, timeout: float) -> Optional[Dict]:
+        """单张图像的完整流水线：阶段1分析 + 可选反思，共享同一超时预算"""
+        deadline = time.monotonic() + timeout
+
+        # 阶段1：初始分析
+        raw_result = self._analyze_single_image(image_path, input_data, timeout=timeout)
+        if not raw_result:
+            return None
+
+        # 阶段2：反思修正（可选，剩余预算不足时跳过）
+        remaining = deadline - time.monotonic()
+        if self.enable_reflection and remaining > 1:
+            return self._reflect_on_result(image_path, raw_result, timeout=remaining)
+        return raw_result
+
+    def _analyze_single_image(self, image_path: str, input_data: str, timeout: Optional[float] = None) -> Dict:
         """第一阶段：初步图像理解"""
         try:
             self.logger.info(f"[Phase 1] Analyzing image: {image_path}")
@@ -170,7 +202,8 @@ class ImageAnalysisAgent(BaseAgent):
                 model=self.primary_model,
                 messages=[{"role": "user", "content": messages}],
                 max_tokens=4096,
-                temperature=0.2
+                temperature=0.2,
+                timeout=timeout
             )
 
             cleaned = clean_json_response(response)
@@ -181,7 +214,7 @@ class ImageAnalysisAgent(BaseAgent):
             self.logger.error(f"Initial analysis failed for {image_path}: {str(e)}")
             return self._empty_result()
 
-    def _reflect_on_result(self, image_path: str, initial_result: Dict) -> Dict:
+    def _reflect_on_result(self, image_path: str, initial_result: Dict, timeout: Optional[float] = None) -> Dict:
         """第二阶段：反思与修正"""
         try:
             self.logger.info(f"[Phase 2] Reflecting on initial result for: {image_path}")
@@ -200,7 +233,8 @@ class ImageAnalysisAgent(BaseAgent):
                 model=self.reflection_model,
                 messages=[{"role": "user", "content": messages}],
                 max_tokens=2048,
-                temperature=0.1  # 更确定
+                temperature=0.1,  # 更确定
+                timeout=timeout
             )
 
             # 提取最终JSON（可能包裹在文本中）
@@ -221,12 +255,8 @@ class ImageAnalysisAgent(BaseAgent):
             return initial_result  # 失败则保留原结果
 
     def _encode_image(self, image_path: str) -> str:
-        """编码图像为base64 URL"""
-        ext = os.path.splitext(image_path)[1].lower()
-        mime = {'png': 'image/png', 'jpg': 'image/jpeg', 'jpeg': 'image/jpeg'}.get(ext[1:], 'image/png')
-        with open(image_path, "rb") as f:
-            b64 = base64.b64encode(f.read()).decode('utf-8')
-        return f"data:{mime};base64,{b64}"
+        """编码图像为base64 URL（进程级缓存，阶段1与反思共用）"""
+        return encode_image_data_url(image_path)
 
     def _empty_result(self) -> Dict:
         """返回空但格式正确的默认结果"""
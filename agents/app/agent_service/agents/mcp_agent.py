@@ -5,7 +5,10 @@ from ..state import ChemistryExtractionState
 from ..agents import BaseAgent
 from ..tools.base_tool import BaseTool
 import os
+from concurrent.futures import ThreadPoolExecutor
+from ..config import Config
 from ..utils.result_export import extract_fusion_result
+from ..utils.mineru_cache import get_mineru_cache
 import copy
 
 class MCPAgent(BaseAgent):
@@ -23,14 +26,20 @@ class MCPAgent(BaseAgent):
             metadata[f"mcp_agent_start_{op}"]  = time.time()
             tool = BaseTool.get_tool(op, {})
             if op == "mineru_pdf_extraction":
-                file_name = os.path.basename(state["pdf_path"])
-                pdf_output_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), f"../../extracted_results/{file_name.split('.')[0]}_mineru_output")
-                if not os.path.exists(pdf_output_dir):
+                def extract_to(target_dir: str) -> None:
                     print("该文件首次解析，上传mineru开始解析")
                     result = tool.run({
                         "pdf_path": state["pdf_path"],
+                        "output_dir": target_dir,
                     })
-                    pdf_output_dir = result.data.get("pdf_output_dir", "")
+                    if not result.success:
+                        raise RuntimeError(f"MinerU extraction failed: {result.error}")
+
+                # 以 PDF 内容哈希为键复用解析结果，同一文档并发上传只解析一次
+                mineru_cache = get_mineru_cache()
+                pdf_output_dir, cache_hit = mineru_cache.get_or_extract(state["pdf_path"], extract_to)
+                metadata['mineru_cache_hit'] = cache_hit
+                metadata['mineru_cache_stats'] = mineru_cache.stats()
                 conetnt_json = ""
                 for file in os.listdir(pdf_output_dir):
                     if "content_list.json" in file:
@@ -57,7 +66,7 @@ class MCPAgent(BaseAgent):
                 result = tool.run({
                     'reaction_smiles': reaction_smiles
                 })
-                rxn_results = result.data
+                rxn_results = result.data if result.success else [{} for _ in reaction_smiles]
                 for i in range(len(extract_result)):
                     if rxn_results[i] != {}:
                         extract_result[i]['mapped_rxn'] = rxn_results[i]['mapped_rxn']
@@ -65,6 +74,7 @@ class MCPAgent(BaseAgent):
                     else:
                         extract_result[i]['mapped_rxn'] = ''
                         extract_result[i]['confidence'] = 0.0
+                metadata['rxn_mapper_stats'] = tool.rxn_mapper.stats()
                 metadata['f"mcp_agent_end_{op}"'] = time.time()
                 return{
                     'current_stage': current_stage,
@@ -72,19 +82,42 @@ class MCPAgent(BaseAgent):
                     'extported_result': extract_result
                 }
             elif op == "yolo_detector":
-                compound_detections = []
+                sections = []
                 for section in state["image_jsons"]:
                     image_path = os.path.join(state["pdf_output_dir"], section.get('img_path', ''))
                     if not os.path.exists(image_path):
                         self.logger.warning(f"Image path does not exist: {image_path}")
                         continue
+                    sections.append((section, image_path))
+
+                def detect(item):
+                    section, image_path = item
+                    start = time.time()
                     result = tool.run({
                         "image_path": image_path,
                     })
+                    return result, time.time() - start
+
+                # 各图像相互独立，并发调用检测服务；map 保证结果按页面顺序返回
+                max_workers = max(1, min(Config.YOLO_MAX_WORKERS, len(sections)))
+                with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="yolo") as executor:
+                    outputs = list(executor.map(detect, sections))
+
+                compound_detections = []
+                image_latencies = []
+                for (section, image_path), (result, latency) in zip(sections, outputs):
                     compound_detection = copy.deepcopy(section)
                     compound_detection['detect'] = result.data
                     compound_detections.append(compound_detection)
+                    image_latencies.append({
+                        "img_path": section.get('img_path', ''),
+                        "page_idx": section.get('page_idx'),
+                        "latency": round(latency, 3),
+                        "success": result.success,
+                    })
                 print(f"MCP Agent yolo_detector found {len(compound_detections)} image detections.")
+                metadata['yolo_image_latencies'] = image_latencies
+                metadata['yolo_max_workers'] = max_workers
                 metadata['f"mcp_agent_end_{op}"'] = time.time()
                 return{
                     'yolo_detections': compound_detections,
@@ -5,7 +5,9 @@ import time
 from typing import Dict, Any, List, Optional
 from ..state import ChemistryExtractionState
 from ..agents import BaseAgent
-from ..utils.llm_utils import call_llm, clean_json_response
+from ..utils.llm_utils import call_llm, call_llm_batch, clean_json_response
+from ..utils.text_chunker import chunk_sections
+from ..utils.relevance_filter import get_relevance_filter
 from ..config import Config
 import os
 import json
@@ -32,9 +34,14 @@ reactants, reagents, solvent, conditions, yields, products, experiments, descrip
 每个 compound 条目包含：
 name, label, aliases, smiles, properties, structural_notes, functional_role, evidence
 
+每个条目另含 source_text_index：所依据文本在输入数组中的 index 字段值。
+
 输出为 JSON 列表，字段缺失设为 null 或 []，SMILES 超过 200 字符则留空。
 """
 
+# 合并时附加的溯源字段（不参与去重比较）
+_PROVENANCE_FIELDS = ("source_text_index", "source_text_indices", "page_idx")
+
 class TextExtractionAgent(BaseAgent):
     """处理Markdown文本并提取化学信息的智能体"""
     
@@ -52,27 +59,35 @@ class TextExtractionAgent(BaseAgent):
             json_sections = state["text_jsons"]
             self.logger.info(f"Found {len(json_sections)} sections to process")
 
-            
-            # 处理每个相关部分
-            extractions = []
-            section_str = json.dumps([section.get('text', '') for section in json_sections], ensure_ascii=False)
-            extractions = self._extract_from_section(section_str)
-            # for i, section in enumerate(json_sections):
-            #     self.logger.info(f"Processing section {i+1}/{len(json_sections)}")
-            #     extraction = {}
-            #     # 调用LLM提取信息
-            #     section_str = json.dumps(section.get('text', ''), ensure_ascii=False)
-            #     extraction['result'] = self._extract_from_section(section_str)
-            #     extraction['source_text_index'] = i
-            #     if extraction:
-            #         extractions.append(extraction)
-            
+            # 本地相关性预筛选，跳过目录、参考文献等无反应信息的段落
+            include = None
+            if Config.TEXT_PREFILTER_ENABLED:
+                include, prefilter_report = get_relevance_filter().select(json_sections)
+                metadata['text_prefilter'] = prefilter_report
+                self.logger.info(
+                    f"Prefilter kept {prefilter_report['sections_kept']}/{prefilter_report['sections_total']} sections, "
+                    f"saved ~{prefilter_report['tokens_saved']} tokens"
+                )
+
+            # 按段落边界切分为 token 受限的分块，并发抽取后合并
+            chunks = chunk_sections(
+                json_sections,
+                max_tokens=Config.TEXT_CHUNK_SIZE,
+                overlap_tokens=Config.TEXT_CHUNK_OVERLAP,
+                include=include,
+            )
+            self.logger.info(f"Split into {len(chunks)} chunks (chunk_size={Config.TEXT_CHUNK_SIZE})")
+            chunk_results = self._extract_chunks(chunks)
+            extractions = self._merge_extractions(chunks, chunk_results, json_sections)
+            metadata['text_chunks'] = len(chunks)
+            metadata['text_chunk_failures'] = sum(1 for r in chunk_results if r is None)
+
             # 更新状态
             text_extractions = extractions
-            metadata['text_extractions_count'] = len(extractions)
+            metadata['text_extractions_count'] = sum(len(v) for v in extractions.values() if isinstance(v, list))
             metadata['text_agent_end'] = time.time()
 
-            self.logger.info(f"Successfully extracted {len(extractions)} text sections")
+            self.logger.info(f"Successfully extracted {metadata['text_extractions_count']} items from {len(chunks)} chunks")
             return {
                 'text_extractions': text_extractions,
                 'current_stage': current_stage,
@@ -84,25 +99,97 @@ class TextExtractionAgent(BaseAgent):
             traceback.print_exc()
             return self.handle_error(state, e, "text_extraction_process")
 
-    def _extract_from_section(self, section: Dict[str, str]):
-        """从单个部分提取化学信息"""
-        try:
-            full_prompt = PROMPT_REACTIONS.strip() + section + "\n\n"
-            
-            response = call_llm(
-                model=self.model,
-                messages=[{"role": "user", "content": full_prompt}],
-                max_tokens=8192,
-                temperature=0.1,
-                response_format={"type": "json_object"}
-            )
-            
-            cleaned = clean_json_response(response)
-            result = json.loads(cleaned)
-            
-            return result
-            
-        except Exception as e:
-            self.logger.error(f"Failed to extract from section {section}: {str(e)}")
-            print("llm response was:", response)
-            return None
+    def _build_request(self, chunk: List[Dict[str, Any]]) -> Dict[str, Any]:
+        section_str = json.dumps(
+            [{"index": unit["index"], "text": unit["text"]} for unit in chunk],
+            ensure_ascii=False,
+        )
+        full_prompt = PROMPT_REACTIONS.strip() + section_str + "\n\n"
+        return {
+            "model": self.model,
+            "messages": [{"role": "user", "content": full_prompt}],
+            "max_tokens": 8192,
+            "temperature": 0.1,
+            "response_format": {"type": "json_object"},
+        }
+
+    def _extract_chunks(self, chunks: List[List[Dict[str, Any]]]) -> List[Optional[Dict[str, Any]]]:
+        """并发抽取所有分块，结果与分块顺序一致，失败项为 None"""
+        responses = call_llm_batch([self._build_request(chunk) for chunk in chunks])
+        results = []
+        for i, response in enumerate(responses):
+            if isinstance(response, Exception):
+                self.logger.error(f"Failed to extract from chunk {i}: {str(response)}")
+                results.append(None)
+                continue
+            try:
+                result = json.loads(clean_json_response(response))
+                results.append(result if isinstance(result, dict) else {"items": result})
+            except Exception as e:
+                self.logger.error(f"Failed to parse chunk {i}: {str(e)}")
+                print("llm response was:", response)
+                results.append(None)
+        return results
+
+    def _merge_extractions(
+        self,
+        chunks: List[List[Dict[str, Any]]],
+        chunk_results: List[Optional[Dict[str, Any]]],
+        sections: List[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """合并各分块结果：列表字段按内容去重（重叠区域会重复抽取），并保留 source_text_indices / page_idx"""
+        merged: Dict[str, Any] = {}
+        seen: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for chunk, result in zip(chunks, chunk_results):
+            if not result:
+                continue
+            chunk_indices = sorted({unit["index"] for unit in chunk})
+            for key, value in result.items():
+                # 提示词允许缺失字段为 null，按空列表处理，避免占住列表字段
+                if value is None:
+                    value = []
+                if not isinstance(value, list):
+                    merged.setdefault(key, value)
+                    continue
+                items = merged.get(key)
+                if not isinstance(items, list):
+                    items = merged[key] = []
+                key_seen = seen.setdefault(key, {})
+                for item in value:
+                    if not isinstance(item, dict):
+                        if item not in items:
+                            items.append(item)
+                        continue
+                    indices = self._source_indices(item.get("source_text_index"), chunk_indices, len(sections))
+                    body = {k: v for k, v in item.items() if k not in _PROVENANCE_FIELDS}
+                    signature = json.dumps(body, ensure_ascii=False, sort_keys=True)
+                    existing = key_seen.get(signature)
+                    if existing is None:
+                        existing = {**body, "source_text_indices": [], "page_idx": []}
+                        key_seen[signature] = existing
+                        items.append(existing)
+                    for idx in indices:
+                        if idx not in existing["source_text_indices"]:
+                            existing["source_text_indices"].append(idx)
+                        page = sections[idx].get("page_idx")
+                        if page is not None and page not in existing["page_idx"]:
+                            existing["page_idx"].append(page)
+        for items in seen.values():
+            for item in items.values():
+                item["source_text_indices"].sort()
+                item["page_idx"].sort()
+        return merged
+
+    @staticmethod
+    def _source_indices(value: Any, chunk_indices: List[int], total: int) -> List[int]:
+        """解析 LLM 给出的 source_text_index，缺失或越界时退化为整个分块的段落下标"""
+        values = value if isinstance(value, list) else [value]
+        indices = []
+        for v in values:
+            try:
+                idx = int(v)
+            except (TypeError, ValueError):
+                continue
+            if 0 <= idx < total and idx in chunk_indices:
+                indices.append(idx)
+        return indices or chunk_indices
@@ -168,10 +168,14 @@
 
 # chemistry_extraction/main.py
 from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, FileResponse
+from contextlib import asynccontextmanager
+import asyncio
 import os
 import json
-from typing import Dict, Any
+import uuid
+import shutil
+from typing import Dict, Any, Callable, Optional
 from datetime import datetime
 from .utils.draw_result_export import (
     export_text_draw_result,
@@ -179,7 +183,15 @@ from .utils.draw_result_export import (
     export_extported_result_draw_result
 )
 from .state import ChemistryExtractionState
-from .workflow import ChemistryWorkflow
+from .workflow import WorkflowRegistry
+from .task_executor import WorkflowExecutor, TaskQueueFullError
+from .job_store import get_job_store, JOB_PENDING, JOB_PROCESSING, JOB_COMPLETED, JOB_FAILED
+from .utils.mineru_cache import get_mineru_cache
+from .utils.llm_cache import get_llm_cache
+from .utils.image_payload import get_image_payload_cache
+from .utils.rxn_cache import get_rxn_cache
+from .tools.registry import ToolRegistry
+from .tools.circuit_breaker import breaker_states
 from .config import Config
 
 # 配置目录
@@ -189,7 +201,37 @@ OUTPUT_DIR = "output"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-app = FastAPI(title="Chemistry Information Extraction API", version="1.0")
+# 工作流执行器：阻塞的提取流程在独立线程池中运行，不阻塞事件循环
+workflow_executor = WorkflowExecutor(
+    max_workers=Config.MAX_CONCURRENT_TASKS,
+    max_queue_size=Config.MAX_QUEUED_TASKS,
+    retry_after=Config.QUEUE_RETRY_AFTER,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 启动时预编译所有工作流，请求路径上不再构建智能体和图
+    WorkflowRegistry.warm_up()
+    # 预热工具（rxnmapper 模型加载等），模型加载耗时不再落在请求路径上
+    ToolRegistry.startup(Config.TOOL_WARMUP)
+    # 恢复重启前未完成的异步任务（首次访问时创建任务库）
+    resume_unfinished_jobs()
+    yield
+    workflow_executor.shutdown(wait=False)
+    ToolRegistry.shutdown()
+
+
+app = FastAPI(title="Chemistry Information Extraction API", version="1.0", lifespan=lifespan)
+
+
+@app.exception_handler(TaskQueueFullError)
+async def task_queue_full_handler(request, exc: TaskQueueFullError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc), "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 # CORS
 from fastapi.middleware.cors import CORSMiddleware
@@ -208,41 +250,63 @@ Config.validate()
 # 💡 核心业务逻辑拆分
 # ======================
 
-def save_uploaded_pdf(pdf_file: UploadFile) -> str:
-    """保存上传的 PDF 文件，返回完整路径"""
+async def save_uploaded_pdf(pdf_file: UploadFile) -> str:
+    """保存上传的 PDF 文件到本次请求独立的目录（并发请求上传同名文件时互不覆盖），返回完整路径"""
     if not pdf_file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed.")
 
-    safe_filename = pdf_file.filename
-    file_path = os.path.join(UPLOAD_DIR, safe_filename)
+    request_dir = os.path.join(UPLOAD_DIR, str(uuid.uuid4()))
+    os.makedirs(request_dir, exist_ok=True)
+    file_path = os.path.join(request_dir, os.path.basename(pdf_file.filename))
 
-    with open(file_path, "wb") as f:
-        content = pdf_file.file.read()
-        f.write(content)
+    content = await pdf_file.read()
+    await asyncio.to_thread(_write_file, file_path, content)
 
     print(f"📄 Saved uploaded PDF to: {file_path}")
     return file_path
 
 
-def execute_workflow(file_path: str, agent: str) -> Dict[str, Any]:
-    """执行化学信息提取工作流，返回最终状态字典"""
+def _write_file(file_path: str, content: bytes) -> None:
+    with open(file_path, "wb") as f:
+        f.write(content)
+
+
+def _remove_upload(file_path: str) -> None:
+    """删除 save_uploaded_pdf 创建的请求目录"""
+    shutil.rmtree(os.path.dirname(file_path), ignore_errors=True)
+
+
+def execute_workflow(
+    file_path: str,
+    agent: str,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """执行化学信息提取工作流，返回最终状态字典
+
+    提供 on_progress 时以流式方式执行，每个节点完成后回调当前完整状态。
+    """
     initial_state = ChemistryExtractionState(
         pdf_path=file_path,
         current_stage=["initialized"],
     )
 
-    workflow = ChemistryWorkflow()
-    workflow.set_workflow(agent)
-    app_instance = workflow.compile()
+    app_instance = WorkflowRegistry.get(agent)
 
+    final_state = initial_state
     try:
         print(f"🚀 Running {agent} workflow...")
-        final_state = app_instance.invoke(initial_state)
+        # 统一以流式执行，异常退出时也能拿到最近的状态以释放 MinerU 缓存租约
+        for final_state in app_instance.stream(initial_state, stream_mode="values"):
+            if on_progress is not None:
+                on_progress(final_state)
         return dict(final_state)
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Extraction failed: {str(e)}")
+    finally:
+        if final_state.get("pdf_output_dir"):
+            get_mineru_cache().release(final_state["pdf_output_dir"])
 
 
 def export_results(final_state_dict: Dict[str, Any]) -> Dict[str, Any]:
@@ -307,19 +371,128 @@ def build_response(
     return response_data
 
 
+def run_extraction(
+    file_path: str,
+    agent: str,
+    is_translate: bool = False,
+    keys_to_include: list = None,
+    is_export_result: bool = False,
+) -> Dict[str, Any]:
+    """执行工作流并构建响应（阻塞，在工作流执行器中运行），结束后删除上传文件"""
+    try:
+        final_state = execute_workflow(file_path, agent)
+        return build_response(final_state, agent, is_translate, keys_to_include, is_export_result)
+    finally:
+        _remove_upload(file_path)
+
+
 async def handle_extraction_request(
     pdf_file: UploadFile,
     agent: str,
     is_translate: bool = False,
-    keys_to_include: list = None
+    keys_to_include: list = None,
+    is_export_result: bool = False,
 ) -> JSONResponse:
     """统一处理提取请求的入口"""
-    file_path = save_uploaded_pdf(pdf_file)
-    final_state = execute_workflow(file_path, agent)
-    response_data = build_response(final_state, agent, is_translate, keys_to_include)
+    # 队列已满时在读取上传内容前直接拒绝
+    workflow_executor.ensure_capacity()
+    file_path = await save_uploaded_pdf(pdf_file)
+    try:
+        future = workflow_executor.submit(
+            run_extraction, file_path, agent, is_translate, keys_to_include, is_export_result
+        )
+    except TaskQueueFullError:
+        await asyncio.to_thread(_remove_upload, file_path)
+        raise
+    try:
+        response_data = await asyncio.wrap_future(future)
+    finally:
+        # 上传目录由 run_extraction 在工作流结束后删除；请求在任务开始前被取消时在此清理
+        if future.cancelled():
+            _remove_upload(file_path)
     return JSONResponse(content=response_data)
 
 
+# ======================
+# 📨 异步任务（提交 / 轮询 / 下载）
+# ======================
+
+def run_extraction_job(task_id: str) -> None:
+    """执行一个异步提取任务，进度与结果写入 job_store"""
+    job_store = get_job_store()
+    job = job_store.get(task_id)
+    if job is None:
+        return
+    agent = job["agent"]
+    job_store.update(task_id, status=JOB_PROCESSING, error=None)
+    print(f"[WORKER] Executing {agent} task {task_id}...")
+
+    def on_progress(state: Dict[str, Any]) -> None:
+        job_store.update(
+            task_id,
+            current_stage=state.get("current_stage", []),
+            metadata=state.get("metadata", {}),
+        )
+
+    try:
+        final_state = execute_workflow(job["input_path"], agent, on_progress=on_progress)
+        response_data = build_response(final_state, agent, is_export_result=True)
+        result_path = os.path.join(OUTPUT_DIR, f"{task_id}_response.json")
+        with open(result_path, 'w', encoding='utf-8') as f:
+            json.dump(response_data, f, ensure_ascii=False, indent=2)
+        job_store.update(task_id, status=JOB_COMPLETED, result_path=result_path)
+        print(f"[WORKER] Task {task_id} ({agent}) completed.")
+    except Exception as e:
+        error_msg = e.detail if isinstance(e, HTTPException) else str(e)
+        print(f"[WORKER] Task {task_id} ({agent}) failed: {error_msg}")
+        job_store.update(task_id, status=JOB_FAILED, error=error_msg)
+
+
+def resume_unfinished_jobs() -> None:
+    """重新排队重启前未完成的任务"""
+    job_store = get_job_store()
+    for job in job_store.list_unfinished():
+        if not job["input_path"] or not os.path.exists(job["input_path"]):
+            job_store.update(job["task_id"], status=JOB_FAILED, error="Uploaded file lost before the task could run")
+            continue
+        try:
+            job_store.update(job["task_id"], status=JOB_PENDING)
+            workflow_executor.submit(run_extraction_job, job["task_id"])
+            print(f"[SYSTEM] Resumed task {job['task_id']} ({job['agent']}).")
+        except TaskQueueFullError:
+            job_store.update(job["task_id"], status=JOB_FAILED, error="Task queue full while resuming after restart")
+
+
+async def submit_extraction_job(pdf_file: UploadFile, agent: str) -> Dict[str, Any]:
+    """保存上传文件并提交异步任务，立即返回 task_id"""
+    if not pdf_file.filename.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="Only PDF files are allowed.")
+    workflow_executor.ensure_capacity()
+
+    # 每个任务独立目录，保留原始文件名
+    task_id = str(uuid.uuid4())
+    task_dir = os.path.join(UPLOAD_DIR, task_id)
+    os.makedirs(task_dir, exist_ok=True)
+    file_path = os.path.join(task_dir, os.path.basename(pdf_file.filename))
+    content = await pdf_file.read()
+    await asyncio.to_thread(_write_file, file_path, content)
+
+    job_store = get_job_store()
+    job_store.create(task_id, agent, pdf_file.filename, file_path)
+    try:
+        workflow_executor.submit(run_extraction_job, task_id)
+    except TaskQueueFullError:
+        job_store.update(task_id, status=JOB_FAILED, error="Task queue full")
+        raise
+
+    print(f"[API] {agent} task {task_id} queued.")
+    return {
+        "task_id": task_id,
+        "status": "submitted",
+        "message": f"{agent} task submitted, poll GET /task/{{task_id}} for status"
+    }
+
+
 # ======================
 # 🌐 API 路由（保持接口不变）
 # ======================
@@ -354,6 +527,65 @@ async def reaction(pdf_file: UploadFile = File(...)):
     )
 
 
+@app.post("/tasks/compound-extraction/", summary="Submit an asynchronous compound extraction task")
+async def submit_compound_extraction(pdf_file: UploadFile = File(...)):
+    return await submit_extraction_job(pdf_file, agent="compound_extraction")
+
+
+@app.post("/tasks/reaction-extraction/", summary="Submit an asynchronous reaction extraction task")
+async def submit_reaction_extraction(pdf_file: UploadFile = File(...)):
+    return await submit_extraction_job(pdf_file, agent="reaction_extraction")
+
+
+@app.get("/task/{task_id}", summary="Query asynchronous task status and stage progress")
+async def get_task_status(task_id: str):
+    job = get_job_store().get(task_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    response = {
+        "task_id": task_id,
+        "agent": job["agent"],
+        "filename": job["filename"],
+        "status": job["status"],
+        "current_stage": job["current_stage"],
+        "last_stage": job["current_stage"][-1] if job["current_stage"] else None,
+        "metadata": job["metadata"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+    if job["status"] == JOB_COMPLETED:
+        response["result_url"] = f"/task/{task_id}/result"
+        response["download_url"] = f"/download/{task_id}"
+    elif job["status"] == JOB_FAILED:
+        response["error"] = job.get("error") or "Unknown error"
+    return response
+
+
+def _get_completed_job(task_id: str) -> Dict[str, Any]:
+    job = get_job_store().get(task_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if job["status"] != JOB_COMPLETED:
+        raise HTTPException(status_code=400, detail=f"Task is not completed (status: {job['status']})")
+    if not job["result_path"] or not os.path.exists(job["result_path"]):
+        raise HTTPException(status_code=404, detail="Result file not found")
+    return job
+
+
+@app.get("/task/{task_id}/result", summary="Get the result of a completed task")
+async def get_task_result(task_id: str):
+    job = _get_completed_job(task_id)
+    with open(job["result_path"], 'r', encoding='utf-8') as f:
+        return JSONResponse(content=json.load(f))
+
+
+@app.get("/download/{task_id}", response_class=FileResponse, summary="Download the result file of a completed task")
+async def download_task_result(task_id: str):
+    job = _get_completed_job(task_id)
+    filename = f"{os.path.splitext(job['filename'])[0]}_{job['agent']}_results.json"
+    return FileResponse(path=job["result_path"], media_type="application/json", filename=filename)
+
+
 @app.get("/", summary="Root endpoint")
 def root():
     return {
@@ -362,6 +594,29 @@ def root():
             "/compound-extraction/ - POST (form-data: pdf_file)",
             "/reaction-extraction/ - POST (form-data: pdf_file)",
             "/compound/ - POST (minimal response)",
-            "/reaction/ - POST (minimal response)"
+            "/reaction/ - POST (minimal response)",
+            "/tasks/compound-extraction/ - POST (async, returns task_id)",
+            "/tasks/reaction-extraction/ - POST (async, returns task_id)",
+            "/task/{task_id} - GET (status and stage progress)",
+            "/task/{task_id}/result - GET (result JSON)",
+            "/download/{task_id} - GET (result file)",
+            "/health - GET"
         ]
     }
+
+
+@app.get("/health", summary="Health probe")
+def health():
+    llm_cache = get_llm_cache()
+    rxn_cache = get_rxn_cache()
+    return {
+        "status": "ok",
+        "workflows": WorkflowRegistry.list_compiled(),
+        "executor": workflow_executor.stats(),
+        "mineru_cache": get_mineru_cache().stats(),
+        "llm_cache": llm_cache.stats() if llm_cache else None,
+        "image_payload_cache": get_image_payload_cache().stats(),
+        "rxn_cache": rxn_cache.stats() if rxn_cache else None,
+        "tools": ToolRegistry.stats(),
+        "tool_breakers": breaker_states(),
+    }
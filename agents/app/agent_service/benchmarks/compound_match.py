@@ -0,0 +1,104 @@
+# chemistry_extraction/benchmarks/compound_match.py
+"""
+化合物-名称几何匹配微基准：逐对循环实现 vs NumPy 向量化实现（greedy / hungarian）
+
+用法（在 agents 目录下）：
+    python -m app.agent_service.benchmarks.compound_match [--sizes 10 50 200 500] [--repeat 5]
+"""
+import argparse
+import logging
+import random
+import time
+from typing import Dict, Any, List, Tuple
+
+from ..agents.compound_agent import calculate_score, get_bbox_center, match_compound_name, score_matrix, _centers
+
+# 与逐对循环实现一致的固定像素参数（max_dist=300, threshold=50）
+LEGACY_PARAMS = {"normalize": "pixel", "max_dist_ratio": 300, "threshold_ratio": 50}
+
+
+def legacy_match_compound_name(
+    compound_detections: List[Dict],
+    name_detections: List[Dict],
+    dist_weight: float = 0.6,
+    below_weight: float = 0.4,
+    min_confidence: float = 0.3
+) -> List[Dict[str, Any]]:
+    """向量化之前的逐对循环 + 全局排序贪心实现（作为基准与一致性参照）"""
+    all_pairs = []
+    for comp in compound_detections:
+        compound_center = get_bbox_center(comp["bbox"])
+        for name_det in name_detections:
+            score = calculate_score(compound_center, get_bbox_center(name_det["bbox"]), dist_weight, below_weight)
+            if score >= min_confidence:
+                all_pairs.append({
+                    "compound_id": comp["bbox_id"],
+                    "name_id": name_det["bbox_id"],
+                    "name": name_det.get("text") or name_det.get("name", ""),
+                    "confidence": round(score, 3),
+                    "score": score
+                })
+    all_pairs.sort(key=lambda x: x["score"], reverse=True)
+
+    matches, used_compound_ids, used_name_ids = [], set(), set()
+    for pair in all_pairs:
+        if pair["compound_id"] in used_compound_ids or pair["name_id"] in used_name_ids:
+            continue
+        matches.append({k: pair[k] for k in ("compound_id", "name_id", "name", "confidence")})
+        used_compound_ids.add(pair["compound_id"])
+        used_name_ids.add(pair["name_id"])
+    return matches
+
+
+def make_scheme(n_compounds: int, seed: int = 0) -> Tuple[List[Dict], List[Dict]]:
+    """生成网格状化合物表：每个化合物下方带一个略有抖动的名称框"""
+    rng = random.Random(seed)
+    cols = max(1, int(n_compounds ** 0.5))
+    compounds, names = [], []
+    for i in range(n_compounds):
+        x, y = (i % cols) * 160, (i // cols) * 180
+        compounds.append({"bbox_id": 2 * i, "class_id": 0, "bbox": [x, y, x + 120, y + 120]})
+        nx, ny = x + 40 + rng.uniform(-30, 30), y + 125 + rng.uniform(-10, 25)
+        names.append({"bbox_id": 2 * i + 1, "class_id": 5, "bbox": [nx, ny, nx + 40, ny + 15], "text": f"{i + 1}"})
+    rng.shuffle(names)
+    return compounds, names
+
+
+def _best_time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200, 500])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    logging.getLogger("app.agent_service.agents.compound_agent").setLevel(logging.WARNING)
+
+    print(f"{'compounds':>10} {'pairs':>8} {'legacy(ms)':>11} {'greedy(ms)':>11} {'hungarian(ms)':>14} {'greedy==legacy':>15} {'score gain':>11}")
+    for n in args.sizes:
+        compounds, names = make_scheme(n)
+        legacy = legacy_match_compound_name(compounds, names, min_confidence=0.0)
+        greedy = match_compound_name(compounds, names, min_confidence=0.0, method="greedy", params=LEGACY_PARAMS)
+        hungarian = match_compound_name(compounds, names, min_confidence=0.0, method="hungarian", params=LEGACY_PARAMS)
+
+        t_legacy = _best_time(lambda: legacy_match_compound_name(compounds, names, min_confidence=0.0), args.repeat)
+        t_greedy = _best_time(lambda: match_compound_name(compounds, names, min_confidence=0.0, method="greedy", params=LEGACY_PARAMS), args.repeat)
+        t_hungarian = _best_time(lambda: match_compound_name(compounds, names, min_confidence=0.0, method="hungarian", params=LEGACY_PARAMS), args.repeat)
+
+        # 用未取整的得分比较两种分配的总分
+        scores = score_matrix(_centers(compounds), _centers(names))
+        row = {c["bbox_id"]: i for i, c in enumerate(compounds)}
+        col = {d["bbox_id"]: j for j, d in enumerate(names)}
+        total = lambda ms: sum(scores[row[m["compound_id"]], col[m["name_id"]]] for m in ms)
+        print(f"{n:>10} {n * n:>8} {t_legacy * 1000:>11.2f} {t_greedy * 1000:>11.2f} {t_hungarian * 1000:>14.2f} "
+              f"{str(greedy == legacy):>15} {total(hungarian) - total(greedy):>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
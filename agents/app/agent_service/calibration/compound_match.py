@@ -0,0 +1,116 @@
+# chemistry_extraction/calibration/compound_match.py
+"""
+几何化合物-名称匹配参数校准：在标注样本上网格搜索 dist_weight / below_weight / 阈值，
+按来源类型保存最佳参数到 Config.COMPOUND_MATCH_PARAMS_PATH。
+
+标注文件为 JSON 列表，每个样本：
+    {
+      "detect": [{"bbox_id": 1, "class_id": 0, "bbox": [x1, y1, x2, y2]}, ...],   # yolo_detections 的 detect 结构
+      "image_resolution": [W, H],                                              # 可选，缺省取 detect[0]["image_resolution"]
+      "matches": [{"compound_id": 1, "name_id": 2}, ...]                       # 人工标注的正确配对
+    }
+
+用法（在 agents 目录下）：
+    python -m app.agent_service.calibration.compound_match labels.json --source-type mineru_300dpi
+"""
+import argparse
+import itertools
+import json
+import logging
+import time
+from typing import Dict, Any, List, Tuple
+
+from ..agents.compound_agent import match_compound_name, save_match_params
+
+# 不同归一化方式下比例参数的量级不同，分别给出搜索网格
+RATIO_GRIDS: Dict[str, Dict[str, List[float]]] = {
+    "median_box": {"max_dist_ratio": [1.5, 2.0, 2.5, 3.0, 4.0], "threshold_ratio": [0.5, 0.75, 1.0, 1.25]},
+    "diagonal": {"max_dist_ratio": [0.05, 0.1, 0.15, 0.2, 0.3], "threshold_ratio": [0.01, 0.02, 0.03, 0.05]},
+    "pixel": {"max_dist_ratio": [150, 200, 300, 400, 600], "threshold_ratio": [25, 50, 75, 100, 150]},
+}
+WEIGHT_GRID = {
+    "dist_weight": [0.4, 0.5, 0.6, 0.7, 0.8],
+    "below_weight": [0.2, 0.3, 0.4, 0.5, 0.6],
+    "min_confidence": [0.0, 0.1, 0.2, 0.3],
+}
+
+
+def load_samples(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        samples = json.load(f)
+    prepared = []
+    for sample in samples:
+        detect = sample["detect"]
+        resolution = sample.get("image_resolution") or (detect[0].get("image_resolution") if detect else None)
+        prepared.append({
+            "compounds": [d for d in detect if d["class_id"] == 0],
+            "names": [d for d in detect if d["class_id"] == 5],
+            "image_resolution": resolution,
+            "gold": {(m["compound_id"], m["name_id"]) for m in sample["matches"]},
+        })
+    return prepared
+
+
+def evaluate(samples: List[Dict[str, Any]], params: Dict[str, Any], method: str) -> Dict[str, float]:
+    """在全部样本上计算配对级 precision / recall / F1"""
+    tp = fp = fn = 0
+    for sample in samples:
+        predicted = {
+            (m["compound_id"], m["name_id"])
+            for m in match_compound_name(
+                sample["compounds"], sample["names"],
+                method=method, image_resolution=sample["image_resolution"], params=params
+            )
+        }
+        tp += len(predicted & sample["gold"])
+        fp += len(predicted - sample["gold"])
+        fn += len(sample["gold"] - predicted)
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": round(precision, 4), "recall": round(recall, 4), "f1": round(f1, 4)}
+
+
+def grid_search(samples: List[Dict[str, Any]], normalize_modes: List[str], method: str) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    best_params, best_metrics = None, {"f1": -1.0}
+    for normalize in normalize_modes:
+        grid = {**RATIO_GRIDS[normalize], **WEIGHT_GRID}
+        keys = list(grid)
+        for values in itertools.product(*(grid[k] for k in keys)):
+            params = {"normalize": normalize, **dict(zip(keys, values))}
+            metrics = evaluate(samples, params, method)
+            # F1 相同时优先精确率（误配比漏配代价更高：漏配会交给 VLM 兜底）
+            if (metrics["f1"], metrics["precision"]) > (best_metrics["f1"], best_metrics.get("precision", -1.0)):
+                best_params, best_metrics = params, metrics
+    return best_params, best_metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("labels", help="标注样本 JSON 文件")
+    parser.add_argument("--source-type", default="default", help="保存参数时使用的来源类型键")
+    parser.add_argument("--normalize", nargs="+", default=["median_box", "diagonal"], choices=list(RATIO_GRIDS))
+    parser.add_argument("--method", default="hungarian", choices=["hungarian", "greedy"])
+    parser.add_argument("--dry-run", action="store_true", help="只输出结果，不写入参数文件")
+    args = parser.parse_args()
+    logging.getLogger("app.agent_service.agents.compound_agent").setLevel(logging.WARNING)
+
+    samples = load_samples(args.labels)
+    start = time.time()
+    params, metrics = grid_search(samples, args.normalize, args.method)
+    print(f"Searched {len(samples)} samples in {time.time() - start:.1f}s")
+    print(f"Best params: {json.dumps(params, ensure_ascii=False)}")
+    print(f"Metrics: {json.dumps(metrics)}")
+
+    if not args.dry_run:
+        path = save_match_params(args.source_type, params, extra={
+            **metrics,
+            "samples": len(samples),
+            "method": args.method,
+            "calibrated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        })
+        print(f"Saved to {path} [{args.source_type}]")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 # chemistry_extraction/config.py
 import os
+import json
 from typing import Dict, List, Optional
 
 class Config:
@@ -17,14 +18,123 @@ class Config:
     TASK_ROUTING_MODEL: str = "qwen-plus"
     IMAGE_COMPOUND_DETECTION_MODEL: str = "qwen-vl-max"
     ARROW_DETECTION_MODEL: str = "qwen-vl-max"
+    # LLM 并发与限流
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))  # 全局同时进行的 LLM 请求数
+    LLM_DEFAULT_RPM: int = int(os.getenv("LLM_DEFAULT_RPM", "0"))  # 默认每分钟请求数上限，0 表示不限
+    LLM_DEFAULT_TPM: int = int(os.getenv("LLM_DEFAULT_TPM", "0"))  # 默认每分钟 token 上限，0 表示不限
+    # 按模型覆盖，如 {"qwen-plus": {"rpm": 600, "tpm": 1000000}}
+    LLM_RATE_LIMITS: Dict[str, Dict[str, int]] = json.loads(os.getenv("LLM_RATE_LIMITS", "{}"))
+    LLM_IMAGE_TOKEN_ESTIMATE: int = 1000  # 限流估算时每张图像计入的 token 数
+    # LLM 响应缓存
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "1") == "1"  # 全局开关，置 0 绕过缓存
+    LLM_CACHE_PATH: str = os.getenv("LLM_CACHE_PATH", "./output/llm_cache.sqlite3")
+    LLM_CACHE_TTL_DAYS: int = int(os.getenv("LLM_CACHE_TTL_DAYS", "7"))  # 0 表示不过期
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))  # 0 表示不限
+
     # 路径配置
     DEFAULT_IMAGE_DIR: str = "./images"
     OUTPUT_DIR: str = "./output"
     
     # 处理参数
-    MAX_CONCURRENT_TASKS: int = 3
-    TEXT_CHUNK_SIZE: int = 2000
+    MAX_CONCURRENT_TASKS: int = int(os.getenv("MAX_CONCURRENT_TASKS", "3"))  # 同时运行的工作流数
+    MAX_QUEUED_TASKS: int = int(os.getenv("MAX_QUEUED_TASKS", "10"))  # 排队等待的工作流数上限
+    QUEUE_RETRY_AFTER: int = int(os.getenv("QUEUE_RETRY_AFTER", "30"))  # 队列满时建议客户端重试的秒数
+    JOB_DB_PATH: str = os.getenv("JOB_DB_PATH", "./output/jobs.sqlite3")  # 异步任务持久化数据库
+    TEXT_CHUNK_SIZE: int = 2000  # 文本抽取每个分块的 token 上限
+    TEXT_CHUNK_OVERLAP: int = 200  # 相邻分块重叠的 token 数（按段落边界取整）
+    TEXT_PREFILTER_ENABLED: bool = os.getenv("TEXT_PREFILTER_ENABLED", "0") == "1"  # 文本抽取前的相关性预筛选（未充分验证，默认关闭）
+    TEXT_PREFILTER_MIN_SCORE: float = 2.0  # 关键词特征得分阈值
+    TEXT_PREFILTER_CLASSIFIER_PATH: str = os.getenv("TEXT_PREFILTER_CLASSIFIER_PATH", "")  # 可选 joblib 分类器
+    TEXT_PREFILTER_CLASSIFIER_THRESHOLD: float = 0.5
+    FUSION_GROUP_TOKEN_BUDGET: int = int(os.getenv("FUSION_GROUP_TOKEN_BUDGET", "6000"))  # 多图合并调用的输入 token 上限
+    FUSION_MAX_GROUP_SIZE: int = int(os.getenv("FUSION_MAX_GROUP_SIZE", "4"))  # 每次融合调用最多包含的图像数
+    FUSION_LOCAL_ENABLED: bool = os.getenv("FUSION_LOCAL_ENABLED", "1") == "1"  # 调用 LLM 前先做本地 RDKit 融合
+    FUSION_TANIMOTO_THRESHOLD: float = 0.9  # 图像/文本反应匹配的 Tanimoto 阈值（反应物+产物）
+    FUSION_FP_RADIUS: int = 2  # Morgan 指纹半径
+    FUSION_FP_BITS: int = 2048  # Morgan 指纹位数
     MIN_CONFIDENCE_SCORE: float = 0.7
+
+    # 内部模型服务地址（可通过环境变量指向本地替身服务）
+    SERVICE_ENDPOINTS: Dict[str, str] = {
+        "yolo": os.getenv("YOLO_SERVICE_URL", "http://192.168.1.239:6789"),
+        "smiles": os.getenv("SMILES_SERVICE_URL", "http://192.168.1.239:30869"),
+        "ocr": os.getenv("OCR_SERVICE_URL", "http://192.168.1.239:6788"),
+        "ollama": os.getenv("OLLAMA_HOST", "http://192.168.1.239:11434"),
+    }
+    # 各服务连接池大小
+    SERVICE_POOL_SIZES: Dict[str, int] = {
+        "yolo": int(os.getenv("YOLO_POOL_SIZE", "8")),
+        "smiles": int(os.getenv("SMILES_POOL_SIZE", "16")),
+        "ocr": int(os.getenv("OCR_POOL_SIZE", "16")),
+        "ollama": int(os.getenv("OLLAMA_POOL_SIZE", "4")),
+    }
+    HTTP_MAX_RETRIES: int = int(os.getenv("HTTP_MAX_RETRIES", "2"))  # 5xx / 连接错误重试次数
+    HTTP_BACKOFF_BASE: float = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))  # 退避基数（秒），带随机抖动
+
+    # YOLO 检测阶段并发数（按图像并发调用检测 / SMILES / OCR 服务）
+    YOLO_MAX_WORKERS: int = int(os.getenv("YOLO_MAX_WORKERS", "8"))
+    SAVE_CROP_SEGMENTS: bool = os.getenv("SAVE_CROP_SEGMENTS", "0") == "1"  # 调试用：将检测框裁剪图保存到 output/compound/segments
+
+    # 服务启动时预热的工具（逗号分隔，空表示不预热，首次使用时再创建）
+    TOOL_WARMUP: List[str] = [t for t in os.getenv(
+        "TOOL_WARMUP", "mineru_pdf_extraction,reaction_checker,yolo_detector").split(",") if t.strip()]
+
+    # MinerU 结果轮询：初始间隔、指数退避倍数与间隔上限（秒），以及轮询的硬截止时间
+    MINERU_POLL_INITIAL: float = float(os.getenv("MINERU_POLL_INITIAL", "1.0"))
+    MINERU_POLL_BACKOFF: float = float(os.getenv("MINERU_POLL_BACKOFF", "1.5"))
+    MINERU_POLL_MAX_INTERVAL: float = float(os.getenv("MINERU_POLL_MAX_INTERVAL", "30"))
+    MINERU_POLL_DEADLINE: float = float(os.getenv("MINERU_POLL_DEADLINE", "1800"))
+
+    # 工具执行：单次 run 的墙钟超时（秒，可通过 TOOL_TIMEOUTS 环境变量以 JSON 覆盖）、执行线程数与熔断参数
+    TOOL_TIMEOUTS: Dict[str, float] = {
+        "mineru_pdf_extraction": MINERU_POLL_DEADLINE + 300.0,  # 轮询截止时间 + 上传与下载解压
+        "reaction_checker": 300.0,  # 整篇文档的反应一次映射
+        "yolo_detector": 120.0,  # 单张图像：检测 + 批量 SMILES / OCR
+        **json.loads(os.getenv("TOOL_TIMEOUTS", "{}")),
+    }
+    TOOL_DEFAULT_TIMEOUT: float = 10.0
+    TOOL_MAX_WORKERS: int = int(os.getenv("TOOL_MAX_WORKERS", "16"))  # 每个工具同时执行的调用数
+    TOOL_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("TOOL_BREAKER_FAILURE_THRESHOLD", "5"))  # 连续失败多少次后熔断
+    TOOL_BREAKER_COOLDOWN: float = float(os.getenv("TOOL_BREAKER_COOLDOWN", "30"))  # 熔断后多少秒进入半开探测
+
+    # rxnmapper 原子映射：进程内共享一个模型，并发任务的反应合并成批
+    RXN_MAPPER_BATCH_SIZE: int = int(os.getenv("RXN_MAPPER_BATCH_SIZE", "32"))  # 每批最多反应数
+    RXN_MAPPER_BATCH_WAIT_MS: int = int(os.getenv("RXN_MAPPER_BATCH_WAIT_MS", "20"))  # 攒批等待时间（毫秒）
+    # 原子映射结果缓存（按规范化反应 SMILES）
+    RXN_CACHE_ENABLED: bool = os.getenv("RXN_CACHE_ENABLED", "1") == "1"
+    RXN_CACHE_PATH: str = os.getenv("RXN_CACHE_PATH", "./output/rxn_cache.sqlite3")
+    RXN_CACHE_MAX_ENTRIES: int = int(os.getenv("RXN_CACHE_MAX_ENTRIES", "200000"))  # 0 表示不限
+
+    # 图像分析阶段并发数与单图超时（秒，含反思阶段）
+    IMAGE_ANALYSIS_MAX_WORKERS: int = int(os.getenv("IMAGE_ANALYSIS_MAX_WORKERS", "4"))
+    IMAGE_ANALYSIS_TIMEOUT: float = float(os.getenv("IMAGE_ANALYSIS_TIMEOUT", "180"))
+
+    # VLM 图像编码缓存（按路径 + mtime），可选缩放与重新压缩以减少上传字节与图像 token
+    IMAGE_PAYLOAD_CACHE_MAX_BYTES: int = int(os.getenv("IMAGE_PAYLOAD_CACHE_MAX_BYTES", str(256 * 1024 ** 2)))
+    IMAGE_PAYLOAD_MAX_EDGE: int = int(os.getenv("IMAGE_PAYLOAD_MAX_EDGE", "0"))  # 最长边像素上限，0 表示不缩放
+    IMAGE_PAYLOAD_FORMAT: str = os.getenv("IMAGE_PAYLOAD_FORMAT", "")  # "JPEG" / "WEBP"，空表示保持原格式
+    IMAGE_PAYLOAD_QUALITY: int = int(os.getenv("IMAGE_PAYLOAD_QUALITY", "85"))
+
+    # 循环反思化合物命名：段落并发数与单个反思角色的每轮截止时间（秒）
+    COMPOUND_VLM_MAX_WORKERS: int = int(os.getenv("COMPOUND_VLM_MAX_WORKERS", "4"))
+    REFLECTION_ROLE_TIMEOUT: float = float(os.getenv("REFLECTION_ROLE_TIMEOUT", "60"))
+    # 几何优先：几何匹配得分与边际均达标的化合物不再交给 VLM
+    COMPOUND_MATCH_HYBRID: bool = os.getenv("COMPOUND_MATCH_HYBRID", "1") == "1"
+    COMPOUND_MATCH_MIN_SCORE: float = 0.35
+    COMPOUND_MATCH_MIN_MARGIN: float = 0.15
+    COMPOUND_MATCH_METHOD: str = os.getenv("COMPOUND_MATCH_METHOD", "hungarian")  # "hungarian" 或 "greedy"
+    # 几何匹配校准参数（按来源类型保存，见 calibration/compound_match.py）
+    COMPOUND_MATCH_PARAMS_PATH: str = os.getenv("COMPOUND_MATCH_PARAMS_PATH", "./output/compound_match_params.json")
+    COMPOUND_MATCH_SOURCE_TYPE: str = os.getenv("COMPOUND_MATCH_SOURCE_TYPE", "default")
+
+    # MinerU 解析结果缓存（按 PDF 内容 SHA-256）
+    MINERU_CACHE_DIR: str = os.getenv("MINERU_CACHE_DIR", "./extracted_results/cache")
+    MINERU_CACHE_MAX_BYTES: int = int(os.getenv("MINERU_CACHE_MAX_BYTES", str(5 * 1024 ** 3)))  # 0 表示不限制
+    MINERU_CACHE_MAX_AGE_DAYS: float = float(os.getenv("MINERU_CACHE_MAX_AGE_DAYS", "30"))  # 0 表示不过期
+    MINERU_CACHE_LEASE_TTL_HOURS: float = float(os.getenv("MINERU_CACHE_LEASE_TTL_HOURS", "6"))  # 未释放租约的兜底过期时间
+
+    # 调试配置
+    DEBUG_WORKFLOW: bool = os.getenv("DEBUG_WORKFLOW", "0") == "1"  # 编译时打印工作流 ASCII 图
     
     # 扩展配置 (支持动态添加)
     _extra_configs: Dict[str, any] = {}
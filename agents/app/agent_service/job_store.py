@@ -0,0 +1,118 @@
+# chemistry_extraction/job_store.py
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, Any, List, Optional
+
+from .config import Config
+
+# 任务状态
+JOB_PENDING = "pending"
+JOB_PROCESSING = "processing"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+_JSON_FIELDS = ("current_stage", "metadata")
+
+
+class JobStore:
+    """基于 SQLite 的异步提取任务持久化存储
+
+    记录任务状态、阶段进度与结果路径，服务重启后可通过 list_unfinished() 恢复未完成任务。
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    task_id TEXT PRIMARY KEY,
+                    agent TEXT NOT NULL,
+                    filename TEXT,
+                    input_path TEXT,
+                    status TEXT NOT NULL,
+                    current_stage TEXT,
+                    metadata TEXT,
+                    result_path TEXT,
+                    error TEXT,
+                    created_at REAL,
+                    updated_at REAL
+                )
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def create(self, task_id: str, agent: str, filename: str, input_path: str) -> None:
+        """登记新任务（pending）"""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (task_id, agent, filename, input_path, status, current_stage, metadata, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (task_id, agent, filename, input_path, JOB_PENDING, "[]", "{}", now, now),
+            )
+
+    def update(self, task_id: str, **fields: Any) -> None:
+        """更新任务字段（current_stage / metadata 自动序列化为 JSON）"""
+        if not fields:
+            return
+        values = []
+        for key, value in fields.items():
+            if key in _JSON_FIELDS:
+                value = json.dumps(value, ensure_ascii=False, default=str)
+            values.append(value)
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ? WHERE task_id = ?",
+                (*values, time.time(), task_id),
+            )
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """查询单个任务，不存在返回 None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE task_id = ?", (task_id,)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def list_unfinished(self) -> List[Dict[str, Any]]:
+        """列出未完成（pending / processing）的任务，按提交时间排序"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (JOB_PENDING, JOB_PROCESSING),
+            ).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def _row_to_dict(self, row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        for key in _JSON_FIELDS:
+            try:
+                job[key] = json.loads(job[key]) if job[key] else ([] if key == "current_stage" else {})
+            except json.JSONDecodeError:
+                job[key] = [] if key == "current_stage" else {}
+        return job
+
+
+_store_instance: Optional[JobStore] = None
+_store_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    """获取进程级任务存储（首次调用时创建数据库，导入模块不产生文件）"""
+    global _store_instance
+    if _store_instance is None:
+        with _store_lock:
+            if _store_instance is None:
+                _store_instance = JobStore(Config.JOB_DB_PATH)
+    return _store_instance
@@ -4,7 +4,7 @@ import json
 import argparse
 from typing import Dict, Any
 from .state import ChemistryExtractionState
-from .workflow import ChemistryWorkflow
+from .workflow import WorkflowRegistry
 from .config import Config
 from datetime import datetime
 
@@ -25,9 +25,7 @@ def main():
     agent = "compound_extraction"  # or "compound_extraction"
     # 创建并运行工作流
     print("🔄 Setting up workflow...")
-    workflow = ChemistryWorkflow()
-    workflow.set_workflow(agent)
-    app = workflow.compile()
+    app = WorkflowRegistry.get(agent)
     
     print("🚀 Starting extraction process...")
     print(type(initial_state))
@@ -0,0 +1,96 @@
+# chemistry_extraction/task_executor.py
+import asyncio
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, Callable
+
+logger = logging.getLogger("task_executor")
+
+
+class TaskQueueFullError(Exception):
+    """执行器已满（运行中 + 排队中达到上限）"""
+
+    def __init__(self, retry_after: int, message: str = "Too many extraction tasks in progress"):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class WorkflowExecutor:
+    """工作流专用执行器：固定大小线程池 + 有界等待队列
+
+    阻塞的工作流（MinerU、YOLO、LLM 调用）在独立线程池中运行，不占用事件循环；
+    同时运行的任务数不超过 max_workers，排队任务数不超过 max_queue_size，
+    超出时立即拒绝（TaskQueueFullError），由 API 层转换为 503 + Retry-After。
+    """
+
+    def __init__(self, max_workers: int, max_queue_size: int, retry_after: int = 30):
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue_size = max(0, int(max_queue_size))
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="workflow")
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue_size)
+        self._lock = threading.Lock()
+        self._running = 0
+        self._pending = 0
+        self._rejected = 0
+
+    def is_full(self) -> bool:
+        """是否已无空闲槽位"""
+        with self._lock:
+            return self._running + self._pending >= self.max_workers + self.max_queue_size
+
+    def ensure_capacity(self) -> None:
+        """提前检查容量（例如在读取上传文件前），已满则抛出 TaskQueueFullError"""
+        if self.is_full():
+            with self._lock:
+                self._rejected += 1
+            raise TaskQueueFullError(self.retry_after)
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """提交任务，无可用槽位时抛出 TaskQueueFullError"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            logger.warning("Workflow queue is full, rejecting task")
+            raise TaskQueueFullError(self.retry_after)
+
+        with self._lock:
+            self._pending += 1
+
+        def _wrapped():
+            with self._lock:
+                self._pending -= 1
+                self._running += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                self._slots.release()
+
+        try:
+            return self._executor.submit(_wrapped)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+            raise
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """在执行器中运行任务并异步等待结果"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> Dict[str, int]:
+        """当前执行器状态"""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue_size": self.max_queue_size,
+                "running": self._running,
+                "queued": self._pending,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,67 @@
+# chemistry_extraction/tests/test_api_utils_errors.py
+import pytest
+import requests
+
+from agent_service.tools.circuit_breaker import is_downstream_error
+from agent_service.utils import api_utils
+
+IMAGES = [("a.png", b"png-a"), ("b.png", b"png-b")]
+
+
+def _response(status, payload=b"{}"):
+    response = requests.Response()
+    response.status_code = status
+    response._content = payload
+    response.url = "http://svc/endpoint"
+    return response
+
+
+class _FakeClient:
+    def __init__(self, outcome):
+        self.outcome = outcome
+
+    def post(self, path, **kwargs):
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    monkeypatch.setattr(api_utils, "_SMILES_BATCH_SUPPORTED", True)
+
+    def _serve(outcome):
+        monkeypatch.setattr(api_utils, "get_service_client", lambda name: _FakeClient(outcome))
+    return _serve
+
+
+BATCH_FUNCS = [api_utils.convert_images_to_smiles, api_utils.convert_images_to_text]
+
+
+@pytest.mark.parametrize("convert", BATCH_FUNCS)
+@pytest.mark.parametrize("outcome", [
+    requests.ConnectionError("refused"),
+    requests.ReadTimeout("read"),
+    _response(503),
+])
+def test_service_failures_propagate(serve, convert, outcome):
+    serve(outcome)
+    with pytest.raises(requests.RequestException) as exc_info:
+        convert(IMAGES)
+    assert is_downstream_error(exc_info.value)
+
+
+@pytest.mark.parametrize("convert, empty", [
+    (api_utils.convert_images_to_smiles, None),
+    (api_utils.convert_images_to_text, ""),
+])
+@pytest.mark.parametrize("outcome", [_response(400), _response(200, b"not json")])
+def test_bad_responses_fall_back_to_empty(serve, convert, empty, outcome):
+    serve(outcome)
+    assert convert(IMAGES) == [empty, empty]
+
+
+def test_single_smiles_fallback_propagates_service_failures(serve):
+    serve(_response(502))
+    with pytest.raises(requests.HTTPError):
+        api_utils.convert_images_to_smiles(IMAGES[:1])
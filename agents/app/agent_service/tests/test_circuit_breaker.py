@@ -0,0 +1,157 @@
+# chemistry_extraction/tests/test_circuit_breaker.py
+import threading
+
+import requests
+
+from agent_service.tools import circuit_breaker
+from agent_service.tools.base_tool import BaseTool, ToolResult
+from agent_service.tools.circuit_breaker import CircuitBreaker, is_downstream_error
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_closed_open_half_open_closed(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    breaker = CircuitBreaker("t", failure_threshold=3, cooldown=30)
+
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.snapshot()["state"] == "closed"
+
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.snapshot() == {"state": "open", "consecutive_failures": 3, "retry_in": 30}
+    assert not breaker.allow()
+
+    clock.now += 30
+    # 冷却结束后只放行一个探测请求
+    assert breaker.allow()
+    assert breaker.snapshot()["state"] == "half_open"
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.snapshot() == {"state": "closed", "consecutive_failures": 0, "retry_in": None}
+    assert breaker.allow()
+
+
+def test_half_open_probe_failure_reopens(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    breaker = CircuitBreaker("t", failure_threshold=1, cooldown=10)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.snapshot()["state"] == "open"
+    assert not breaker.allow()
+
+
+def test_release_returns_half_open_probe(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    breaker = CircuitBreaker("t", failure_threshold=1, cooldown=10)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.snapshot()["state"] == "half_open"
+    assert breaker.allow()
+
+
+def _http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(response=response)
+
+
+def test_is_downstream_error():
+    assert is_downstream_error(requests.ConnectionError())
+    assert is_downstream_error(requests.ReadTimeout())
+    assert is_downstream_error(TimeoutError())
+    assert is_downstream_error(_http_error(503))
+    assert not is_downstream_error(_http_error(400))
+    assert not is_downstream_error(KeyError("image_path"))
+    assert not is_downstream_error(ValueError("bad smiles"))
+
+
+class _FakeTool(BaseTool):
+    name = "fake_tool"
+
+    def __init__(self, action, config=None):
+        super().__init__(config)
+        self.action = action
+        self.breaker = CircuitBreaker(self.name, failure_threshold=2, cooldown=60)
+
+    def execute(self, input_data):
+        return self.action(input_data)
+
+
+def test_input_failures_do_not_open_breaker():
+    def bad_input(_):
+        return ToolResult(success=False, data={}, tool_name="fake_tool", execution_time=0, error="no reactions")
+
+    def raises(_):
+        raise KeyError("reaction_smiles")
+
+    for action in (bad_input, raises):
+        tool = _FakeTool(action, {"timeout": 1})
+        for _ in range(5):
+            result = tool.run({})
+            assert not result.success and not result.downstream_error
+        assert result.breaker["state"] == "closed"
+        tool.shutdown()
+
+
+def test_downstream_failures_and_timeouts_open_breaker():
+    def unavailable(_):
+        raise requests.ConnectionError("refused")
+
+    tool = _FakeTool(unavailable, {"timeout": 1})
+    tool.run({})
+    result = tool.run({})
+    assert result.downstream_error
+    assert result.breaker["state"] == "open"
+    assert tool.run({}).error == "Circuit breaker open"
+    tool.shutdown()
+
+    release = threading.Event()
+    tool = _FakeTool(lambda _: release.wait(5), {"timeout": 0.05, "max_workers": 4})
+    tool.run({})
+    result = tool.run({})
+    assert "timed out" in result.error
+    assert result.breaker["state"] == "open"
+    release.set()
+    tool.shutdown()
+
+
+def test_saturated_pool_rejects_without_queueing():
+    started = threading.Event()
+    release = threading.Event()
+
+    def blocking(_):
+        started.set()
+        release.wait(5)
+        return {"ok": True}
+
+    tool = _FakeTool(blocking, {"timeout": 5, "max_workers": 1})
+    worker = threading.Thread(target=lambda: tool.run({}))
+    worker.start()
+    assert started.wait(5)
+
+    result = tool.run({})
+    assert not result.success and result.error.startswith("Tool busy")
+    assert result.breaker["state"] == "closed"
+
+    release.set()
+    worker.join(5)
+    # 名额在 execute 结束时归还，之后的调用正常执行
+    assert tool.run({}).success
+    tool.shutdown()
@@ -0,0 +1,30 @@
+# chemistry_extraction/tests/test_compound_match_defaults.py
+import pytest
+
+from agent_service.agents import compound_agent
+from agent_service.agents.compound_agent import load_match_params, match_compound_name
+from agent_service.benchmarks.compound_match import legacy_match_compound_name, make_scheme
+from agent_service.config import Config
+
+
+@pytest.fixture(autouse=True)
+def no_params_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "COMPOUND_MATCH_PARAMS_PATH", str(tmp_path / "missing.json"))
+
+
+@pytest.mark.parametrize("n, seed", [(4, 0), (25, 1), (60, 2)])
+def test_defaults_reproduce_pixel_matching(n, seed):
+    compounds, names = make_scheme(n, seed)
+    # 未校准时默认参数与旧的固定像素实现（max_dist=300, threshold=50）结果一致
+    expected = legacy_match_compound_name(compounds, names, min_confidence=0.0)
+    assert match_compound_name(compounds, names, method="greedy", params=load_match_params()) == expected
+
+
+def test_calibrated_params_override_defaults(tmp_path, monkeypatch):
+    path = tmp_path / "params.json"
+    monkeypatch.setattr(Config, "COMPOUND_MATCH_PARAMS_PATH", str(path))
+    compound_agent.save_match_params("patent", {"normalize": "median_box", "max_dist_ratio": 2.5, "threshold_ratio": 0.75})
+
+    assert load_match_params()["normalize"] == "pixel"
+    params = load_match_params("patent")
+    assert (params["normalize"], params["max_dist_ratio"], params["threshold_ratio"]) == ("median_box", 2.5, 0.75)
@@ -0,0 +1,39 @@
+# chemistry_extraction/tests/test_fusion_index.py
+import pytest
+
+from agent_service.agents.fusion_agent import TextExtractionIndex, _collect_tokens
+
+TEXT = {
+    "reactions": [
+        {"reactants": ["compound 3a", "MeOH"], "products": ["4a (85%)"], "yields": ["85%"], "solvent": "MeOH"},
+        {"reactants": ["cmpd-7"], "products": ["8"], "solvent": "THF"},
+    ],
+    "compounds": [{"name": "acetic acid", "smiles": "CC(O)=O"}],
+    "summary": "kept as-is",
+}
+
+
+def _image_tokens(ocr_result):
+    tokens = set()
+    _collect_tokens({"ocr_result": ocr_result}, tokens)
+    return tokens
+
+
+def test_image_labels_hit_free_text_reaction_entries():
+    index = TextExtractionIndex(TEXT)
+    hits = index.lookup(_image_tokens({"reactants": [{"name": "3a", "smiles": ""}], "products": []}))
+    assert index.subset(hits)["reactions"] == [TEXT["reactions"][0]]
+    hits = index.lookup(_image_tokens({"reactants": [{"name": "7", "smiles": ""}], "products": []}))
+    assert index.subset(hits)["reactions"] == [TEXT["reactions"][1]]
+
+
+def test_smiles_tokens_are_canonicalized():
+    pytest.importorskip("rdkit")
+    index = TextExtractionIndex(TEXT)
+    hits = index.lookup(_image_tokens({"reactants": [{"name": "", "smiles": "OC(C)=O"}]}))
+    assert index.subset(hits)["compounds"] == TEXT["compounds"]
+
+
+def test_subset_keeps_non_list_fields():
+    index = TextExtractionIndex(TEXT)
+    assert index.subset(set()) == {"summary": "kept as-is"}
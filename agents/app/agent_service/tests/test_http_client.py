@@ -0,0 +1,97 @@
+# chemistry_extraction/tests/test_http_client.py
+import asyncio
+
+import pytest
+import requests
+
+from agent_service.utils import http_client
+from agent_service.utils.http_client import ServiceClient
+
+
+def _response(status):
+    response = requests.Response()
+    response.status_code = status
+    return response
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(http_client.time, "sleep", lambda _: None)
+    client = ServiceClient("test", "http://svc", max_retries=2, backoff_base=0)
+    yield client
+    client.close()
+
+
+def _serve(client, monkeypatch, outcomes):
+    calls = []
+
+    def fake_request(method, url, **kwargs):
+        calls.append(method)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(client.session, "request", fake_request)
+    return calls
+
+
+@pytest.mark.parametrize("error", [requests.ConnectionError("refused"), requests.ConnectTimeout("connect")])
+def test_post_retries_connection_failures(client, monkeypatch, error):
+    calls = _serve(client, monkeypatch, [error, _response(200)])
+    assert client.post("/detect").status_code == 200
+    assert len(calls) == 2
+
+
+def test_post_retries_5xx(client, monkeypatch):
+    calls = _serve(client, monkeypatch, [_response(503), _response(502), _response(200)])
+    assert client.post("/detect").status_code == 200
+    assert len(calls) == 3
+
+
+def test_post_read_timeout_is_not_retried(client, monkeypatch):
+    calls = _serve(client, monkeypatch, [requests.ReadTimeout("read"), _response(200)])
+    with pytest.raises(requests.ReadTimeout):
+        client.post("/detect")
+    assert len(calls) == 1
+
+
+def test_get_read_timeout_is_retried(client, monkeypatch):
+    calls = _serve(client, monkeypatch, [requests.ReadTimeout("read"), _response(200)])
+    assert client.get("/health").status_code == 200
+    assert len(calls) == 2
+
+
+def test_async_post_retry_policy(client, monkeypatch):
+    httpx = pytest.importorskip("httpx")
+
+    async def no_sleep(_):
+        return None
+
+    monkeypatch.setattr(http_client.asyncio, "sleep", no_sleep)
+
+    def run(outcomes):
+        calls = []
+
+        def handler(request):
+            calls.append(request.method)
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return httpx.Response(outcome)
+
+        async def main():
+            loop = asyncio.get_running_loop()
+            client._async_clients[loop] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            try:
+                return await client.apost("/detect")
+            finally:
+                await client.aclose()
+
+        return asyncio.run(main()), calls
+
+    response, calls = run([httpx.ConnectError("refused"), 503, 200])
+    assert response.status_code == 200 and len(calls) == 3
+
+    with pytest.raises(httpx.ReadTimeout):
+        run([httpx.ReadTimeout("read"), 200])
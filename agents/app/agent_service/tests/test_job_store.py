@@ -0,0 +1,19 @@
+# chemistry_extraction/tests/test_job_store.py
+import os
+
+from agent_service import job_store
+from agent_service.config import Config
+
+
+def test_store_created_on_first_use(tmp_path, monkeypatch):
+    db_path = tmp_path / "jobs" / "jobs.sqlite3"
+    monkeypatch.setattr(Config, "JOB_DB_PATH", str(db_path))
+    monkeypatch.setattr(job_store, "_store_instance", None)
+    assert not os.path.exists(db_path)
+
+    store = job_store.get_job_store()
+    assert job_store.get_job_store() is store
+    assert os.path.exists(db_path)
+
+    store.create("t1", "reaction_extraction", "paper.pdf", "/tmp/paper.pdf")
+    assert [job["task_id"] for job in store.list_unfinished()] == ["t1"]
@@ -0,0 +1,51 @@
+# chemistry_extraction/tests/test_llm_cache_policy.py
+from types import SimpleNamespace
+
+import pytest
+
+from agent_service.utils import llm_utils
+from agent_service.utils.llm_cache import LLMCache
+
+
+class _FakeClient:
+    def __init__(self, content, finish_reason):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self._content = content
+        self._finish_reason = finish_reason
+
+    def _create(self, **params):
+        self.calls += 1
+        choice = SimpleNamespace(message=SimpleNamespace(content=self._content), finish_reason=self._finish_reason)
+        return SimpleNamespace(choices=[choice], usage=None)
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = LLMCache(str(tmp_path / "llm.db"))
+    monkeypatch.setattr(llm_utils, "get_llm_cache", lambda: cache)
+    return cache
+
+
+def _call_twice(monkeypatch, content, finish_reason, response_format=None):
+    client = _FakeClient(content, finish_reason)
+    monkeypatch.setattr(llm_utils, "get_client", lambda: client)
+    kwargs = {"model": "m", "messages": [{"role": "user", "content": "hi"}], "response_format": response_format}
+    assert llm_utils.call_llm(**kwargs) == content
+    assert llm_utils.call_llm(**kwargs) == content
+    return client.calls
+
+
+def test_complete_response_is_cached(cache, monkeypatch):
+    assert _call_twice(monkeypatch, '{"a": 1}', "stop", {"type": "json_object"}) == 1
+
+
+@pytest.mark.parametrize("finish_reason", ["length", "content_filter", None])
+def test_incomplete_response_is_not_cached(cache, monkeypatch, finish_reason):
+    assert _call_twice(monkeypatch, "partial", finish_reason) == 2
+
+
+def test_unparseable_json_is_not_cached(cache, monkeypatch):
+    assert _call_twice(monkeypatch, '{"a": [1, 2', "stop", {"type": "json_object"}) == 2
+    # 非 JSON 格式的请求不做解析校验
+    assert _call_twice(monkeypatch, '{"a": [1, 2', "stop") == 1
@@ -0,0 +1,102 @@
+# chemistry_extraction/tests/test_local_fusion.py
+import pytest
+
+pytest.importorskip("rdkit")
+
+from agent_service.utils.local_fusion import LocalFusion, completeness_score
+
+ACID = "OC(=O)c1ccccc1"
+ESTER = "COC(=O)c1ccccc1"
+
+IMAGE = {
+    "reactants": [{"name": "1", "smiles": "c1ccccc1C(O)=O"}, {"name": "MeOH", "smiles": "CO"}],
+    "products": [{"name": "3a", "smiles": ESTER}],
+    "catalysts": ["H2SO4"],
+    "conditions": ["80 °C"],
+    "reaction_smiles": None,
+}
+
+
+def _text(reaction, compounds=None):
+    return {"reactions": [reaction], "compounds": compounds or []}
+
+
+def test_match_above_threshold_attaches_text_fields():
+    text = _text({
+        "reactants": [ACID, "CO"], "products": [ESTER], "solvent": "MeOH",
+        "conditions": "reflux, 12 h", "yields": ["85%"], "reagents": ["H2SO4", "Et3N"],
+        "experiments": "Stirred at reflux.",
+    })
+    result = LocalFusion(text).fuse(IMAGE, page_idx=2, bbox=[1, 2, 3, 4])
+    reaction = result["reactions"][0]
+    assert reaction["rxn_smiles"] == "CO.O=C(O)c1ccccc1>>COC(=O)c1ccccc1"
+    assert reaction["solvent"] == "MeOH"
+    assert reaction["conditions"] == {"temp": "80 °C", "time": "12 h"}
+    assert reaction["yields"] == [{"value": 85.0, "unit": "%", "substrate_label": "3a"}]
+    assert [r["name"] for r in reaction["reagents"]] == ["H2SO4", "Et3N"]
+    assert reaction["evidence"] == {"source": "image", "page": 2, "boxes": [[1, 2, 3, 4]]}
+    assert reaction["completeness_score"] == 0.9
+
+
+def test_below_threshold_is_left_to_llm():
+    text = _text({"reactants": ["CCO"], "products": ["CC=O"], "yields": ["90%"]})
+    assert LocalFusion(text).fuse(IMAGE) is None
+
+
+def test_unresolved_labels_are_left_to_llm():
+    text = _text({"reactants": ["compound 1"], "products": ["3a"], "yields": ["85%"]}, [{"label": "3a"}])
+    fusion = LocalFusion(text)
+    assert fusion.text_reactions == []
+    assert fusion.fuse(IMAGE) is None
+
+
+def test_names_resolve_through_compound_list():
+    compounds = [
+        {"name": "benzoic acid", "label": "1", "smiles": ACID},
+        {"name": "methanol", "aliases": ["MeOH"], "smiles": "CO"},
+        {"name": "methyl benzoate", "label": "3a", "smiles": ESTER},
+    ]
+    text = _text({"reactants": ["1", {"name": "MeOH"}], "products": ["3 a"], "yields": "85 %"}, compounds)
+    result = LocalFusion(text).fuse(IMAGE)
+    assert result["reactions"][0]["yields"][0]["value"] == 85.0
+
+
+def test_image_without_reaction_and_invalid_smiles():
+    fusion = LocalFusion({})
+    assert fusion.fuse({"reactants": [], "products": [], "reaction_smiles": None})["reactions"] == []
+    broken = {**IMAGE, "products": [{"name": "3a", "smiles": "C1CC"}]}
+    assert fusion.fuse(broken) is None
+
+
+@pytest.mark.parametrize("value, expected", [
+    (["85%"], [85.0]),
+    ("yield 72.5 %", [72.5]),
+    ([{"value": 60, "substrate_label": "4b"}], [60.0]),
+    ([91, "n/a", 150, True], [91.0]),
+    (None, []),
+])
+def test_parse_yields(value, expected):
+    yields = LocalFusion._parse_yields(value, "3a")
+    assert [y["value"] for y in yields] == expected
+    assert all(y["unit"] == "%" for y in yields)
+
+
+def test_parse_yields_keeps_substrate_label():
+    assert LocalFusion._parse_yields([{"yield": "50%", "label": "4b"}], "3a")[0]["substrate_label"] == "4b"
+
+
+def test_completeness_score_rules():
+    assert completeness_score({}) == 0.0
+    full = {
+        "rxn_smiles": f"CO.{ACID}>>{ESTER}",
+        "reactants": [{"name": "1", "smiles": ACID}],
+        "products": [{"name": "3a", "smiles": ESTER}],
+        "solvent": "MeOH",
+        "conditions": {"temp": "80 °C", "time": "12 h"},
+        "yields": [{"value": 85}],
+        "atom_mapping_conf": 0.8,
+    }
+    assert completeness_score(full) == 1.0
+    assert completeness_score({**full, "rxn_smiles": "C1CC>>C", "atom_mapping_conf": 0.5}) == 0.7
+    assert completeness_score({**full, "conditions": {"temp": "80 °C", "time": None}}) == 0.8
+    assert completeness_score({**full, "products": [{"name": "", "smiles": ESTER}]}) == 0.9
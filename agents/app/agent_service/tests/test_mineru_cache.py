@@ -0,0 +1,101 @@
+# chemistry_extraction/tests/test_mineru_cache.py
+import os
+
+from agent_service.utils.mineru_cache import MinerUCache
+
+
+def _pdf(tmp_path, name):
+    path = tmp_path / f"{name}.pdf"
+    path.write_bytes(f"%PDF {name}".encode())
+    return str(path)
+
+
+def _extract(size):
+    def extract_to(target_dir):
+        with open(os.path.join(target_dir, "content_list.json"), "wb") as f:
+            f.write(b"x" * size)
+    return extract_to
+
+
+def test_leased_entries_survive_size_eviction(tmp_path):
+    cache = MinerUCache(str(tmp_path / "cache"), max_size_bytes=150)
+    first, hit = cache.get_or_extract(_pdf(tmp_path, "a"), _extract(100))
+    assert not hit
+    second, _ = cache.get_or_extract(_pdf(tmp_path, "b"), _extract(100))
+    # a 仍被工作流持有，超出上限也不能删除
+    assert os.path.isdir(first) and os.path.isdir(second)
+
+    cache.release(first)
+    cache.release(second)
+    third, _ = cache.get_or_extract(_pdf(tmp_path, "c"), _extract(100))
+    assert not os.path.isdir(first)
+    assert not os.path.isdir(second)
+    assert os.path.isdir(third)
+
+
+def test_cache_hit_takes_its_own_lease(tmp_path):
+    cache = MinerUCache(str(tmp_path / "cache"), max_size_bytes=150)
+    pdf = _pdf(tmp_path, "a")
+    entry, _ = cache.get_or_extract(pdf, _extract(100))
+    assert cache.get_or_extract(pdf, _extract(100)) == (entry, True)
+    cache.release(entry)
+    cache.get_or_extract(_pdf(tmp_path, "b"), _extract(100))
+    assert os.path.isdir(entry)
+    assert cache.stats()["leased"] == 2
+
+
+def test_expired_leases_stop_protecting(tmp_path):
+    cache = MinerUCache(str(tmp_path / "cache"), max_size_bytes=150, lease_ttl=1e-9)
+    first, _ = cache.get_or_extract(_pdf(tmp_path, "a"), _extract(100))
+    cache.get_or_extract(_pdf(tmp_path, "b"), _extract(100))
+    assert not os.path.isdir(first)
+
+
+def test_expired_leased_entry_is_replaced_without_deleting_it(tmp_path):
+    cache = MinerUCache(str(tmp_path / "cache"), max_age_seconds=60)
+    pdf = _pdf(tmp_path, "a")
+    old, _ = cache.get_or_extract(pdf, _extract(100))
+    # 条目过期，但仍有工作流持有租约
+    key = next(iter(cache._index))
+    cache._index[key]["created_at"] -= 120
+
+    new, hit = cache.get_or_extract(pdf, _extract(100))
+    assert not hit and new != old
+    assert os.path.isfile(os.path.join(old, "content_list.json"))
+    assert cache.stats()["retired"] == 1
+
+    # 旧目录的最后一个租约释放后才删除，新目录不受影响
+    cache.release(old)
+    assert not os.path.isdir(old)
+    assert os.path.isdir(new)
+    assert cache.stats()["retired"] == 0
+
+
+def test_retired_entry_removed_after_lease_ttl(tmp_path):
+    cache = MinerUCache(str(tmp_path / "cache"), max_age_seconds=60, lease_ttl=3600)
+    pdf = _pdf(tmp_path, "a")
+    old, _ = cache.get_or_extract(pdf, _extract(100))
+    key = next(iter(cache._index))
+    cache._index[key]["created_at"] -= 120
+    cache.get_or_extract(pdf, _extract(100))
+    assert os.path.isdir(old)
+
+    # 工作流未释放租约（异常退出），超过 lease_ttl 后由下一次淘汰清理
+    cache._leases[os.path.basename(old)] = [0.0]
+    cache.get_or_extract(_pdf(tmp_path, "b"), _extract(100))
+    assert not os.path.isdir(old)
+
+
+def test_index_from_previous_layout_still_hits(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache = MinerUCache(str(cache_dir))
+    pdf = _pdf(tmp_path, "a")
+    entry, _ = cache.get_or_extract(pdf, _extract(10))
+    key = next(iter(cache._index))
+    # 旧版本：目录名即键，索引没有 dir 字段
+    os.replace(entry, str(cache_dir / key))
+    del cache._index[key]["dir"]
+    cache._save_index()
+
+    reloaded = MinerUCache(str(cache_dir))
+    assert reloaded.get_or_extract(pdf, _extract(10)) == (str(cache_dir / key), True)
@@ -0,0 +1,60 @@
+# chemistry_extraction/tests/test_mineru_poll.py
+import pytest
+import requests
+
+from agent_service.tools import mineru_tool
+from agent_service.tools.mineru_tool import MinerUExtractTool
+
+
+class _Response:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.text = ""
+        self._payload = payload or {}
+
+    def json(self):
+        return self._payload
+
+
+def _done():
+    return _Response(200, {"data": {"extract_result": [{"state": "done", "full_zip_url": "https://x/r.zip"}]}})
+
+
+@pytest.fixture
+def tool(monkeypatch):
+    monkeypatch.setattr(mineru_tool.time, "sleep", lambda _: None)
+    tool = MinerUExtractTool({"poll_interval": 0.01, "poll_deadline": 60})
+    yield tool
+    tool.shutdown()
+
+
+def _serve(monkeypatch, responses):
+    calls = []
+
+    def fake_get(*args, **kwargs):
+        calls.append(1)
+        item = responses.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    monkeypatch.setattr(mineru_tool.requests, "get", fake_get)
+    return calls
+
+
+@pytest.mark.parametrize("status", [401, 403, 404])
+def test_client_errors_fail_fast(tool, monkeypatch, status):
+    calls = _serve(monkeypatch, [_Response(status), _done()])
+    assert tool._poll_result("batch") is None
+    assert len(calls) == 1
+
+
+def test_transient_errors_are_retried(tool, monkeypatch):
+    calls = _serve(monkeypatch, [
+        _Response(429),
+        _Response(503),
+        requests.ConnectionError("reset"),
+        _done(),
+    ])
+    assert tool._poll_result("batch") == "https://x/r.zip"
+    assert len(calls) == 4
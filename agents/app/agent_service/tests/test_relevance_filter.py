@@ -0,0 +1,51 @@
+# chemistry_extraction/tests/test_relevance_filter.py
+from agent_service.config import Config
+from agent_service.utils.relevance_filter import RelevanceFilter
+
+PROCEDURE_EN = (
+    "To a solution of compound 3a (1.20 g, 5.0 mmol) in dry THF (20 mL) was added NaH (0.24 g, 6.0 mmol) "
+    "at 0 °C. The mixture was stirred at room temperature for 2 h, quenched with water and extracted with EtOAc. "
+    "The residue was purified by column chromatography to give 4a as a white solid (1.05 g, 82% yield)."
+)
+PROCEDURE_ZH = "将化合物 3 (2.0 mmol) 溶于二氯甲烷 (10 mL)，滴加三乙胺，室温搅拌 4 小时，浓缩后柱层析纯化得白色固体，产率 75%。"
+CHARACTERIZATION = "1H NMR (400 MHz, CDCl3) δ 7.26 (m, 5H), 4.12 (q, 2H); HRMS (ESI) m/z calcd for C12H14O2 [M+H]+ 191.1067."
+HEADING = "Example 12"
+BOILERPLATE = [
+    "The authors declare no competing financial interest.",
+    "This work was supported by the National Natural Science Foundation of China.",
+    "[12] Smith, J. et al. J. Am. Chem. Soc. 2015, 137, 1234. doi:10.1021/jacs.5b00001",
+    "1. Introduction .......... 3",
+    "Copyright © 2020 Elsevier Ltd. All rights reserved.",
+]
+
+
+def _sections(*texts):
+    return [{"index": i, "text": text, "page_idx": 0} for i, text in enumerate(texts)]
+
+
+def _filter():
+    return RelevanceFilter(min_score=Config.TEXT_PREFILTER_MIN_SCORE)
+
+
+def test_procedure_paragraphs_are_kept():
+    sections = _sections(*BOILERPLATE, PROCEDURE_EN, PROCEDURE_ZH, CHARACTERIZATION)
+    keep, report = _filter().select(sections)
+    assert {len(BOILERPLATE), len(BOILERPLATE) + 1, len(BOILERPLATE) + 2} <= keep
+    assert report["sections_total"] == len(sections)
+
+
+def test_boilerplate_is_dropped():
+    sections = _sections(*BOILERPLATE, PROCEDURE_EN)
+    keep, report = _filter().select(sections)
+    assert keep == {len(BOILERPLATE)}
+    assert report["tokens_saved"] > 0
+
+
+def test_short_heading_before_procedure_kept_as_context():
+    keep, _ = _filter().select(_sections(BOILERPLATE[0], HEADING, PROCEDURE_EN))
+    assert keep == {1, 2}
+
+
+def test_keeps_everything_when_nothing_matches():
+    keep, _ = _filter().select(_sections(*BOILERPLATE[:2]))
+    assert keep == {0, 1}
@@ -0,0 +1,74 @@
+# chemistry_extraction/tests/test_rxn_mapper_service.py
+import time
+import threading
+
+import pytest
+
+pytest.importorskip("rdkit")
+
+from agent_service.tools import reaction_checker
+from agent_service.tools.reaction_checker import RxnMapperService
+
+RXNS = ["CCO>>CC=O", "CC(=O)O.OCC>>CC(=O)OCC", "c1ccccc1>>c1ccccc1Br"]
+
+
+class _FakeMapper:
+    """整批调用时按 mode 模拟失败；单条调用正常返回，"Br" 反应始终失败"""
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.calls = []
+
+    def map_reactions_with_info(self, rxns):
+        self.calls.append(list(rxns))
+        if len(rxns) > 1 and self.mode == "raise":
+            raise RuntimeError("CUDA out of memory")
+        if len(rxns) > 1 and self.mode == "short":
+            return [{"mapped_rxn": rxns[0], "confidence": 0.9}]
+        if len(rxns) == 1 and "Br" in rxns[0]:
+            raise ValueError("token sequence too long")
+        return [{"mapped_rxn": rxn, "confidence": 0.9} for rxn in rxns]
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    monkeypatch.setattr(reaction_checker, "get_rxn_cache", lambda: None)
+
+
+def _service(mapper):
+    service = RxnMapperService(batch_size=8, max_wait=0.05)
+    service._mapper = mapper
+    return service
+
+
+@pytest.mark.parametrize("mode", ["raise", "short"])
+def test_failed_batch_falls_back_to_single_reactions(mode):
+    mapper = _FakeMapper(mode)
+    service = _service(mapper)
+    results = service.map_reactions(RXNS, timeout=5)
+
+    assert [r.get("mapped_rxn") for r in results[:2]] == RXNS[:2]
+    # 单条重试仍失败的反应返回 {}，不影响其他反应
+    assert results[2] == {}
+    assert len(mapper.calls) == 1 + len(RXNS)
+    # 统计在 future 完成后由后台线程更新
+    deadline = time.monotonic() + 5
+    while service.stats()["batches"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    stats = service.stats()
+    assert stats["batch_fallbacks"] == 1
+    assert stats["mapped"] == 2 and stats["failed"] == 1
+
+
+def test_result_wait_is_bounded_by_timeout():
+    release = threading.Event()
+
+    class _StuckMapper(_FakeMapper):
+        def map_reactions_with_info(self, rxns):
+            release.wait(5)
+            return super().map_reactions_with_info(rxns)
+
+    service = _service(_StuckMapper("ok"))
+    with pytest.raises(TimeoutError):
+        service.map_reactions(RXNS[:1], timeout=0.1)
+    release.set()
@@ -0,0 +1,41 @@
+# chemistry_extraction/tests/test_text_chunker.py
+from agent_service.utils.text_chunker import chunk_sections
+from agent_service.utils.llm_utils import estimate_text_tokens
+
+
+def _sections(texts):
+    return [{"text": t, "page_idx": i // 2} for i, t in enumerate(texts)]
+
+
+def test_chunks_respect_token_budget_and_keep_indices():
+    sections = _sections([f"paragraph {i} " * 20 for i in range(10)])
+    size = estimate_text_tokens(sections[0]["text"]) * 3
+    chunks = chunk_sections(sections, max_tokens=size)
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert sum(estimate_text_tokens(u["text"]) for u in chunk) <= size
+        for unit in chunk:
+            assert unit["page_idx"] == sections[unit["index"]]["page_idx"]
+    assert [u["index"] for chunk in chunks for u in chunk] == list(range(10))
+
+
+def test_overlap_repeats_trailing_sections():
+    sections = _sections([f"paragraph {i} " * 20 for i in range(6)])
+    unit = estimate_text_tokens(sections[0]["text"])
+    chunks = chunk_sections(sections, max_tokens=unit * 3, overlap_tokens=unit)
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert prev[-1]["index"] == nxt[0]["index"]
+
+
+def test_include_and_empty_sections_are_skipped():
+    sections = _sections(["a " * 10, "", "b " * 10, "c " * 10])
+    chunks = chunk_sections(sections, max_tokens=1000, include={0, 1, 3})
+    assert [u["index"] for chunk in chunks for u in chunk] == [0, 3]
+
+
+def test_oversized_section_is_split():
+    text = "\n".join(f"line {i} " * 10 for i in range(50))
+    chunks = chunk_sections([{"text": text, "page_idx": 0}], max_tokens=100)
+    assert len(chunks) > 1
+    assert all(u["index"] == 0 for chunk in chunks for u in chunk)
+    assert "".join(u["text"] for chunk in chunks for u in chunk) == text
@@ -0,0 +1,58 @@
+# chemistry_extraction/tests/test_text_merge.py
+import pytest
+
+from agent_service.agents.text_agent import TextExtractionAgent
+
+
+@pytest.fixture
+def agent():
+    return TextExtractionAgent()
+
+
+SECTIONS = [{"text": f"s{i}", "page_idx": i // 2} for i in range(6)]
+
+
+def _chunk(*indices):
+    return [{"index": i, "page_idx": SECTIONS[i]["page_idx"], "text": SECTIONS[i]["text"]} for i in indices]
+
+
+def test_overlap_duplicates_are_merged_with_provenance(agent):
+    reaction = {"reactants": ["A"], "products": ["B"], "yields": ["85%"]}
+    chunks = [_chunk(0, 1, 2), _chunk(2, 3, 4)]
+    results = [
+        {"reactions": [{**reaction, "source_text_index": 2}]},
+        {"reactions": [{**reaction, "source_text_index": 4}]},
+    ]
+    merged = agent._merge_extractions(chunks, results, SECTIONS)
+    assert len(merged["reactions"]) == 1
+    item = merged["reactions"][0]
+    assert item["source_text_indices"] == [2, 4]
+    assert item["page_idx"] == [1, 2]
+    assert "source_text_index" not in item
+
+
+def test_missing_or_invalid_source_index_falls_back_to_chunk(agent):
+    chunks = [_chunk(0, 1), _chunk(3)]
+    results = [
+        {"compounds": [{"name": "X"}]},
+        {"compounds": [{"name": "Y", "source_text_index": 0}]},  # 不属于该分块
+    ]
+    merged = agent._merge_extractions(chunks, results, SECTIONS)
+    by_name = {c["name"]: c for c in merged["compounds"]}
+    assert by_name["X"]["source_text_indices"] == [0, 1]
+    assert by_name["X"]["page_idx"] == [0]
+    assert by_name["Y"]["source_text_indices"] == [3]
+
+
+def test_null_list_fields_and_failed_chunks(agent):
+    chunks = [_chunk(0), _chunk(1), _chunk(2), _chunk(3)]
+    results = [
+        {"reactions": None, "compounds": []},
+        None,
+        {"reactions": [{"reactants": ["A"], "products": ["B"]}], "compounds": None},
+        {"reactions": None, "notes": "n"},
+    ]
+    merged = agent._merge_extractions(chunks, results, SECTIONS)
+    assert [r["source_text_indices"] for r in merged["reactions"]] == [[2]]
+    assert merged["compounds"] == []
+    assert merged["notes"] == "n"
@@ -0,0 +1,51 @@
+# chemistry_extraction/tests/test_upload_isolation.py
+import asyncio
+import io
+import os
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from fastapi import UploadFile
+
+from agent_service import app as app_module
+
+
+@pytest.fixture(autouse=True)
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "UPLOAD_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _upload(content: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename="paper.pdf")
+
+
+def test_same_filename_uploads_do_not_overwrite():
+    async def main():
+        return await asyncio.gather(
+            app_module.save_uploaded_pdf(_upload(b"%PDF first")),
+            app_module.save_uploaded_pdf(_upload(b"%PDF second")),
+        )
+
+    first, second = asyncio.run(main())
+    assert first != second
+    assert os.path.basename(first) == os.path.basename(second) == "paper.pdf"
+    with open(first, "rb") as f:
+        assert f.read() == b"%PDF first"
+    with open(second, "rb") as f:
+        assert f.read() == b"%PDF second"
+
+
+def test_upload_removed_after_run(monkeypatch):
+    file_path = asyncio.run(app_module.save_uploaded_pdf(_upload(b"%PDF")))
+
+    def failing_workflow(path, agent):
+        assert os.path.exists(path)
+        raise RuntimeError("workflow failed")
+
+    monkeypatch.setattr(app_module, "execute_workflow", failing_workflow)
+    with pytest.raises(RuntimeError):
+        app_module.run_extraction(file_path, "reaction_extraction")
+    assert not os.path.exists(os.path.dirname(file_path))
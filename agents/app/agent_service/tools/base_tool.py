@@ -1,9 +1,13 @@
 # chemistry_extraction/tools/base_tool.py
 from abc import ABC, abstractmethod
 from typing import Dict, Any, List, Optional, Type
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import time
 import logging
 import json
+import threading
+from ..config import Config
+from .circuit_breaker import get_circuit_breaker, is_downstream_error
 
 class ToolResult:
     """工具执行结果封装"""
@@ -13,13 +17,17 @@ class ToolResult:
         data: Dict[str, Any],
         tool_name: str,
         execution_time: float,
-        error: Optional[str] = None
+        error: Optional[str] = None,
+        breaker: Optional[Dict[str, Any]] = None,
+        downstream_error: bool = False
     ):
         self.success = success
         self.data = data
         self.tool_name = tool_name
         self.execution_time = execution_time
         self.error = error
+        self.breaker = breaker  # 本次调用结束后的熔断器状态
+        self.downstream_error = downstream_error  # 失败是否由下游服务故障引起（计入熔断）
         self.timestamp = time.time()
     
     def as_dict(self) -> Dict[str, Any]:
@@ -30,6 +38,8 @@ class ToolResult:
             "tool_name": self.tool_name,
             "execution_time": self.execution_time,
             "error": self.error,
+            "breaker": self.breaker,
+            "downstream_error": self.downstream_error,
             "timestamp": self.timestamp
         }
 
@@ -42,7 +52,13 @@ class BaseTool(ABC):
     def __init__(self, config: Dict[str, Any] = None):
         self.config = config or {}
         self.logger = self._setup_logger()
-        self.timeout = self.config.get("timeout", 10.0)  # 默认超时10秒
+        self.timeout = self.config.get("timeout", Config.TOOL_TIMEOUTS.get(self.name, Config.TOOL_DEFAULT_TIMEOUT))
+        self.breaker = get_circuit_breaker(self.name)
+        # execute 在独立线程中执行，run 按 timeout 限定墙钟时间；线程数有上限，下游卡死时不会无限堆积
+        self.max_workers = self.config.get("max_workers", Config.TOOL_MAX_WORKERS)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"tool-{self.name}")
+        # 执行名额与线程数一致，在 execute 真正结束时归还：提交的调用总能立即开始，超时不包含排队时间
+        self._slots = threading.BoundedSemaphore(self.max_workers)
     
     def _setup_logger(self):
         """设置工具专用日志器"""
@@ -59,13 +75,21 @@ class BaseTool(ABC):
         """验证输入数据是否适合本工具"""
         return True  # 默认总是有效，子类可重写
     
+    def startup(self) -> None:
+        """加载重资源（模型、目录等），由 ToolRegistry 在创建后调用一次，子类可重写"""
+        pass
+
+    def shutdown(self) -> None:
+        """释放资源，由 ToolRegistry 在进程退出时调用，子类重写时需调用 super().shutdown()"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
     @abstractmethod
     def execute(self, input_data: Dict[str, Any]) -> ToolResult:
         """执行工具核心逻辑"""
         pass
     
     def run(self, input_data: Dict[str, Any]) -> ToolResult:
-        """统一执行入口（带超时和错误处理）"""
+        """统一执行入口（带超时、熔断和错误处理）"""
 
         if not self.validate_input(input_data):
             return ToolResult(
@@ -73,56 +97,100 @@ class BaseTool(ABC):
                 data={},
                 tool_name=self.name,
                 execution_time=0,
-                error="Invalid input for this tool"
+                error="Invalid input for this tool",
+                breaker=self.breaker.snapshot()
+            )
+
+        # 线程全部被占用（通常是超时的调用仍卡在下游）时直接拒绝，不排队
+        if not self._slots.acquire(blocking=False):
+            self.logger.warning(f"All {self.max_workers} workers busy, rejecting call")
+            return ToolResult(
+                success=False,
+                data={},
+                tool_name=self.name,
+                execution_time=0,
+                error=f"Tool busy: all {self.max_workers} workers occupied",
+                breaker=self.breaker.snapshot()
+            )
+
+        if not self.breaker.allow():
+            self._slots.release()
+            snapshot = self.breaker.snapshot()
+            self.logger.warning(f"Circuit open, rejecting call (retry in {snapshot['retry_in']}s)")
+            return ToolResult(
+                success=False,
+                data={},
+                tool_name=self.name,
+                execution_time=0,
+                error="Circuit breaker open",
+                breaker=snapshot
             )
-        
+
+        def _execute():
+            try:
+                return self.execute(input_data)
+            finally:
+                self._slots.release()
+
         start_time = time.time()
         try:
-            # 实际执行（子类实现）
-            result = self.execute(input_data)
+            # 实际执行（子类实现），超过 timeout 即返回失败；超时的调用线程无法强制终止，由线程数上限兜底
+            try:
+                future = self._executor.submit(_execute)
+            except RuntimeError:
+                self._slots.release()  # 已 shutdown，任务未提交
+                raise
+            result = future.result(timeout=self.timeout or None)
             exec_time = time.time() - start_time
             
             # 确保返回的是 ToolResult
             if isinstance(result, dict):
-                return ToolResult(
+                result = ToolResult(
                     success=True,
                     data=result,
                     tool_name=self.name,
                     execution_time=exec_time
                 )
-            return result
+        except FutureTimeoutError:
+            future.cancel()
+            exec_time = time.time() - start_time
+            self.logger.error(f"Tool execution timed out after {self.timeout}s")
+            result = ToolResult(
+                success=False,
+                data={},
+                tool_name=self.name,
+                execution_time=exec_time,
+                error=f"Tool execution timed out after {self.timeout}s",
+                downstream_error=True
+            )
         except Exception as e:
             exec_time = time.time() - start_time
             error_msg = f"{str(e)}\nInput: {json.dumps(input_data, indent=2)[:500]}"
             self.logger.error(f"Tool execution failed: {error_msg}")
-            return ToolResult(
+            result = ToolResult(
                 success=False,
                 data={},
                 tool_name=self.name,
                 execution_time=exec_time,
-                error=str(e)
+                error=str(e),
+                downstream_error=is_downstream_error(e)
             )
+
+        # 只有超时与下游故障计入熔断；输入/数据导致的失败不代表下游不健康
+        if result.success:
+            self.breaker.record_success()
+        elif result.downstream_error:
+            self.breaker.record_failure()
+        else:
+            self.breaker.release()
+        result.breaker = self.breaker.snapshot()
+        return result
     
     @classmethod
     def get_tool(cls, tool_name: str, config: Dict[str, Any] = None) -> 'BaseTool':
-        """工具工厂方法"""
-        from .mineru_tool import MinerUExtractTool
-        from .reaction_checker import ReactionChecker
-        from .yolo_detect import YoloDetector
-        # from .paddle_ocr_tool import PaddleOCRPredictTool
-        
-        print("try to get tool:", tool_name)
-        TOOL_MAP: Dict[str, Type[BaseTool]] = {
-            "mineru_pdf_extraction": MinerUExtractTool,
-            "reaction_checker": ReactionChecker,
-            "yolo_detector": YoloDetector,
-            # "paddle_ocr_prediction": PaddleOCRPredictTool,
-        }
-        
-        if tool_name not in TOOL_MAP:
-            raise ValueError(f"Unknown MCP tool: {tool_name}. Available: {list(TOOL_MAP.keys())}")
-        
-        return TOOL_MAP[tool_name](config)
+        """工具工厂方法：返回进程级共享实例（见 ToolRegistry）"""
+        from .registry import ToolRegistry
+        return ToolRegistry.get(tool_name, config)
 
     @classmethod
     def list_available_tools(cls) -> List[str]:
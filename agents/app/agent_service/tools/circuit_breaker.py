@@ -0,0 +1,105 @@
+# chemistry_extraction/tools/circuit_breaker.py
+import time
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, Any, Optional
+
+import requests
+
+from ..config import Config
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """工具级熔断器
+
+    - closed：正常放行，连续失败达到 failure_threshold 次后转为 open
+    - open：直接拒绝，cooldown 秒后转为 half_open
+    - half_open：只放行一个探测请求，成功则恢复 closed，失败则重新 open
+
+    只有超时与下游故障（连接错误、5xx）应调用 record_failure；输入错误等与下游健康无关的失败调用 release。
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """当前请求是否放行"""
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """调用结果不计入熔断统计，仅归还 half_open 的探测名额"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = None
+            if self._state == OPEN:
+                retry_in = round(max(0.0, self.cooldown - (time.monotonic() - self._opened_at)), 3)
+            return {"state": self._state, "consecutive_failures": self._failures, "retry_in": retry_in}
+
+
+def is_downstream_error(exc: BaseException) -> bool:
+    """异常是否表示下游服务故障（超时、连接错误、5xx），只有这类错误计入熔断"""
+    if isinstance(exc, requests.HTTPError):
+        return exc.response is not None and exc.response.status_code >= 500
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError, FutureTimeoutError))
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(tool_name: str) -> CircuitBreaker:
+    """按工具名共享熔断器（同一工具的不同配置实例访问的是同一个下游服务）"""
+    breaker = _breakers.get(tool_name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(tool_name)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    tool_name,
+                    failure_threshold=Config.TOOL_BREAKER_FAILURE_THRESHOLD,
+                    cooldown=Config.TOOL_BREAKER_COOLDOWN,
+                )
+                _breakers[tool_name] = breaker
+    return breaker
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    """所有熔断器的当前状态"""
+    return {name: breaker.snapshot() for name, breaker in list(_breakers.items())}
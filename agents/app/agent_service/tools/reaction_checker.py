@@ -1,16 +1,213 @@
-
 # chemistry_extraction/tools/paddle_ocr_tool.py
 
 import os
 import json
 import time
-from typing import Dict, Any, Optional
+import queue
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import TYPE_CHECKING, Dict, Any, List, Optional
 from pathlib import Path
-from rxnmapper import RXNMapper, BatchedMapper
 from .base_tool import BaseTool, ToolResult
+from .circuit_breaker import is_downstream_error
+from ..config import Config
+from ..utils.chem_utils import canonical_reaction_smiles
+from ..utils.rxn_cache import get_rxn_cache
 import requests
 import mimetypes
 
+if TYPE_CHECKING:
+    from rxnmapper import BatchedMapper
+
+logger = logging.getLogger("tool.reaction_checker")
+
+
+class RxnMapperService:
+    """进程级 rxnmapper 服务
+
+    - 模型在首次使用时加载一次，所有 ReactionChecker 实例与并发任务共享
+    - 后台线程从队列中攒批（最多 batch_size 条或等待 max_wait 秒），多个文档的反应合并推理
+    - 空串或 RDKit 无法解析的反应 SMILES 直接返回 {}，不进入模型
+    - 入队前按规范化反应 SMILES 查询持久化缓存，映射成功的结果写回缓存
+    - 整批推理失败或输出条数与输入不符时逐条重试，单条仍失败的反应返回 {}
+    """
+
+    def __init__(self, batch_size: int = 32, max_wait: float = 0.02):
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self._queue: "queue.Queue" = queue.Queue()
+        self._mapper: Optional["BatchedMapper"] = None
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._stats = {"requests": 0, "short_circuited": 0, "cache_hits": 0, "mapped": 0, "failed": 0, "batches": 0,
+                       "batch_fallbacks": 0, "load_time": None}
+
+    def _get_mapper(self) -> "BatchedMapper":
+        if self._mapper is None:
+            with self._lock:
+                if self._mapper is None:
+                    # 延迟导入：加载 torch/transformers 较慢，且只有实际映射时才需要
+                    from rxnmapper import BatchedMapper
+                    start = time.time()
+                    self._mapper = BatchedMapper(batch_size=self.batch_size)
+                    self._stats["load_time"] = round(time.time() - start, 3)
+        return self._mapper
+
+    def warm_up(self) -> None:
+        """预先加载模型并启动攒批线程"""
+        self._get_mapper()
+        self._ensure_worker()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="rxnmapper", daemon=True)
+                    self._worker.start()
+
+    def _map_batch(self, batch: List[tuple]) -> None:
+        mapper = self._get_mapper()
+        try:
+            outputs = list(mapper.map_reactions_with_info([rxn for rxn, _ in batch]))
+        except Exception as e:
+            logger.warning(f"rxnmapper batch of {len(batch)} failed ({e}), remapping individually")
+            outputs = None
+        if outputs is not None and len(outputs) == len(batch):
+            for (_, future), output in zip(batch, outputs):
+                future.set_result(output or {})
+            return
+
+        # 无法确定输出与输入的对应关系，整批逐条重新映射
+        if outputs is not None:
+            logger.warning(f"rxnmapper returned {len(outputs)} results for a batch of {len(batch)}, remapping individually")
+        with self._lock:
+            self._stats["batch_fallbacks"] += 1
+        for rxn, future in batch:
+            try:
+                output = list(mapper.map_reactions_with_info([rxn]))
+                if len(output) == 1:
+                    future.set_result(output[0] or {})
+            except Exception as e:
+                future.set_exception(e)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            # 调用方已超时放弃的请求不再推理
+            batch = [(rxn, future) for rxn, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                self._map_batch(batch)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            # 保证每个请求都有结果，调用方不会无限等待
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError("rxnmapper returned no result"))
+            failed = sum(1 for _, future in batch if future.exception() is not None)
+            with self._lock:
+                self._stats["batches"] += 1
+                self._stats["mapped"] += len(batch) - failed
+                self._stats["failed"] += failed
+
+    def map_reactions(self, reaction_smiles: List[str], timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """映射一组反应 SMILES，结果与输入一一对应（无效或映射失败的反应为 {}）
+
+        timeout 为等待全部结果的总秒数，超时抛出 TimeoutError 并撤回尚未推理的请求。
+        """
+        results: List[Dict[str, Any]] = [{} for _ in reaction_smiles]
+        keys = {}
+        for i, rxn in enumerate(reaction_smiles):
+            key = canonical_reaction_smiles(rxn) if isinstance(rxn, str) else None
+            if key is not None:
+                keys[i] = key
+
+        cache = get_rxn_cache()
+        cached = {}
+        if cache is not None and keys:
+            try:
+                cached = cache.get_many(list(keys.values()))
+            except Exception as e:
+                logger.warning(f"Reaction mapping cache lookup failed: {e}")
+
+        # 同一批内重复的反应只入队一次
+        futures: Dict[str, Future] = {}
+        for i, key in keys.items():
+            if key in cached:
+                results[i] = cached[key]
+            elif key not in futures:
+                futures[key] = Future()
+                self._queue.put((reaction_smiles[i], futures[key]))
+        with self._lock:
+            self._stats["requests"] += len(reaction_smiles)
+            self._stats["short_circuited"] += len(reaction_smiles) - len(keys)
+            self._stats["cache_hits"] += sum(1 for key in keys.values() if key in cached)
+        if futures:
+            self._ensure_worker()
+
+        deadline = time.monotonic() + timeout if timeout else None
+        mapped = {}
+        for key, future in futures.items():
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                mapped[key] = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                for pending in futures.values():
+                    pending.cancel()
+                raise TimeoutError(f"rxnmapper did not return {len(futures)} reactions within {timeout}s")
+            except Exception as e:
+                logger.warning(f"Reaction mapping failed for {key}: {e}")
+        for i, key in keys.items():
+            if key in mapped:
+                results[i] = mapped[key]
+        if cache is not None:
+            try:
+                cache.set_many({key: result for key, result in mapped.items() if result})
+            except Exception as e:
+                logger.warning(f"Reaction mapping cache write failed: {e}")
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {**self._stats, "loaded": self._mapper is not None, "queued": self._queue.qsize()}
+        valid = stats["requests"] - stats["short_circuited"]
+        stats["cache_hit_rate"] = round(stats["cache_hits"] / valid, 4) if valid else 0.0
+        cache = get_rxn_cache()
+        if cache is not None:
+            stats["cache"] = cache.stats()
+        return stats
+
+
+_service_instance: Optional[RxnMapperService] = None
+_service_lock = threading.Lock()
+
+
+def get_rxn_mapper_service() -> RxnMapperService:
+    """获取进程级 rxnmapper 服务"""
+    global _service_instance
+    if _service_instance is None:
+        with _service_lock:
+            if _service_instance is None:
+                _service_instance = RxnMapperService(
+                    batch_size=Config.RXN_MAPPER_BATCH_SIZE,
+                    max_wait=Config.RXN_MAPPER_BATCH_WAIT_MS / 1000,
+                )
+    return _service_instance
+
+
 class ReactionChecker(BaseTool):
     """
     MCP 工具：对识别出的smiles码进行校验
@@ -19,11 +216,14 @@ class ReactionChecker(BaseTool):
 
     def __init__(self, config: Optional[Dict[str, Any]] = None):
         super().__init__(config)
-        # 可配置参数
-        # 初始化 PaddleOCR 实例（仅初始化一次）
+        # 模型由进程级服务持有，startup 时（或首次映射时）加载
         self.logger.info("ReactionChecker instance initialized.")
-        self.rxn_mapper =  BatchedMapper(batch_size=32)
+        self.rxn_mapper = get_rxn_mapper_service()
 
+    def startup(self) -> None:
+        start_time = time.time()
+        self.rxn_mapper.warm_up()
+        self.logger.info(f"rxnmapper model ready in {time.time() - start_time:.2f}s")
 
     def execute(self, input_data: Dict[str, Any]) -> ToolResult:
         start_time = time.time()
@@ -32,7 +232,7 @@ class ReactionChecker(BaseTool):
             # 解析输入
             self.logger.info(f"Running reaction checker")
             rxn_smiles = input_data["reaction_smiles"]
-            results = list(self.rxn_mapper.map_reactions_with_info(rxn_smiles))
+            results = self.rxn_mapper.map_reactions(rxn_smiles, timeout=self.timeout)
             # 执行 OCR 推理
             exec_time = time.time() - start_time
             return ToolResult(
@@ -50,7 +250,8 @@ class ReactionChecker(BaseTool):
                 data={},
                 tool_name=self.name,
                 execution_time=exec_time,
-                error=str(e)
+                error=str(e),
+                downstream_error=is_downstream_error(e)
             )
 
 
@@ -58,7 +259,7 @@ def run_reaction_checker(smiles: str, config: Dict[str, Any] = None) -> ToolResu
     """
     快捷函数：直接运行 OCR 工具
     """
-    tool = ReactionChecker(config=config)
+    tool = BaseTool.get_tool(ReactionChecker.name, config)
     return tool.execute({"reaction_smiles": smiles})
 
 if __name__ == "__main__":
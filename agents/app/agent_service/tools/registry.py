@@ -0,0 +1,93 @@
+# chemistry_extraction/tools/registry.py
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple, Type
+
+from .base_tool import BaseTool
+
+logger = logging.getLogger("tool_registry")
+
+
+def _tool_classes() -> Dict[str, Type[BaseTool]]:
+    # 延迟导入：各工具模块依赖较重（rxnmapper 等）
+    from .mineru_tool import MinerUExtractTool
+    from .reaction_checker import ReactionChecker
+    from .yolo_detect import YoloDetector
+    # from .paddle_ocr_tool import PaddleOCRPredictTool
+    return {
+        "mineru_pdf_extraction": MinerUExtractTool,
+        "reaction_checker": ReactionChecker,
+        "yolo_detector": YoloDetector,
+        # "paddle_ocr_prediction": PaddleOCRPredictTool,
+    }
+
+
+def _config_hash(config: Optional[Dict[str, Any]]) -> str:
+    payload = json.dumps(config or {}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class ToolRegistry:
+    """进程级工具注册表：每个 (工具名, 配置哈希) 只实例化并 startup 一次，所有请求共享
+
+    工具的 execute 只使用入参与只读配置，可被并发请求安全复用；
+    模型加载等重资源在 startup() 中完成，FastAPI 启动时预热，关闭时统一 shutdown()。
+    """
+
+    _instances: Dict[Tuple[str, str], BaseTool] = {}
+    _warmup_times: Dict[Tuple[str, str], float] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, tool_name: str, config: Optional[Dict[str, Any]] = None) -> BaseTool:
+        """获取工具实例（首次获取时创建并执行 startup）"""
+        key = (tool_name, _config_hash(config))
+        tool = cls._instances.get(key)
+        if tool is not None:
+            return tool
+        with cls._lock:
+            tool = cls._instances.get(key)
+            if tool is None:
+                tool_classes = _tool_classes()
+                if tool_name not in tool_classes:
+                    raise ValueError(f"Unknown MCP tool: {tool_name}. Available: {list(tool_classes.keys())}")
+                start = time.time()
+                tool = tool_classes[tool_name](config)
+                tool.startup()
+                cls._warmup_times[key] = round(time.time() - start, 3)
+                cls._instances[key] = tool
+                logger.info(f"Started tool '{tool_name}' in {cls._warmup_times[key]:.2f}s")
+        return tool
+
+    @classmethod
+    def startup(cls, tool_names: Optional[List[str]] = None) -> None:
+        """启动时预热工具（默认配置）；单个工具失败只记录日志，首次使用时会再次尝试"""
+        for tool_name in tool_names if tool_names is not None else list(_tool_classes().keys()):
+            try:
+                cls.get(tool_name)
+            except Exception as e:
+                logger.error(f"Tool '{tool_name}' warm-up failed: {e}")
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """释放所有工具持有的资源并清空注册表"""
+        with cls._lock:
+            instances = list(cls._instances.items())
+            cls._instances.clear()
+            cls._warmup_times.clear()
+        for (tool_name, _), tool in instances:
+            try:
+                tool.shutdown()
+            except Exception as e:
+                logger.warning(f"Tool '{tool_name}' shutdown failed: {e}")
+
+    @classmethod
+    def stats(cls) -> List[Dict[str, Any]]:
+        """已创建的工具及其预热耗时（秒）"""
+        return [
+            {"tool_name": name, "config_hash": config_hash, "warmup_time": cls._warmup_times.get((name, config_hash))}
+            for name, config_hash in list(cls._instances.keys())
+        ]
@@ -6,8 +6,9 @@ import json
 import time
 from typing import Dict, Any, Optional
 from .base_tool import BaseTool, ToolResult
-from ..utils.bbox_utlis import crop_image, visualize_bboxes
-from ..utils.api_utils import convert_image_to_bboxs, convert_image_to_smiles, convert_image_to_text
+from .circuit_breaker import is_downstream_error
+from ..utils.bbox_utlis import load_image, crop_regions, encode_image, visualize_bboxes
+from ..utils.api_utils import convert_image_to_bboxs, convert_images_to_smiles, convert_images_to_text
 from ..config import Config
 import copy
 
@@ -22,10 +23,14 @@ class YoloDetector(BaseTool):
         self.output_dir = Config.get("OUTPUT_DIR", "output")
         self.segment_dir = os.path.join(self.output_dir, "compound", "segments")
         self.visualization_dir = os.path.join(self.output_dir, "compound", "visualized")
-        os.makedirs(self.segment_dir, exist_ok=True)
-        os.makedirs(self.visualization_dir, exist_ok=True)
+        self.save_segments = self.config.get("save_segments", Config.SAVE_CROP_SEGMENTS)  # 调试用：裁剪图落盘
         self.logger.info("YoloDetector instance initialized.")
 
+    def startup(self) -> None:
+        if self.save_segments:
+            os.makedirs(self.segment_dir, exist_ok=True)
+        os.makedirs(self.visualization_dir, exist_ok=True)
+
     def execute(self, input_data: Dict[str, Any]) -> ToolResult:
         start_time = time.time()
 
@@ -35,7 +40,10 @@ class YoloDetector(BaseTool):
             image_path = input_data["image_path"]
             results = convert_image_to_bboxs(image_path)
             bboxs = [res['bbox'] for res in results]
-            visulized_img = visualize_bboxes(image_path, bboxs, os.path.join(self.visualization_dir, "visualized_" + os.path.basename(image_path)))
+            # 原图只解码一次，可视化与所有裁剪共用
+            img = load_image(image_path)
+            H, W = img.shape[:2]
+            visulized_img = visualize_bboxes(img, bboxs, os.path.join(self.visualization_dir, "visualized_" + os.path.basename(image_path)))
             detect_results = []
             
             copounds = [result for result in results if result['class_id'] == 0]
@@ -49,27 +57,43 @@ class YoloDetector(BaseTool):
                     execution_time=exec_time
                 )
             
-            for idx, result in enumerate(results):
+            # 先在内存中裁剪并编码所有检测框，化合物与文本分别收集后各发一次批量请求
+            compound_crops = []  # (result 下标, (文件名, 编码字节))
+            text_crops = []
+            basename = os.path.splitext(os.path.basename(image_path))[0]
+            ext = os.path.splitext(image_path)[1].lower()
+            crops = crop_regions(img, bboxs)
+            for idx, (result, crop) in enumerate(zip(results, crops)):
                 fomated_reuslt = copy.deepcopy(result)
-                bbox = result['bbox']
-                basename, ext = os.path.splitext(os.path.basename(image_path))
-                ext = os.path.splitext(image_path)[1].lower()
                 crop_filename = f"cmp_{basename}_{idx+1}_{ext}"
-                crop_path = os.path.join(self.segment_dir, crop_filename)
-                saved_path, W, H = crop_image(image_path, bbox, crop_path)
+                crop_path = ""
                 fomated_reuslt['name'] = ""
-                if result['class_id'] == 0:  # 如果是化合物结构，尝试转换为smiles
-                    fomated_reuslt['smiles'] = convert_image_to_smiles(saved_path)
-                    fomated_reuslt['name'] = ""
+                fomated_reuslt['smiles'] = ""
+                if crop is None:
+                    self.logger.warning(f"Invalid bbox for cropping: {result['bbox']}")
                 else:
-                    fomated_reuslt['smiles'] = ""
-                    fomated_reuslt['name'] = convert_image_to_text(saved_path)
+                    crop_bytes = encode_image(crop, ext)
+                    if self.save_segments:
+                        crop_path = os.path.join(self.segment_dir, crop_filename)
+                        with open(crop_path, "wb") as f:
+                            f.write(crop_bytes)
+                    if result['class_id'] == 0:  # 如果是化合物结构，尝试转换为smiles
+                        compound_crops.append((idx, (crop_filename, crop_bytes)))
+                    else:
+                        text_crops.append((idx, (crop_filename, crop_bytes)))
                 fomated_reuslt['crop_path'] = crop_path
                 fomated_reuslt['image_resolution'] = [W, H]
                 fomated_reuslt['original_image'] = image_path
                 fomated_reuslt['bbox_id'] = idx + 1
                 fomated_reuslt['visualized_image'] = visulized_img
                 detect_results.append(fomated_reuslt)
+
+            smiles_list = convert_images_to_smiles([crop for _, crop in compound_crops])
+            for (idx, _), smiles in zip(compound_crops, smiles_list):
+                detect_results[idx]['smiles'] = smiles
+            text_list = convert_images_to_text([crop for _, crop in text_crops])
+            for (idx, _), text in zip(text_crops, text_list):
+                detect_results[idx]['name'] = text
                 
             # 执行 Yolo 推理
             exec_time = time.time() - start_time
@@ -91,7 +115,8 @@ class YoloDetector(BaseTool):
                 data={},
                 tool_name=self.name,
                 execution_time=exec_time,
-                error=str(e)
+                error=str(e),
+                downstream_error=is_downstream_error(e)
             )
 
 
@@ -99,7 +124,7 @@ def run_yolo_detector(config: Dict[str, Any] = None) -> ToolResult:
     """
     快捷函数：直接运行 OCR 工具
     """
-    tool = YoloDetector(config=config)
+    tool = BaseTool.get_tool(YoloDetector.name, config)
     return tool.execute({"image_path": "/mnt/binghao/38f4e387-c730-4ed5-9570-4679ff213785.png"})
 
 if __name__ == "__main__":
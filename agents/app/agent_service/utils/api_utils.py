@@ -1,37 +1,70 @@
 import requests
-import mimetypes
 from pathlib import Path
+from typing import List, Optional, Tuple, Union
+from .http_client import get_service_client
+from ..config import Config
 
+# 图像输入：本地路径，或内存中已编码的 (文件名, 字节)
+ImageInput = Union[str, Tuple[str, bytes]]
 
-def convert_image_to_smiles(image_path: str):
+# SMILES 服务是否支持批量接口（首次 404/405 后回退为逐张调用）
+_SMILES_BATCH_SUPPORTED = True
+
+# 服务不可用（连接错误、超时、5xx）时向上抛出，由工具层计入熔断；单张图片的错误响应仍按失败值返回
+_DOWNSTREAM_ERRORS = (requests.HTTPError, requests.ConnectionError, requests.Timeout)
+
+
+def _raise_for_downstream(response: requests.Response) -> None:
+    """5xx 抛出 HTTPError，其余状态码由调用方处理"""
+    if response.status_code >= 500:
+        response.raise_for_status()
+
+
+def _guess_image_mime(image_path: str) -> Optional[str]:
+    """仅支持 png / jpg，其余返回 None"""
+    ext = Path(image_path).suffix.lower()
+    if ext in ['.jpg', '.jpeg']:
+        return 'image/jpeg'
+    elif ext == '.png':
+        return 'image/png'
+    return None
+
+
+def _image_name(image: ImageInput) -> str:
+    return image[0] if isinstance(image, (tuple, list)) else Path(image).name
+
+
+def _image_upload(image: ImageInput) -> Optional[Tuple[str, bytes, str]]:
+    """构造 multipart 文件元组（内容读入内存，重试时可重复发送），不支持的类型或不存在的文件返回 None"""
+    if isinstance(image, (tuple, list)):
+        name, data = image
+        mime_type = _guess_image_mime(name)
+        return (name, data, mime_type) if mime_type else None
+    mime_type = _guess_image_mime(image)
+    if mime_type is None or not Path(image).exists():
+        return None
+    return (Path(image).name, Path(image).read_bytes(), mime_type)
+
+
+def convert_image_to_smiles(image_path: ImageInput):
     """
     将化学结构图像转换为SMILES表示
     
     Args:
-        image_path: 本地图像路径
+        image_path: 本地图像路径，或内存中已编码的 (文件名, 字节)
         
     Returns:
-        {"smiles": "..."} 或 None（失败时）
+        {"smiles": "..."} 或 None（失败时）；服务不可用时抛出异常
     """
-    url = "http://192.168.1.239:30869/ocr_api/img_to_smiles"
     headers = {"accept": "application/json"}
-    
-    # 推测 MIME 类型
-    mime_type, _ = mimetypes.guess_type(image_path)
-    ext = Path(image_path).suffix.lower()
-    if ext in ['.jpg', '.jpeg']:
-        mime_type = 'image/jpeg'
-    elif ext == '.png':
-        mime_type = 'image/png'
-    else:
-        print(f"[SMILES] Unsupported image type: {ext}")
-        return None
 
-    file_name = Path(image_path).name
     try:
-        with open(image_path, 'rb') as f:
-            files = {'file': (file_name, f, mime_type)}
-            response = requests.post(url, headers=headers, files=files, timeout=30)
+        upload = _image_upload(image_path)
+        if upload is None:
+            print(f"[SMILES] Unsupported or missing image: {_image_name(image_path)}")
+            return None
+        files = {'file': upload}
+        response = get_service_client("smiles").post("/ocr_api/img_to_smiles", headers=headers, files=files, timeout=30)
         
         if response.status_code == 200:
             result = response.json()
@@ -47,7 +80,10 @@ def convert_image_to_smiles(image_path: str):
             except:
                 error = response.text
             print(f"[SMILES] API Error {response.status_code}: {error}")
+            _raise_for_downstream(response)
             return None
+    except _DOWNSTREAM_ERRORS:
+        raise
     except Exception as e:
         print(f"[SMILES] Request failed: {str(e)}")
         return None
@@ -62,26 +98,19 @@ def convert_image_to_bboxs(image_path: str):
         
     Returns:
         {"compound": "...", "text": "...."} 或 '空字符串（失败时）'
+
+    服务不可用（连接错误、超时、5xx）时抛出异常，由工具层计入熔断
     """
-    url = "http://192.168.1.239:6789/detect"
     headers = {"accept": "application/json"}
-    
-    # 推测 MIME 类型
-    mime_type, _ = mimetypes.guess_type(image_path)
-    ext = Path(image_path).suffix.lower()
-    if ext in ['.jpg', '.jpeg']:
-        mime_type = 'image/jpeg'
-    elif ext == '.png':
-        mime_type = 'image/png'
-    else:
-        print(f"[Yolo] Unsupported image type: {ext}")
+
+    upload = _image_upload(image_path)
+    if upload is None:
+        print(f"[Yolo] Unsupported or missing image: {_image_name(image_path)}")
         return None
 
-    file_name = Path(image_path).name
     try:
-        with open(image_path, 'rb') as f:
-            files = {'file': (file_name, f, mime_type)}
-            response = requests.post(url, headers=headers, files=files, timeout=30)
+        files = {'file': upload}
+        response = get_service_client("yolo").post("/detect", headers=headers, files=files, timeout=30)
         
         if response.status_code == 200:
             result = response.json()
@@ -97,45 +126,34 @@ def convert_image_to_bboxs(image_path: str):
             except:
                 error = response.text
             print(f"[Yolo] API Error {response.status_code}: {error}")
+            _raise_for_downstream(response)
             return None
+    except _DOWNSTREAM_ERRORS:
+        raise
     except Exception as e:
         print(f"[SMILES] Request failed: {str(e)}")
         return None
 
-def convert_image_to_text(image_path: str):
+def convert_image_to_text(image_path: ImageInput):
     """
     将图像转换为文本表示（通过调用 /recognize API）
     
     Args:
-        image_path: 本地图像路径
+        image_path: 本地图像路径，或内存中已编码的 (文件名, 字节)
         
     Returns:
         提取的文本字符串 或 空字符串（失败或无结果时）
     """
-    url = "http://192.168.1.239:6788/recognize"
     headers = {"accept": "application/json"}
-    
-    # 标准化路径
-    path = Path(image_path)
-    if not path.exists():
-        print(f"[OCR] Image file not found: {image_path}")
-        return ''
-    
-    # 推测 MIME 类型
-    ext = path.suffix.lower()
-    if ext in ['.jpg', '.jpeg']:
-        mime_type = 'image/jpeg'
-    elif ext == '.png':
-        mime_type = 'image/png'
-    else:
-        print(f"[OCR] Unsupported image type: {ext}")
-        return ''
 
     try:
-        with open(path, 'rb') as f:
-            # ✅ 关键修复：字段名必须是 'images'，且格式要支持多图
-            files = [('images', (path.name, f, mime_type))]  # 注意：使用 list of tuple 支持同名字段
-            response = requests.post(url, headers=headers, files=files, timeout=30)
+        upload = _image_upload(image_path)
+        if upload is None:
+            print(f"[OCR] Unsupported or missing image: {_image_name(image_path)}")
+            return ''
+        # ✅ 关键修复：字段名必须是 'images'，且格式要支持多图
+        files = [('images', upload)]  # 注意：使用 list of tuple 支持同名字段
+        response = get_service_client("ocr").post("/recognize", headers=headers, files=files, timeout=30)
         
         if response.status_code == 200:
             result = response.json()
@@ -168,9 +186,125 @@ def convert_image_to_text(image_path: str):
 
 
 
+def convert_images_to_smiles(image_paths: List[ImageInput]) -> List:
+    """
+    批量将化学结构图像转换为SMILES表示（一次 multipart 请求）
+
+    Args:
+        image_paths: 本地图像路径或 (文件名, 字节) 列表
+
+    Returns:
+        与输入顺序一致的列表，元素同 convert_image_to_smiles 的返回值；服务不可用时抛出异常
+    """
+    global _SMILES_BATCH_SUPPORTED
+    if not image_paths:
+        return []
+    if len(image_paths) == 1 or not _SMILES_BATCH_SUPPORTED:
+        return [convert_image_to_smiles(path) for path in image_paths]
+
+    headers = {"accept": "application/json"}
+
+    results: List = [None] * len(image_paths)
+    try:
+        valid = []
+        files = []
+        for i, image in enumerate(image_paths):
+            upload = _image_upload(image)
+            if upload is None:
+                print(f"[SMILES] Unsupported or missing image: {_image_name(image)}")
+                continue
+            valid.append(i)
+            files.append(('files', upload))
+        if not files:
+            return results
+        response = get_service_client("smiles").post("/ocr_api/img_to_smiles_batch", headers=headers, files=files, timeout=60)
+
+        if response.status_code in (404, 405):
+            print("[SMILES] Batch endpoint not available, falling back to per-image requests")
+            _SMILES_BATCH_SUPPORTED = False
+            return [convert_image_to_smiles(path) for path in image_paths]
+
+        if response.status_code == 200:
+            result = response.json()
+            items = result.get("results", []) if isinstance(result, dict) else result
+            if not isinstance(items, list) or len(items) != len(valid):
+                print(f"[SMILES] Invalid batch response format: {result}")
+                return [convert_image_to_smiles(path) for path in image_paths]
+            for i, item in zip(valid, items):
+                results[i] = item if isinstance(item, dict) and "smiles" in item else ''
+            return results
+        else:
+            try:
+                error = response.json().get("detail", response.text)
+            except:
+                error = response.text
+            print(f"[SMILES] Batch API Error {response.status_code}: {error}")
+            _raise_for_downstream(response)
+            return results
+    except _DOWNSTREAM_ERRORS:
+        raise
+    except Exception as e:
+        print(f"[SMILES] Batch request failed: {str(e)}")
+        return results
+
+
+def convert_images_to_text(image_paths: List[ImageInput]) -> List[str]:
+    """
+    批量将图像转换为文本（/recognize 接口支持多图，一次请求完成）
+
+    Args:
+        image_paths: 本地图像路径或 (文件名, 字节) 列表
+
+    Returns:
+        与输入顺序一致的文本列表，失败项为空字符串；服务不可用时抛出异常
+    """
+    if not image_paths:
+        return []
+
+    headers = {"accept": "application/json"}
+
+    texts = [''] * len(image_paths)
+    try:
+        valid = []
+        files = []
+        for i, image in enumerate(image_paths):
+            upload = _image_upload(image)
+            if upload is None:
+                print(f"[OCR] Unsupported or missing image: {_image_name(image)}")
+                continue
+            valid.append(i)
+            files.append(('images', upload))
+        if not files:
+            return texts
+        response = get_service_client("ocr").post("/recognize", headers=headers, files=files, timeout=60)
+
+        if response.status_code == 200:
+            result = response.json()
+            if isinstance(result, dict) and result.get("success") and "results" in result:
+                for i, item in zip(valid, result["results"]):
+                    texts[i] = (item.get("text", "") or "").strip()
+                return texts
+            print(f"[OCR] No valid text extracted from batch response: {result}")
+            return texts
+        else:
+            try:
+                error_detail = response.json().get("detail", response.text)
+            except:
+                error_detail = response.text
+            print(f"[OCR] Batch API Error {response.status_code}: {error_detail}")
+            _raise_for_downstream(response)
+            return texts
+
+    except _DOWNSTREAM_ERRORS:
+        raise
+    except Exception as e:
+        print(f"[OCR] Batch request failed: {str(e)}")
+        return texts
+
+
 def translate_text_with_ollama(text: str,
                             model: str = "huihui_ai/hunyuan-mt-abliterated:latest",
-                            ollama_host: str = "http://192.168.1.239:11434") -> str:
+                            ollama_host: Optional[str] = None) -> str:
     """
     如果输入是中文，直接返回；
     否则调用 Ollama 模型将其翻译为中文并返回。
@@ -178,7 +312,7 @@ def translate_text_with_ollama(text: str,
     Args:
         text (str): 输入文本
         model (str): Ollama 翻译模型名称
-        ollama_host (str): Ollama 服务地址
+        ollama_host (str): Ollama 服务地址（默认使用 Config.SERVICE_ENDPOINTS["ollama"] 的共享连接池）
     
     Returns:
         str: 中文文本（原样或翻译后）；失败时返回 None
@@ -226,7 +360,6 @@ def translate_text_with_ollama(text: str,
         return text  # 是中文，直接返回
 
     # 非中文，调用 Ollama 翻译成中文
-    url = f"{ollama_host}/api/generate"
     headers = {"Content-Type": "application/json"}
     data = {
         "model": model,
@@ -241,7 +374,10 @@ def translate_text_with_ollama(text: str,
     }
 
     try:
-        response = requests.post(url, json=data, headers=headers, timeout=60)
+        if ollama_host:
+            response = requests.post(f"{ollama_host}/api/generate", json=data, headers=headers, timeout=60)
+        else:
+            response = get_service_client("ollama").post("/api/generate", json=data, headers=headers, timeout=60)
         if response.status_code == 200:
             result = response.json()
             if "response" in result:
@@ -1,7 +1,7 @@
 
 import cv2
 import numpy as np
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple, Union
 import os
 
 BBox = Tuple[int, int, int, int]  # x1, y1, x2, y2
@@ -83,9 +83,15 @@ def find_optimal_bbox(image_path: str, bbox: BBox, scale_list: List[float]) -> B
             optimal = scaled
     return optimal
 
-def crop_image(image_path: str, bbox: BBox, save_path: str) -> None:
-    """裁剪并保存图像"""
+def load_image(image_path: str) -> np.ndarray:
+    """解码图像（BGR），失败时抛出 ValueError"""
     img = cv2.imread(image_path)
+    if img is None:
+        raise ValueError(f"Failed to decode image: {image_path}")
+    return img
+
+def crop_region(img: np.ndarray, bbox: BBox) -> Optional[np.ndarray]:
+    """按 bbox 裁剪（返回 numpy 视图，不复制），bbox 无效时返回 None"""
     x1, y1, x2, y2 = map(int, bbox)
     H, W = img.shape[:2]
     x1 = max(0, min(x1, W - 1))
@@ -93,14 +99,33 @@ def crop_image(image_path: str, bbox: BBox, save_path: str) -> None:
     y1 = max(0, min(y1, H - 1))
     y2 = max(0, min(y2, H - 1))
     if x1 >= x2 or y1 >= y2:
+        return None
+    return img[y1:y2, x1:x2]
+
+def crop_regions(img: np.ndarray, bboxes: List[BBox]) -> List[Optional[np.ndarray]]:
+    """一次解码、批量裁剪所有 bbox"""
+    return [crop_region(img, bbox) for bbox in bboxes]
+
+def encode_image(img: np.ndarray, ext: str = ".png") -> bytes:
+    """将图像编码为指定格式的字节（可直接上传给 OCR / SMILES 服务）"""
+    ok, buf = cv2.imencode(ext, img)
+    if not ok:
+        raise ValueError(f"Failed to encode image as {ext}")
+    return buf.tobytes()
+
+def crop_image(image_path: str, bbox: BBox, save_path: str) -> None:
+    """裁剪并保存图像"""
+    img = load_image(image_path)
+    H, W = img.shape[:2]
+    cropped = crop_region(img, bbox)
+    if cropped is None:
         raise ValueError("Invalid bbox for cropping")
-    cropped = img[y1:y2, x1:x2]
     cv2.imwrite(save_path, cropped)
     return save_path, W, H  # width, height
 
-def visualize_bboxes(image_path: str, bboxes: List[BBox], save_path: str) -> None:
-    """在图像上绘制 bbox 并保存"""
-    img = cv2.imread(image_path)
+def visualize_bboxes(image: Union[str, np.ndarray], bboxes: List[BBox], save_path: str) -> None:
+    """在图像上绘制 bbox 并保存（image 可为路径或已解码图像，后者不会被修改）"""
+    img = load_image(image) if isinstance(image, str) else image.copy()
     for bbox in bboxes:
         x1, y1, x2, y2 = map(int, bbox)
         cv2.rectangle(img, (x1, y1), (x2, y2), (255, 0, 0), 1)
@@ -0,0 +1,77 @@
+# chemistry_extraction/utils/chem_utils.py
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+try:
+    from rdkit import Chem, DataStructs, RDLogger
+    from rdkit.Chem import rdFingerprintGenerator
+    RDLogger.DisableLog("rdApp.*")
+except ImportError:  # RDKit 随 rxnmapper[rdkit] 安装，缺失时本地化学计算不可用
+    Chem = None
+
+from ..config import Config
+
+
+def rdkit_available() -> bool:
+    return Chem is not None
+
+
+def canonical_smiles(smiles: str) -> Optional[str]:
+    """返回 RDKit 规范 SMILES，无法解析时返回 None"""
+    if Chem is None or not smiles or not isinstance(smiles, str):
+        return None
+    return _canonical_smiles(smiles.strip())
+
+
+@lru_cache(maxsize=4096)
+def _canonical_smiles(smiles: str) -> Optional[str]:
+    mol = Chem.MolFromSmiles(smiles)
+    if mol is None:
+        return None
+    return Chem.MolToSmiles(mol)
+
+
+def split_reaction_smiles(rxn_smiles: str) -> Optional[Tuple[List[str], List[str], List[str]]]:
+    """拆分反应 SMILES 为 (反应物, 试剂, 产物) 组分列表，格式不合法时返回 None"""
+    if not rxn_smiles or not isinstance(rxn_smiles, str):
+        return None
+    parts = rxn_smiles.strip().split(">")
+    if len(parts) != 3:
+        return None
+    return tuple([c for c in part.split(".") if c] for part in parts)
+
+
+def canonical_reaction_smiles(rxn_smiles: str) -> Optional[str]:
+    """各组分规范化并排序后的反应 SMILES（reactants>agents>products），任一组分无法解析时返回 None"""
+    components = split_reaction_smiles(rxn_smiles)
+    if components is None or not components[0] or not components[2]:
+        return None
+    canonical = []
+    for side in components:
+        side_smiles = [canonical_smiles(c) for c in side]
+        if any(s is None for s in side_smiles):
+            return None
+        canonical.append(".".join(sorted(side_smiles)))
+    return ">".join(canonical)
+
+
+@lru_cache(maxsize=1)
+def _fingerprint_generator():
+    return rdFingerprintGenerator.GetMorganGenerator(radius=Config.FUSION_FP_RADIUS, fpSize=Config.FUSION_FP_BITS)
+
+
+@lru_cache(maxsize=4096)
+def morgan_fingerprint(smiles: str):
+    """SMILES（可含 '.' 多组分）的 Morgan 指纹，无法解析时返回 None"""
+    if Chem is None or not smiles:
+        return None
+    mol = Chem.MolFromSmiles(smiles)
+    if mol is None:
+        return None
+    return _fingerprint_generator().GetFingerprint(mol)
+
+
+def tanimoto(fp_a, fp_b) -> float:
+    if fp_a is None or fp_b is None:
+        return 0.0
+    return DataStructs.TanimotoSimilarity(fp_a, fp_b)
@@ -0,0 +1,166 @@
+# chemistry_extraction/utils/http_client.py
+import time
+import random
+import asyncio
+import logging
+import threading
+import weakref
+from typing import Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:  # 异步客户端为可选依赖
+    httpx = None
+
+from ..config import Config
+
+logger = logging.getLogger("http_client")
+
+# 可重试的状态码
+RETRY_STATUS_CODES = {500, 502, 503, 504}
+
+# 幂等方法：请求可能已送达服务端的错误（读超时等）只对这些方法重试，避免 POST 重复提交推理任务
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+def is_retryable_error(method: str, exc: Exception) -> bool:
+    """连接失败（含连接超时，请求未发出）总是可重试，其余传输错误仅幂等方法重试"""
+    if isinstance(exc, requests.ConnectionError):  # requests.ConnectTimeout 同时是 ConnectionError
+        return True
+    if httpx is not None and isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return True
+    return method.upper() in IDEMPOTENT_METHODS
+
+
+def backoff_delay(attempt: int, base: float, max_delay: float = 10.0) -> float:
+    """带全抖动的指数退避时间（attempt 从 0 开始）"""
+    return random.uniform(0, min(max_delay, base * (2 ** attempt)))
+
+
+class ServiceClient:
+    """内部模型服务的共享 HTTP 客户端
+
+    - 同步：requests.Session + 连接池（keep-alive），按服务配置连接池大小
+    - 异步：httpx.AsyncClient（可选依赖），每个事件循环一个实例
+    - 5xx / 连接错误时按带抖动的指数退避重试；读超时仅对幂等方法重试（POST 可能已在服务端执行）
+    """
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        pool_size: int = 10,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+    ):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """同步请求（带重试）；重试耗尽后 5xx 照常返回响应，不可重试或重试耗尽的传输错误抛出异常"""
+        url = self.url(path)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.request(method, url, **kwargs)
+                if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                    return response
+                logger.warning(f"[{self.name}] {method} {url} returned {response.status_code}, retrying ({attempt + 1}/{self.max_retries})")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries or not is_retryable_error(method, e):
+                    raise
+                logger.warning(f"[{self.name}] {method} {url} failed: {e}, retrying ({attempt + 1}/{self.max_retries})")
+            time.sleep(backoff_delay(attempt, self.backoff_base))
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def _get_async_client(self) -> "httpx.AsyncClient":
+        if httpx is None:
+            raise RuntimeError("httpx is required for async requests (pip install httpx)")
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            client = httpx.AsyncClient(limits=limits)
+            self._async_clients[loop] = client
+        return client
+
+    async def arequest(self, method: str, path: str, **kwargs) -> "httpx.Response":
+        """异步请求（带重试），语义同 request"""
+        client = self._get_async_client()
+        url = self.url(path)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await client.request(method, url, **kwargs)
+                if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                    return response
+                logger.warning(f"[{self.name}] {method} {url} returned {response.status_code}, retrying ({attempt + 1}/{self.max_retries})")
+            except httpx.TransportError as e:
+                if attempt == self.max_retries or not is_retryable_error(method, e):
+                    raise
+                logger.warning(f"[{self.name}] {method} {url} failed: {e}, retrying ({attempt + 1}/{self.max_retries})")
+            await asyncio.sleep(backoff_delay(attempt, self.backoff_base))
+
+    async def apost(self, path: str, **kwargs) -> "httpx.Response":
+        return await self.arequest("POST", path, **kwargs)
+
+    async def aclose(self) -> None:
+        """关闭当前事件循环上的异步客户端"""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_clients: Dict[str, ServiceClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_service_client(name: str) -> ServiceClient:
+    """按服务名获取共享客户端（地址与连接池大小来自 Config.SERVICE_ENDPOINTS / SERVICE_POOL_SIZES）"""
+    client = _clients.get(name)
+    if client is not None:
+        return client
+    with _clients_lock:
+        client = _clients.get(name)
+        if client is None:
+            if name not in Config.SERVICE_ENDPOINTS:
+                raise ValueError(f"Unknown service: {name}. Available: {list(Config.SERVICE_ENDPOINTS.keys())}")
+            client = ServiceClient(
+                name=name,
+                base_url=Config.SERVICE_ENDPOINTS[name],
+                pool_size=Config.SERVICE_POOL_SIZES.get(name, 10),
+                max_retries=Config.HTTP_MAX_RETRIES,
+                backoff_base=Config.HTTP_BACKOFF_BASE,
+            )
+            _clients[name] = client
+    return client
+
+
+def reset_service_clients() -> None:
+    """关闭并清空所有客户端（修改服务地址后调用）"""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
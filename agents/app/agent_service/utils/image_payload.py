@@ -0,0 +1,139 @@
+# chemistry_extraction/utils/image_payload.py
+import io
+import os
+import base64
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from PIL import Image
+
+from ..config import Config
+
+logger = logging.getLogger("image_payload")
+
+_MIME_TYPES = {
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.bmp': 'image/bmp',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+}
+
+
+class ImagePayloadCache:
+    """VLM 图像 base64 data URL 的进程级缓存
+
+    - 键为 (绝对路径, mtime, 文件大小, 编码参数)，文件被覆盖后自动失效
+    - 按 data URL 总字节数做 LRU 淘汰
+    - 可选：最长边缩放到 max_edge，并重新压缩为 JPEG / WebP
+    """
+
+    def __init__(self, max_bytes: int, max_edge: int = 0, fmt: str = "", quality: int = 85):
+        self.max_bytes = max_bytes
+        self.max_edge = max_edge
+        self.fmt = fmt.upper()
+        self.quality = quality
+        self._entries: "OrderedDict[Tuple, str]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "bytes_in": 0, "bytes_out": 0}
+
+    def get_data_url(self, image_path: str) -> str:
+        stat = os.stat(image_path)
+        key = (os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size, self.max_edge, self.fmt, self.quality)
+        with self._lock:
+            data_url = self._entries.get(key)
+            if data_url is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return data_url
+
+        data_url = self._encode(image_path)
+        with self._lock:
+            self._stats["misses"] += 1
+            self._stats["bytes_in"] += stat.st_size
+            self._stats["bytes_out"] += len(data_url)
+            if key not in self._entries:
+                self._entries[key] = data_url
+                self._size += len(data_url)
+                while self._size > self.max_bytes and len(self._entries) > 1:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._size -= len(evicted)
+        return data_url
+
+    def _encode(self, image_path: str) -> str:
+        with open(image_path, "rb") as f:
+            data = f.read()
+        mime = _MIME_TYPES.get(os.path.splitext(image_path)[1].lower(), 'image/png')
+        if self.max_edge or self.fmt:
+            try:
+                data, mime = self._transcode(data, mime)
+            except Exception as e:
+                logger.warning(f"Image transcode failed for {image_path}, sending original: {e}")
+        return f"data:{mime};base64,{base64.b64encode(data).decode('utf-8')}"
+
+    def _transcode(self, data: bytes, mime: str) -> Tuple[bytes, str]:
+        """缩放 / 重新压缩；结果不比原图小时保留原图"""
+        with Image.open(io.BytesIO(data)) as img:
+            img.load()
+            resized = bool(self.max_edge) and max(img.size) > self.max_edge
+            if resized:
+                img.thumbnail((self.max_edge, self.max_edge), Image.LANCZOS)
+            elif not self.fmt:
+                return data, mime
+
+            fmt = self.fmt or img.format or "PNG"
+            if fmt == "JPEG" and img.mode not in ("RGB", "L"):
+                # JPEG 不支持透明通道，铺白底
+                background = Image.new("RGB", img.size, (255, 255, 255))
+                background.paste(img, mask=img.convert("RGBA").split()[-1])
+                img = background
+            buffer = io.BytesIO()
+            save_kwargs: Dict[str, Any] = {"quality": self.quality} if fmt in ("JPEG", "WEBP") else {}
+            img.save(buffer, format=fmt, **save_kwargs)
+        encoded = buffer.getvalue()
+        if len(encoded) >= len(data) and not resized:
+            return data, mime
+        return encoded, Image.MIME.get(fmt, mime)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+            }
+
+
+_cache_instance: Optional[ImagePayloadCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_image_payload_cache() -> ImagePayloadCache:
+    """获取进程级图像编码缓存"""
+    global _cache_instance
+    if _cache_instance is None:
+        with _cache_lock:
+            if _cache_instance is None:
+                _cache_instance = ImagePayloadCache(
+                    max_bytes=Config.IMAGE_PAYLOAD_CACHE_MAX_BYTES,
+                    max_edge=Config.IMAGE_PAYLOAD_MAX_EDGE,
+                    fmt=Config.IMAGE_PAYLOAD_FORMAT,
+                    quality=Config.IMAGE_PAYLOAD_QUALITY,
+                )
+    return _cache_instance
+
+
+def encode_image_data_url(image_path: str) -> str:
+    """读取（或命中缓存）图像并返回 base64 data URL"""
+    return get_image_payload_cache().get_data_url(image_path)
@@ -2,12 +2,26 @@
 import os
 import json
 import re
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 from openai import OpenAI
 from ..config import Config
+from .llm_cache import get_llm_cache, make_cache_key
 
-def get_client() -> OpenAI:
-    """获取LLM客户端"""
+logger = logging.getLogger("llm_utils")
+
+_client: Optional[OpenAI] = None
+_client_provider: Optional[str] = None
+_client_lock = threading.Lock()
+
+
+def _create_client() -> OpenAI:
     if Config.LLM_PROVIDER == "dashscope":
         return OpenAI(
             api_key=Config.DASHSCOPE_API_KEY,
@@ -20,14 +34,136 @@ def get_client() -> OpenAI:
             model="qwen-plus"
         )
 
+
+def get_client() -> OpenAI:
+    """获取进程级共享的LLM客户端（复用连接池与 TLS 会话，线程安全）"""
+    global _client, _client_provider
+    if _client is None or _client_provider != Config.LLM_PROVIDER:
+        with _client_lock:
+            if _client is None or _client_provider != Config.LLM_PROVIDER:
+                _client = _create_client()
+                _client_provider = Config.LLM_PROVIDER
+    return _client
+
+
+def estimate_text_tokens(text: str) -> int:
+    """粗略估算文本 token 数（中文约 1 字 1 token，其余约 4 字符 1 token）"""
+    if not text:
+        return 0
+    cjk = len(re.findall(r'[\u4e00-\u9fff]', text))
+    return cjk + (len(text) - cjk) // 4
+
+
+def estimate_tokens(messages: List[Dict[str, Any]]) -> int:
+    """粗略估算消息 token 数（文本见 estimate_text_tokens；图像按固定值计）"""
+    total = 0
+    for message in messages:
+        content = message.get("content", "")
+        parts = content if isinstance(content, list) else [{"type": "text", "text": content}]
+        for part in parts:
+            if part.get("type") == "text":
+                total += estimate_text_tokens(part.get("text", "") or "")
+            else:
+                total += Config.LLM_IMAGE_TOKEN_ESTIMATE
+    return max(total, 1)
+
+
+class RateLimiter:
+    """单模型的滑动窗口限流（每分钟请求数 RPM / token 数 TPM，0 表示不限）"""
+
+    def __init__(self, rpm: int = 0, tpm: int = 0, window: float = 60.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+        self._events = deque()  # [时间戳, token 数]
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float) -> None:
+        while self._events and now - self._events[0][0] >= self.window:
+            self._events.popleft()
+
+    def acquire(self, tokens: int) -> list:
+        """阻塞直到配额允许，返回本次登记的条目（可用于按实际用量修正）"""
+        while True:
+            with self._lock:
+                now = time.time()
+                self._prune(now)
+                used_tokens = sum(e[1] for e in self._events)
+                rpm_ok = not self.rpm or len(self._events) < self.rpm
+                # 单次请求超过 TPM 时，只要窗口为空就放行，避免永久阻塞
+                tpm_ok = not self.tpm or used_tokens + tokens <= self.tpm or not self._events
+                if rpm_ok and tpm_ok:
+                    entry = [now, tokens]
+                    self._events.append(entry)
+                    return entry
+                wait = self.window - (now - self._events[0][0]) if self._events else 0.05
+            time.sleep(min(max(wait, 0.05), 1.0))
+
+    def record_usage(self, entry: list, tokens: int) -> None:
+        """用实际 token 用量修正登记值"""
+        with self._lock:
+            entry[1] = tokens
+
+
+_llm_semaphore = threading.BoundedSemaphore(max(1, Config.LLM_MAX_CONCURRENCY))
+_rate_limiters: Dict[str, RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(model: str) -> RateLimiter:
+    """获取模型对应的限流器（Config.LLM_RATE_LIMITS 中未配置的模型使用默认值）"""
+    limiter = _rate_limiters.get(model)
+    if limiter is None:
+        with _rate_limiters_lock:
+            limiter = _rate_limiters.get(model)
+            if limiter is None:
+                limits = Config.LLM_RATE_LIMITS.get(model, {})
+                limiter = RateLimiter(
+                    rpm=limits.get("rpm", Config.LLM_DEFAULT_RPM),
+                    tpm=limits.get("tpm", Config.LLM_DEFAULT_TPM),
+                )
+                _rate_limiters[model] = limiter
+    return limiter
+
+
+def _is_cacheable(response: Any, content: Optional[str], response_format: Optional[Dict[str, str]]) -> bool:
+    """只缓存完整的响应：finish_reason 必须为 stop（截断/过滤的结果不缓存），JSON 格式须能解析"""
+    if not content or response.choices[0].finish_reason != "stop":
+        return False
+    if response_format and response_format.get("type") in ("json_object", "json_schema"):
+        try:
+            json.loads(clean_json_response(content))
+        except ValueError:
+            return False
+    return True
+
+
 def call_llm(
     model: str,
     messages: List[Dict[str, Any]],
     max_tokens: int = 8192,
     temperature: float = 0.2,
-    response_format: Optional[Dict[str, str]] = None
+    response_format: Optional[Dict[str, str]] = None,
+    use_cache: bool = True,
+    timeout: Optional[float] = None
 ) -> str:
-    """统一调用LLM接口"""
+    """统一调用LLM接口（受全局并发上限与模型 RPM/TPM 限流约束）
+
+    use_cache=False 或 Config.LLM_CACHE_ENABLED 关闭时绕过持久化响应缓存；被截断或无法解析的响应不写入缓存。
+    timeout 为单次请求的超时秒数（透传给 OpenAI 客户端），超时抛出异常。
+    """
+    cache = get_llm_cache() if use_cache else None
+    cache_key = None
+    if cache is not None:
+        cache_key = make_cache_key(model, messages, max_tokens, temperature, response_format)
+        try:
+            cached = cache.get(cache_key)
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache read failed: {e}")
+            cached = None
+        if cached is not None:
+            return cached
+
     client = get_client()
     
     # 准备请求参数
@@ -40,10 +176,63 @@ def call_llm(
     
     if response_format:
         params["response_format"] = response_format
+    if timeout:
+        params["timeout"] = timeout
     
     # 调用API
-    response = client.chat.completions.create(**params)
-    return response.choices[0].message.content
+    limiter = get_rate_limiter(model)
+    entry = limiter.acquire(estimate_tokens(messages))
+    with _llm_semaphore:
+        response = client.chat.completions.create(**params)
+    usage = getattr(response, "usage", None)
+    if usage is not None and getattr(usage, "total_tokens", None):
+        limiter.record_usage(entry, usage.total_tokens)
+    content = response.choices[0].message.content
+
+    if cache is not None and _is_cacheable(response, content, response_format):
+        try:
+            cache.set(cache_key, model, content)
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache write failed: {e}")
+    return content
+
+
+async def acall_llm(**kwargs) -> str:
+    """call_llm 的异步版本（在线程中执行，共享同一客户端、并发上限与限流）"""
+    return await asyncio.to_thread(call_llm, **kwargs)
+
+
+def call_llm_batch(
+    requests: List[Dict[str, Any]],
+    max_workers: Optional[int] = None,
+    return_exceptions: bool = True,
+) -> List[Any]:
+    """并发执行多个 call_llm 请求，结果与输入顺序一致
+
+    Args:
+        requests: 每项为 call_llm 的关键字参数
+        max_workers: 线程数，默认 Config.LLM_MAX_CONCURRENCY
+        return_exceptions: True 时失败项以异常对象返回，否则直接抛出第一个异常
+    """
+    if not requests:
+        return []
+    max_workers = max(1, min(max_workers or Config.LLM_MAX_CONCURRENCY, len(requests)))
+
+    def _run(kwargs):
+        try:
+            return call_llm(**kwargs)
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            return e
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm") as executor:
+        return list(executor.map(_run, requests))
+
+
+async def acall_llm_batch(requests: List[Dict[str, Any]], return_exceptions: bool = True) -> List[Any]:
+    """异步并发执行多个 call_llm 请求，结果与输入顺序一致"""
+    return await asyncio.gather(*(acall_llm(**kwargs) for kwargs in requests), return_exceptions=return_exceptions)
 
 def clean_json_response(response: str) -> str:
     """清理LLM返回的JSON响应"""
@@ -0,0 +1,229 @@
+# chemistry_extraction/utils/local_fusion.py
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+from ..config import Config
+from .chem_utils import rdkit_available, canonical_smiles, canonical_reaction_smiles, morgan_fingerprint, tanimoto
+
+_TEMP_PATTERN = re.compile(r"-?\d+(?:\.\d+)?\s*(?:°\s*C|℃|K\b)|room temperature|\brt\b|室温|reflux|回流", re.I)
+_TIME_PATTERN = re.compile(r"\d+(?:\.\d+)?\s*(?:h|hr|hrs|hours?|min|mins|minutes?|d|days?|小时|分钟|天)\b|overnight|过夜", re.I)
+_YIELD_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*%")
+_SOLVENT_PATTERN = re.compile(
+    r"\b(?:DMF|DMSO|THF|DCM|MeOH|EtOH|EtOAc|MeCN|CH2Cl2|CHCl3|H2O|toluene|dioxane|1,4-dioxane|acetonitrile|"
+    r"acetone|benzene|hexanes?|ether|Et2O|DME|NMP|AcOH|water)\b|二氯甲烷|甲醇|乙醇|四氢呋喃|乙酸乙酯|乙腈|甲苯|二氧六环|水",
+    re.I,
+)
+
+
+def _normalize_name(value: str) -> str:
+    return re.sub(r"\s+", "", value).lower()
+
+
+def _as_strings(value: Any) -> List[str]:
+    """将 str / list / dict 字段展开为非空字符串列表"""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value] if value.strip() else []
+    if isinstance(value, (int, float)):
+        return [str(value)]
+    if isinstance(value, dict):
+        return [s for sub in value.values() for s in _as_strings(sub)]
+    if isinstance(value, list):
+        return [s for sub in value for s in _as_strings(sub)]
+    return []
+
+
+def _first_match(pattern: re.Pattern, texts: List[str]) -> Optional[str]:
+    for text in texts:
+        match = pattern.search(text)
+        if match:
+            return match.group(0).strip()
+    return None
+
+
+def completeness_score(reaction: Dict[str, Any]) -> float:
+    """按 FUSION_PROMPT 中的完整度规则计算 completeness_score"""
+    def named_with_smiles(compounds):
+        return any(c.get("name") and c.get("smiles") for c in compounds or [] if isinstance(c, dict))
+
+    conditions = reaction.get("conditions") or {}
+    score = 0.0
+    if reaction.get("rxn_smiles") and canonical_reaction_smiles(reaction["rxn_smiles"]):
+        score += 0.2
+    if named_with_smiles(reaction.get("reactants")):
+        score += 0.1
+    if named_with_smiles(reaction.get("products")):
+        score += 0.1
+    if reaction.get("solvent"):
+        score += 0.1
+    if isinstance(conditions, dict) and conditions.get("temp") and conditions.get("time"):
+        score += 0.2
+    if reaction.get("yields"):
+        score += 0.2
+    if (reaction.get("atom_mapping_conf") or 0) >= 0.6:
+        score += 0.1
+    return round(score, 2)
+
+
+class LocalFusion:
+    """基于 RDKit 的确定性融合
+
+    图像反应物/产物 SMILES 规范化后与文本反应按 Morgan 指纹 Tanimoto（反应物+产物）匹配，
+    将匹配文本条目的条件、溶剂、产率、试剂与实验描述补入图像反应，并按规则计算完整度。
+    图像 SMILES 缺失、无法解析，或没有文本反应达到阈值时，交由 LLM 融合。
+    """
+
+    def __init__(self, text_extractions: Any, threshold: Optional[float] = None):
+        self.threshold = Config.FUSION_TANIMOTO_THRESHOLD if threshold is None else threshold
+        items = []
+        if isinstance(text_extractions, dict):
+            items = [item for value in text_extractions.values() if isinstance(value, list) for item in value]
+        elif isinstance(text_extractions, list):
+            items = list(text_extractions)
+        items = [item for item in items if isinstance(item, dict)]
+
+        # 文本化合物的 名称/标签/别名 → 规范 SMILES，用于解析文本反应中以名称给出的组分
+        self._names: Dict[str, str] = {}
+        for item in items:
+            smiles = canonical_smiles(item.get("smiles")) if isinstance(item.get("smiles"), str) else None
+            if smiles:
+                for name in _as_strings([item.get("name"), item.get("label"), item.get("aliases")]):
+                    self._names.setdefault(_normalize_name(name), smiles)
+
+        self.text_reactions = []
+        for item in items:
+            if "reactants" not in item and "products" not in item:
+                continue
+            sides = self._text_reaction_sides(item)
+            if sides is None:
+                continue
+            reactants, products = sides
+            self.text_reactions.append({"item": item, "fp": morgan_fingerprint(".".join(reactants + products))})
+
+    @staticmethod
+    def available() -> bool:
+        return Config.FUSION_LOCAL_ENABLED and rdkit_available()
+
+    def _resolve(self, value: Any) -> Optional[str]:
+        """文本组分（SMILES、名称或 {name, smiles}）解析为规范 SMILES"""
+        if isinstance(value, dict):
+            return self._resolve(value.get("smiles")) or self._resolve(value.get("name") or value.get("label"))
+        if not isinstance(value, str) or not value.strip():
+            return None
+        return self._names.get(_normalize_name(value)) or canonical_smiles(value)
+
+    def _text_reaction_sides(self, item: Dict[str, Any]) -> Optional[Tuple[List[str], List[str]]]:
+        rxn_smiles = canonical_reaction_smiles(item.get("reaction_smiles") or item.get("rxn_smiles") or "")
+        if rxn_smiles:
+            reactants, _, products = rxn_smiles.split(">")
+            return reactants.split("."), products.split(".")
+        sides = []
+        for key in ("reactants", "products"):
+            value = item.get(key)
+            components = value if isinstance(value, list) else [value]
+            resolved = [s for s in (self._resolve(c) for c in components) if s]
+            if not resolved:
+                return None
+            sides.append(resolved)
+        return sides[0], sides[1]
+
+    def fuse(self, ocr_result: Dict[str, Any], page_idx: Any = None, bbox: Any = None) -> Optional[Dict[str, Any]]:
+        """本地融合单张图像；返回与 LLM 融合相同结构的结果，无法本地处理时返回 None"""
+        reactants = [c for c in ocr_result.get("reactants") or [] if isinstance(c, dict)]
+        products = [c for c in ocr_result.get("products") or [] if isinstance(c, dict)]
+        if not reactants and not products and not ocr_result.get("reaction_smiles"):
+            return {"reactions": [], "fusion_notes": "No reaction in image"}
+        if not reactants or not products:
+            return None
+        reactant_smiles = [canonical_smiles(c.get("smiles")) for c in reactants]
+        product_smiles = [canonical_smiles(c.get("smiles")) for c in products]
+        if not all(reactant_smiles) or not all(product_smiles):
+            return None
+
+        fp = morgan_fingerprint(".".join(reactant_smiles + product_smiles))
+        matches = sorted(
+            ((tanimoto(fp, tr["fp"]), tr["item"]) for tr in self.text_reactions),
+            key=lambda m: m[0], reverse=True,
+        )
+        matches = [(sim, item) for sim, item in matches if sim >= self.threshold]
+        if not matches:
+            # 文本反应常以标签（如 3a → 4a）给出且无 SMILES，无法本地匹配，交由 LLM 按名称/标签融合
+            return None
+        texts = [item for _, item in matches]
+
+        image_conditions = _as_strings(ocr_result.get("conditions"))
+        text_conditions = [s for item in texts for s in _as_strings(item.get("conditions"))]
+        condition_texts = image_conditions + text_conditions
+
+        solvent = next((s for item in texts for s in _as_strings(item.get("solvent"))), None)
+        if solvent is None:
+            solvent = _first_match(_SOLVENT_PATTERN, image_conditions)
+
+        reagents, seen = [], set()
+        for name in _as_strings(ocr_result.get("catalysts")):
+            reagents.append({"name": name, "role": "catalyst"})
+            seen.add(_normalize_name(name))
+        for item in texts:
+            item_reagents = item.get("reagents") or []
+            for reagent in item_reagents if isinstance(item_reagents, list) else [item_reagents]:
+                name = reagent.get("name") if isinstance(reagent, dict) else reagent
+                role = (reagent.get("role") if isinstance(reagent, dict) else None) or "reagent"
+                if isinstance(name, str) and name.strip() and _normalize_name(name) not in seen:
+                    reagents.append({"name": name, "role": role})
+                    seen.add(_normalize_name(name))
+
+        product_label = products[0].get("name") or ""
+        yields = self._parse_yields(texts[0].get("yields"), product_label)
+
+        experiments = next(
+            (s for item in texts for s in _as_strings(item.get("experiments") or item.get("description_snippet"))),
+            None,
+        )
+
+        reaction = {
+            "rxn_smiles": canonical_reaction_smiles(".".join(reactant_smiles) + ">>" + ".".join(product_smiles)),
+            "reactants": [
+                {"name": c.get("name") or "", "smiles": s, "evidence": "image"} for c, s in zip(reactants, reactant_smiles)
+            ],
+            "products": [
+                {"name": c.get("name") or "", "smiles": s, "evidence": "image"} for c, s in zip(products, product_smiles)
+            ],
+            "reagents": reagents,
+            "solvent": solvent,
+            "experiments": experiments,
+            "conditions": {
+                "temp": _first_match(_TEMP_PATTERN, condition_texts),
+                "time": _first_match(_TIME_PATTERN, condition_texts),
+            },
+            "yields": yields,
+            "atom_mapping_conf": None,
+            "evidence": {"source": "image", "page": page_idx, "boxes": [bbox] if bbox else []},
+        }
+        reaction["completeness_score"] = completeness_score(reaction)
+
+        added = [field for field, value in (
+            ("solvent", solvent), ("conditions", text_conditions), ("yields", yields), ("experiments", experiments),
+        ) if value]
+        notes = f"Matched {len(matches)} text reaction(s) (Tanimoto {matches[0][0]:.2f})"
+        notes += f"; added {', '.join(added)} from text" if added else ""
+        return {"reactions": [reaction], "fusion_notes": notes}
+
+    @staticmethod
+    def _parse_yields(value: Any, default_label: str) -> List[Dict[str, Any]]:
+        yields = []
+        entries = value if isinstance(value, list) else [value]
+        for entry in entries:
+            label = default_label
+            if isinstance(entry, dict):
+                label = entry.get("substrate_label") or entry.get("label") or entry.get("product") or label
+                entry = entry.get("value", entry.get("yield"))
+            if isinstance(entry, (int, float)) and not isinstance(entry, bool):
+                number = float(entry)
+            elif isinstance(entry, str) and _YIELD_PATTERN.search(entry):
+                number = float(_YIELD_PATTERN.search(entry).group(1))
+            else:
+                continue
+            if 0 < number <= 100:
+                yields.append({"value": number, "unit": "%", "substrate_label": label})
+        return yields
@@ -0,0 +1,260 @@
+# chemistry_extraction/utils/mineru_cache.py
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from ..config import Config
+
+logger = logging.getLogger("mineru_cache")
+
+
+def file_sha256(file_path: str, chunk_size: int = 1 << 20) -> str:
+    """计算文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class MinerUCache:
+    """以 PDF 内容 SHA-256 为键的 MinerU 解析结果缓存
+
+    - 目录结构：{cache_dir}/{sha256}-{版本}/ 存放解压后的 MinerU 输出，index.json 记录键到目录的映射与元数据
+    - 原子填充：先解压到临时目录，完成后 os.replace 到新的版本目录并切换索引；
+      被替换的旧目录若仍持有租约则保留，租约全部释放（或超过 lease_ttl）后再删除
+    - 同一文档并发请求只触发一次远程解析，其余请求等待该次解析完成
+    - 按总大小（LRU）与最大存活时间淘汰；持有租约（仍在被工作流读取）的条目不会被淘汰
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, cache_dir: str, max_size_bytes: int = 0, max_age_seconds: float = 0, lease_ttl: float = 0):
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+        self.max_age_seconds = max_age_seconds
+        self.lease_ttl = lease_ttl  # 未释放租约的兜底过期时间（工作流异常退出时）
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, threading.Event] = {}
+        self._leases: Dict[str, List[float]] = {}  # 目录名 → 各租约的获取时间
+        self._retired: set = set()  # 已从索引移除、等待租约释放后删除的目录名
+        self._index = self._load_index()
+        self._stats = {"hits": 0, "misses": 0, "waits": 0, "evictions": 0}
+
+    # ---------- 索引 ----------
+
+    def _index_path(self) -> str:
+        return os.path.join(self.cache_dir, self.INDEX_FILE)
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        # 丢弃目录已不存在的条目
+        return {k: v for k, v in index.items() if os.path.isdir(os.path.join(self.cache_dir, v.get("dir", k)))}
+
+    def _save_index(self) -> None:
+        tmp_path = f"{self._index_path()}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self._index_path())
+
+    def _dir_name(self, key: str) -> str:
+        # 旧版本索引没有 dir 字段，目录名即键
+        return self._index[key].get("dir", key)
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, self._dir_name(key))
+
+    def _is_valid(self, key: str) -> bool:
+        entry = self._index.get(key)
+        if entry is None or not os.path.isdir(self._entry_dir(key)):
+            return False
+        if self.max_age_seconds and time.time() - entry["created_at"] > self.max_age_seconds:
+            return False
+        return True
+
+    # ---------- 主接口 ----------
+
+    def get_or_extract(self, pdf_path: str, extract_fn: Callable[[str], None]) -> Tuple[str, bool]:
+        """返回 (缓存目录, 是否命中)，并为该目录获取一个租约，工作流结束后需调用 release(缓存目录)
+
+        extract_fn(target_dir) 负责把 MinerU 输出解压到 target_dir，失败时抛出异常。
+        """
+        key = file_sha256(pdf_path)
+        while True:
+            with self._lock:
+                if self._is_valid(key):
+                    self._index[key]["last_access"] = time.time()
+                    self._acquire(self._dir_name(key))
+                    self._stats["hits"] += 1
+                    self._save_index()
+                    return self._entry_dir(key), True
+                event = self._inflight.get(key)
+                if event is None:
+                    # 由当前线程负责解析
+                    event = threading.Event()
+                    self._inflight[key] = event
+                    self._stats["misses"] += 1
+                    break
+                self._stats["waits"] += 1
+            logger.info(f"Waiting for in-flight MinerU extraction of {key[:12]}")
+            event.wait()
+            with self._lock:
+                if key not in self._index:
+                    # 前一次解析失败，由本线程重新尝试
+                    continue
+
+        try:
+            return self._populate(key, pdf_path, extract_fn), False
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def _populate(self, key: str, pdf_path: str, extract_fn: Callable[[str], None]) -> str:
+        tmp_dir = os.path.join(self.cache_dir, f".tmp-{key}-{uuid.uuid4().hex}")
+        os.makedirs(tmp_dir, exist_ok=True)
+        try:
+            extract_fn(tmp_dir)
+            # 每次填充使用新目录，过期条目的旧目录可能仍被其他工作流读取
+            dir_name = f"{key}-{uuid.uuid4().hex[:8]}"
+            final_dir = os.path.join(self.cache_dir, dir_name)
+            with self._lock:
+                os.replace(tmp_dir, final_dir)
+                if key in self._index:
+                    self._retire(self._dir_name(key))
+                now = time.time()
+                self._index[key] = {
+                    "dir": dir_name,
+                    "source_name": os.path.basename(pdf_path),
+                    "size": _dir_size(final_dir),
+                    "created_at": now,
+                    "last_access": now,
+                }
+                self._acquire(dir_name)
+                self._evict()
+                self._save_index()
+            return final_dir
+        finally:
+            if os.path.isdir(tmp_dir):
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    # ---------- 租约 ----------
+
+    def _acquire(self, dir_name: str) -> None:
+        self._leases.setdefault(dir_name, []).append(time.time())
+
+    def release(self, entry_dir: str) -> None:
+        """释放 get_or_extract 返回目录上的一个租约；已被替换的目录在最后一个租约释放后删除"""
+        dir_name = os.path.basename(os.path.normpath(entry_dir))
+        with self._lock:
+            leases = self._leases.get(dir_name)
+            if leases:
+                leases.pop(0)
+                if not leases:
+                    del self._leases[dir_name]
+            if dir_name in self._retired and dir_name not in self._leases:
+                self._delete_retired(dir_name)
+
+    def _is_leased(self, dir_name: str, now: float) -> bool:
+        leases = self._leases.get(dir_name)
+        if leases and self.lease_ttl:
+            leases[:] = [t for t in leases if now - t <= self.lease_ttl]
+            if not leases:
+                del self._leases[dir_name]
+        return bool(self._leases.get(dir_name))
+
+    def _retire(self, dir_name: str) -> None:
+        """从索引替换下来的目录：无租约立即删除，否则等待租约释放"""
+        if self._is_leased(dir_name, time.time()):
+            self._retired.add(dir_name)
+        else:
+            shutil.rmtree(os.path.join(self.cache_dir, dir_name), ignore_errors=True)
+
+    def _delete_retired(self, dir_name: str) -> None:
+        self._retired.discard(dir_name)
+        shutil.rmtree(os.path.join(self.cache_dir, dir_name), ignore_errors=True)
+
+    def _evict(self) -> None:
+        """淘汰过期条目，并按 LRU 将总大小控制在上限内（调用方持有锁，跳过解析中与持有租约的条目）"""
+        now = time.time()
+        # 租约超过 lease_ttl 的旧目录一并清理
+        for dir_name in [d for d in self._retired if not self._is_leased(d, now)]:
+            self._delete_retired(dir_name)
+        busy = {k for k in self._index if k in self._inflight or self._is_leased(self._dir_name(k), now)}
+        expired = [
+            k for k, v in self._index.items()
+            if self.max_age_seconds and now - v["created_at"] > self.max_age_seconds and k not in busy
+        ]
+        for key in expired:
+            self._remove(key)
+
+        if not self.max_size_bytes:
+            return
+        total = sum(v["size"] for v in self._index.values())
+        for key, _ in sorted(self._index.items(), key=lambda kv: kv[1]["last_access"]):
+            if total <= self.max_size_bytes:
+                break
+            if key in busy:
+                continue
+            total -= self._index[key]["size"]
+            self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+        self._index.pop(key, None)
+        self._stats["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存命中统计"""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": len(self._index),
+                "size_bytes": sum(v["size"] for v in self._index.values()),
+                "in_flight": len(self._inflight),
+                "leased": sum(1 for k in self._index if self._dir_name(k) in self._leases),
+                "retired": len(self._retired),
+            }
+
+
+_cache_instance: Optional[MinerUCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_mineru_cache() -> MinerUCache:
+    """获取进程级 MinerU 缓存实例"""
+    global _cache_instance
+    if _cache_instance is None:
+        with _cache_lock:
+            if _cache_instance is None:
+                _cache_instance = MinerUCache(
+                    cache_dir=Config.MINERU_CACHE_DIR,
+                    max_size_bytes=Config.MINERU_CACHE_MAX_BYTES,
+                    max_age_seconds=Config.MINERU_CACHE_MAX_AGE_DAYS * 86400,
+                    lease_ttl=Config.MINERU_CACHE_LEASE_TTL_HOURS * 3600,
+                )
+    return _cache_instance
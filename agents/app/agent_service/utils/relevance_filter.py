@@ -0,0 +1,141 @@
+# chemistry_extraction/utils/relevance_filter.py
+import re
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from ..config import Config
+from .llm_utils import estimate_text_tokens
+
+logger = logging.getLogger("relevance_filter")
+
+# (特征名, 正则, 权重, 计数上限)
+_FEATURES = [
+    ("temperature", re.compile(r"-?\d+\s*°\s*C\b|\d+\s*℃|room temperature|\brt\b|室温|reflux|回流", re.I), 1.0, 3),
+    ("yield", re.compile(r"\byields?\b|产率|收率", re.I), 1.5, 2),
+    ("percent", re.compile(r"\d+(?:\.\d+)?\s*%"), 0.5, 2),
+    ("spectra", re.compile(r"NMR|HRMS|ESI|LC-?MS|m/z|δ\s*\d|\bMS\s*\(", re.I), 1.5, 3),
+    ("amount", re.compile(r"\d+(?:\.\d+)?\s*(?:mmol|mol|mg|g|mL|ml|μL|uL|L|equiv|eq)\b|当量|毫摩尔|毫升|毫克"), 1.0, 4),
+    ("reagent", re.compile(
+        r"\b(?:DMF|DMSO|THF|DCM|MeOH|EtOH|EtOAc|Et3N|TEA|DIPEA|DIEA|NaH|NaOH|KOH|K2CO3|Cs2CO3|NaHCO3|Na2SO4|MgSO4|"
+        r"HCl|TFA|NaBH4|LiAlH4|CH2Cl2|CHCl3|MeCN|toluene|hexanes?|acetonitrile|Pd(?:\(\w+\))?|HATU|EDCI|Boc2?O?)\b|"
+        r"二氯甲烷|甲醇|乙醇|四氢呋喃|乙酸乙酯|三乙胺|碳酸钾|氢氧化钠"), 1.0, 4),
+    ("procedure", re.compile(
+        r"stirr|synthes|prepar|reacted|reaction|dropwise|filtered|concentrated|purified|chromatograph|recrystalli|quench|"
+        r"搅拌|合成|制备|反应|加入|滴加|过滤|浓缩|纯化|柱层析|重结晶|淬灭", re.I), 0.5, 4),
+    ("compound_ref", re.compile(r"compound\s+\d+|化合物\s*\d+|\bcmpd\b|intermediate|中间体|实施例|\bexample\s+\d+", re.I), 1.0, 2),
+    ("formula", re.compile(r"\b(?:C\d+H\d+[A-Z]?\w*)\b"), 1.0, 2),
+]
+
+# 负向特征：参考文献、目录引导符
+_NEGATIVE = [
+    ("reference", re.compile(r"^\s*\[\d+\]|et al\.|doi:|J\.\s?Am\.\s?Chem|Org\.\s?Lett", re.I), -2.0, 2),
+    ("toc", re.compile(r"\.{5,}|…{3,}"), -2.0, 1),
+]
+
+
+class RelevanceFilter:
+    """文本段落化学相关性预筛选
+
+    基于关键词 / 正则特征（温度、产率、NMR、用量、试剂名等）为每个段落打分；
+    可选加载一个小型文本分类器（joblib 序列化、支持 predict_proba 的 sklearn Pipeline）。
+    低于阈值的段落不发送给 LLM；保留段落之前的短小正分段落（如实施例标题）作为上下文保留。
+    """
+
+    def __init__(
+        self,
+        min_score: float = 2.0,
+        classifier_path: Optional[str] = None,
+        classifier_threshold: float = 0.5,
+        context_max_tokens: int = 50,
+    ):
+        self.min_score = min_score
+        self.classifier_threshold = classifier_threshold
+        self.context_max_tokens = context_max_tokens
+        self.classifier = self._load_classifier(classifier_path) if classifier_path else None
+
+    @staticmethod
+    def _load_classifier(path: str):
+        try:
+            import joblib
+            classifier = joblib.load(path)
+            logger.info(f"Loaded relevance classifier from {path}")
+            return classifier
+        except Exception as e:
+            logger.warning(f"Relevance classifier unavailable ({path}): {e}; using keyword scoring only")
+            return None
+
+    def score(self, text: str) -> float:
+        """关键词特征得分"""
+        total = 0.0
+        for _, pattern, weight, cap in _FEATURES + _NEGATIVE:
+            count = len(pattern.findall(text))
+            if count:
+                total += weight * min(count, cap)
+        return total
+
+    def _classifier_scores(self, texts: List[str]) -> Optional[List[float]]:
+        if self.classifier is None or not texts:
+            return None
+        try:
+            return [float(p[1]) for p in self.classifier.predict_proba(texts)]
+        except Exception as e:
+            logger.warning(f"Relevance classifier failed: {e}")
+            return None
+
+    def select(self, sections: List[Dict[str, Any]]) -> Tuple[Set[int], Dict[str, Any]]:
+        """返回 (保留的段落下标集合, 统计信息)"""
+        candidates = [i for i, s in enumerate(sections) if (s.get("text") or "").strip()]
+        texts = [sections[i]["text"] for i in candidates]
+        scores = [self.score(t) for t in texts]
+        probas = self._classifier_scores(texts)
+
+        keep: Set[int] = set()
+        for pos, i in enumerate(candidates):
+            if probas is not None:
+                # 分类器决定去留，关键词强证据（≥ 2 倍阈值）始终保留
+                relevant = probas[pos] >= self.classifier_threshold or scores[pos] >= 2 * self.min_score
+            else:
+                relevant = scores[pos] >= self.min_score
+            if relevant:
+                keep.add(i)
+
+        if not keep and candidates:
+            logger.warning("Relevance filter matched no section, keeping all text")
+            keep = set(candidates)
+
+        tokens = {i: estimate_text_tokens(sections[i]["text"]) for i in candidates}
+        score_of = dict(zip(candidates, scores))
+        for i in list(keep):
+            j = i - 1
+            if j in tokens and j not in keep and tokens[j] <= self.context_max_tokens and score_of[j] > 0:
+                keep.add(j)
+
+        total_tokens = sum(tokens.values())
+        kept_tokens = sum(tokens[i] for i in keep)
+        report = {
+            "sections_total": len(candidates),
+            "sections_kept": len(keep),
+            "tokens_total": total_tokens,
+            "tokens_saved": total_tokens - kept_tokens,
+            "classifier": self.classifier is not None and probas is not None,
+        }
+        return keep, report
+
+
+_filter_instance: Optional[RelevanceFilter] = None
+_filter_lock = threading.Lock()
+
+
+def get_relevance_filter() -> RelevanceFilter:
+    """获取进程级预筛选器（分类器只加载一次）"""
+    global _filter_instance
+    if _filter_instance is None:
+        with _filter_lock:
+            if _filter_instance is None:
+                _filter_instance = RelevanceFilter(
+                    min_score=Config.TEXT_PREFILTER_MIN_SCORE,
+                    classifier_path=Config.TEXT_PREFILTER_CLASSIFIER_PATH or None,
+                    classifier_threshold=Config.TEXT_PREFILTER_CLASSIFIER_THRESHOLD,
+                )
+    return _filter_instance
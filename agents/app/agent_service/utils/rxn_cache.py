@@ -0,0 +1,115 @@
+# chemistry_extraction/utils/rxn_cache.py
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, Any, List, Optional
+
+from ..config import Config
+
+
+class RxnMappingCache:
+    """rxnmapper 原子映射结果的 SQLite 持久化缓存
+
+    键为 RDKit 规范化后的反应 SMILES，值为 {"mapped_rxn", "confidence"}；
+    映射结果只与反应本身有关，不设过期时间，仅按条目数淘汰最久未访问的记录。
+    """
+
+    EVICT_EVERY = 100  # 每写入多少次执行一次淘汰
+
+    def __init__(self, db_path: str, max_entries: int = 0):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._stats = {"hits": 0, "misses": 0}
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS rxn_mapping (
+                    rxn TEXT PRIMARY KEY,
+                    result TEXT NOT NULL,
+                    created_at REAL,
+                    last_access REAL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_rxn_mapping_last_access ON rxn_mapping (last_access)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量查询，返回命中的 {规范反应 SMILES: 结果}"""
+        unique = list(dict.fromkeys(keys))
+        if not unique:
+            return {}
+        now = time.time()
+        found: Dict[str, Dict[str, Any]] = {}
+        with self._lock, self._connect() as conn:
+            for start in range(0, len(unique), 500):
+                part = unique[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = conn.execute(f"SELECT rxn, result FROM rxn_mapping WHERE rxn IN ({placeholders})", part)
+                found.update((rxn, json.loads(result)) for rxn, result in rows)
+            if found:
+                conn.executemany("UPDATE rxn_mapping SET last_access = ? WHERE rxn = ?", [(now, k) for k in found])
+            hits = sum(1 for k in keys if k in found)
+            self._stats["hits"] += hits
+            self._stats["misses"] += len(keys) - hits
+        return found
+
+    def set_many(self, results: Dict[str, Dict[str, Any]]) -> None:
+        if not results:
+            return
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO rxn_mapping (rxn, result, created_at, last_access) VALUES (?, ?, ?, ?)",
+                [(k, json.dumps(v, ensure_ascii=False), now, now) for k, v in results.items()],
+            )
+            previous = self._writes
+            self._writes += len(results)
+            if self.max_entries and self._writes // self.EVICT_EVERY != previous // self.EVICT_EVERY:
+                conn.execute(
+                    "DELETE FROM rxn_mapping WHERE rxn IN ("
+                    "SELECT rxn FROM rxn_mapping ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+
+    def clear(self) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM rxn_mapping")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock, self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM rxn_mapping").fetchone()[0]
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": entries,
+            }
+
+
+_cache_instance: Optional[RxnMappingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_rxn_cache() -> Optional[RxnMappingCache]:
+    """获取进程级原子映射缓存，Config.RXN_CACHE_ENABLED 关闭时返回 None"""
+    global _cache_instance
+    if not Config.RXN_CACHE_ENABLED:
+        return None
+    if _cache_instance is None:
+        with _cache_lock:
+            if _cache_instance is None:
+                _cache_instance = RxnMappingCache(
+                    db_path=Config.RXN_CACHE_PATH,
+                    max_entries=Config.RXN_CACHE_MAX_ENTRIES,
+                )
+    return _cache_instance
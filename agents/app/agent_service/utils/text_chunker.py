@@ -0,0 +1,72 @@
+# chemistry_extraction/utils/text_chunker.py
+from typing import Dict, Any, List, Optional, Set
+
+from .llm_utils import estimate_text_tokens
+
+
+def _split_oversized(text: str, max_tokens: int) -> List[str]:
+    """将超过上限的单个段落按行切分（单行仍超限时按字符硬切）"""
+    pieces, current, current_tokens = [], [], 0
+    for line in text.splitlines(keepends=True):
+        line_tokens = estimate_text_tokens(line)
+        if line_tokens > max_tokens:
+            step = max(1, len(line) * max_tokens // line_tokens)
+            for start in range(0, len(line), step):
+                pieces.append(line[start:start + step])
+            continue
+        if current and current_tokens + line_tokens > max_tokens:
+            pieces.append("".join(current))
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += line_tokens
+    if current:
+        pieces.append("".join(current))
+    return pieces
+
+
+def chunk_sections(
+    sections: List[Dict[str, Any]],
+    max_tokens: int,
+    overlap_tokens: int = 0,
+    include: Optional[Set[int]] = None,
+) -> List[List[Dict[str, Any]]]:
+    """按段落边界将 MinerU 文本段落切分为若干 token 受限的分块
+
+    Args:
+        sections: text_jsons 列表（使用 text / page_idx 字段）
+        max_tokens: 每个分块的 token 上限
+        overlap_tokens: 相邻分块之间重叠的 token 数，取上一块末尾的完整段落
+        include: 仅切分这些下标的段落（None 表示全部），下标仍对应原 sections
+
+    Returns:
+        分块列表，每个元素为 {"index", "page_idx", "text"} 列表，index 为段落在 sections 中的下标
+    """
+    max_tokens = max(1, max_tokens)
+    units = []
+    for i, section in enumerate(sections):
+        if include is not None and i not in include:
+            continue
+        text = section.get("text", "") or ""
+        if not text.strip():
+            continue
+        for piece in ([text] if estimate_text_tokens(text) <= max_tokens else _split_oversized(text, max_tokens)):
+            units.append(({"index": i, "page_idx": section.get("page_idx"), "text": piece}, estimate_text_tokens(piece)))
+
+    chunks: List[List[Dict[str, Any]]] = []
+    current, current_tokens = [], 0
+    for unit, tokens in units:
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append([u for u, _ in current])
+            # 从上一块末尾回溯完整段落作为重叠上下文
+            overlap, overlap_size = [], 0
+            for prev, prev_tokens in reversed(current):
+                if overlap_size + prev_tokens > overlap_tokens or overlap_size + prev_tokens + tokens > max_tokens:
+                    break
+                overlap.insert(0, (prev, prev_tokens))
+                overlap_size += prev_tokens
+            current, current_tokens = overlap, overlap_size
+        current.append((unit, tokens))
+        current_tokens += tokens
+    if current:
+        chunks.append([u for u, _ in current])
+    return chunks
@@ -1,11 +1,18 @@
 # chemistry_extraction/workflow.py
-from typing import Dict, Any, Callable, TypedDict, Optional
+import threading
+import time
+import logging
+from typing import Dict, Any, Callable, TypedDict, Optional, List
 from langgraph.graph import StateGraph, END
 from .state import ChemistryExtractionState
 from .agents import BaseAgent
 from .config import Config
 from .tools.base_tool import BaseTool
 
+WORKFLOW_TYPES: List[str] = ["compound_extraction", "reaction_extraction"]
+
+logger = logging.getLogger("workflow")
+
 class NodeFunction(TypedDict):
     name: str
     function: Callable[[ChemistryExtractionState], ChemistryExtractionState]
@@ -28,6 +35,8 @@ class ChemistryWorkflow:
             self._setup_compound_extract_edges()
         elif workflow_type == "reaction_extraction":
             self._setup_reaction_edges()
+        else:
+            raise ValueError(f"Unknown workflow type: {workflow_type}. Available: {WORKFLOW_TYPES}")
 
     def _setup_nodes(self):
         """注册所有工作流节点"""
@@ -124,7 +133,8 @@ class ChemistryWorkflow:
         """编译工作流图"""
 
         comiled_graph = self.graph.compile()
-        print(comiled_graph.get_graph().draw_ascii())
+        if Config.DEBUG_WORKFLOW:
+            print(comiled_graph.get_graph().draw_ascii())
         return comiled_graph
     
     def get_node_info(self) -> Dict[str, Dict[str, str]]:
@@ -132,3 +142,49 @@ class ChemistryWorkflow:
         return {k: {"name": v["name"]} for k, v in self.nodes.items()}
 
     
+
+
+
+class WorkflowRegistry:
+    """进程级工作流注册表：每种工作流只构建并编译一次，所有请求共享
+
+    编译后的图只持有各智能体的 process 方法，智能体本身不保存请求级状态，
+    每次 invoke 的状态都在 ChemistryExtractionState 中传递，因此可以被并发请求安全复用。
+    """
+
+    _compiled: Dict[str, Any] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, workflow_type: str):
+        """获取已编译的工作流（未预热时按需构建）"""
+        compiled = cls._compiled.get(workflow_type)
+        if compiled is not None:
+            return compiled
+        with cls._lock:
+            compiled = cls._compiled.get(workflow_type)
+            if compiled is None:
+                start = time.time()
+                workflow = ChemistryWorkflow()
+                workflow.set_workflow(workflow_type)
+                compiled = workflow.compile()
+                cls._compiled[workflow_type] = compiled
+                logger.info(f"Compiled workflow '{workflow_type}' in {time.time() - start:.2f}s")
+        return compiled
+
+    @classmethod
+    def warm_up(cls, workflow_types: Optional[List[str]] = None) -> None:
+        """启动时预编译所有工作流"""
+        for workflow_type in workflow_types or WORKFLOW_TYPES:
+            cls.get(workflow_type)
+
+    @classmethod
+    def list_compiled(cls) -> List[str]:
+        """已编译的工作流类型"""
+        return list(cls._compiled.keys())
+
+    @classmethod
+    def clear(cls) -> None:
+        """清空已编译的工作流（配置变更后重新构建）"""
+        with cls._lock:
+            cls._compiled.clear()